@@ -27,6 +27,7 @@ if config.config_file_name is not None:
 
 from app.db.session import Base  # noqa
 from app.db.models.post import Post  # noqa
+from app.db.models.post_summary import PostSummary  # noqa
 
 target_metadata = Base.metadata
 
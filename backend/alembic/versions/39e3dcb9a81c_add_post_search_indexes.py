@@ -0,0 +1,50 @@
+"""add post search indexes
+
+Revision ID: 39e3dcb9a81c
+Revises: f6042f76b143
+Create Date: 2026-10-18 04:53:17.206001
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '39e3dcb9a81c'
+down_revision: Union[str, Sequence[str], None] = 'f6042f76b143'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY keeps posts writable while the indexes build, but it can't
+    # run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_posts_user_id'), 'posts', ['user_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_posts_flag_reason'), 'posts', ['flag_reason'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_posts_title_id', 'posts', ['title', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(
+            'ix_posts_title_trgm',
+            'posts',
+            ['title'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_posts_title_trgm', table_name='posts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_posts_title_id', table_name='posts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_posts_flag_reason'), table_name='posts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_posts_user_id'), table_name='posts', postgresql_concurrently=True, if_exists=True)
+    # pg_trgm is left installed; other objects may depend on it.
@@ -0,0 +1,42 @@
+"""partition posts by user_id
+
+Revision ID: b5d2e7c41f63
+Revises: 8c1f4e2a7b90
+Create Date: 2026-10-18 05:39:48.620000
+
+Upgrade: rebuilds posts as a table hash-partitioned by user_id into 16
+partitions (posts_p0..posts_p15) keyed by (id, user_id), copies every row
+and recreates the ix_posts_* indexes. Triggers reject an id already stored
+under another user and any change to an id, since a partitioned table's
+unique indexes must include user_id. The copy holds an exclusive lock on
+posts; stop the app first.
+
+Downgrade: copies the rows back into a plain table keyed by id and drops
+the partitions and triggers.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.db.partitioning import partition_posts, unpartition_posts
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2e7c41f63'
+down_revision: Union[str, Sequence[str], None] = '8c1f4e2a7b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Fixed here rather than read from the app, so this revision always builds
+# the same schema; app.db.models.post.POSTS_PARTITIONS must match it
+PARTITIONS = 16
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    partition_posts(op.get_bind(), PARTITIONS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    unpartition_posts(op.get_bind())
@@ -1,241 +1,252 @@
 import time
-import httpx
-from typing import List, Dict
-from collections import defaultdict, Counter
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy import select
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import asc, desc, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from fuzzywuzzy import fuzz
 
-from app.services.pagination import paginate_composite
-from app.db.session import get_session
+from app.core.settings import settings
+from app.services.flags import (  # noqa: F401
+    categorize_posts,
+    detect_bot_users,
+    assign_flag_reasons,
+    get_top_users,
+)
+from app.services.analysis import ensure_summary, read_summary
+from app.services.export import EXPORT_FORMATS, export_rows
+from app.services.metrics import collect_timings, span
+from app.services.post_loader import POST_IDS, post_loader
+from app.services.pagination import (
+    paginate_composite,
+    parse_ordering,
+    search_filter,
+    set_trigram_threshold,
+    sort_keys_for,
+)
+from app.services.response_cache import CachedResponse, etag_matches, response_cache
+from app.services.search import search_page
+from app.db.session import get_read_session, get_session
 from app.db.models.post import Post
 from app.schemas.post import (
     PostBase,
-    PostCreate,
+    PostBatchResponse,
     AnalyzePostsResponse,
-    SummaryPanel,
-    FiltersPanel,
     PostQueryParams,
+    PostFilterParams,
+    ExportQueryParams,
 )
 
 router = APIRouter()
 
-
-# ------------------------
-# Fetch Posts from API
-# ------------------------
-
-
-async def fetch_posts(
-    db: AsyncSession, url: str = "https://jsonplaceholder.typicode.com/posts"
-) -> List[Post]:
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, timeout=10)
-            response.raise_for_status()
-        except httpx.HTTPError as e:
-            raise HTTPException(
-                status_code=502, detail=f"Failed to fetch posts: {str(e)}"
-            )
-
-    raw_posts = response.json()
-
-    result = await db.execute(select(Post.id))
-    existing_ids = set(result.scalars().all())
-
-    new_posts_data = [
-        PostCreate(id=p["id"], user_id=p["userId"], title=p["title"], body=p["body"])
-        for p in raw_posts
-        if p["id"] not in existing_ids
-    ]
-
-    post_objects = [Post(**post.model_dump()) for post in new_posts_data]
-
-    if post_objects:
-        db.add_all(post_objects)
-        await db.commit()
-
-    return post_objects
+# Rows are read as plain tuples of these instead of ORM objects
+POST_COLUMNS = [Post.id, Post.user_id, Post.title, Post.body, Post.flag_reason]
+ID_RANGE_ERROR = f"Post ids must be between {POST_IDS[0]} and {POST_IDS[-1]}"
 
 
-# -----------------------------
-# Categorize & Analyze Posts
-# -----------------------------
-
-
-def categorize_posts(posts: List[Post]):
-    reasons: Dict[int, str] = {}
-    user_titles = defaultdict(list)
-    user_titles_set = defaultdict(set)
-    user_posts = defaultdict(list)
-    user_unique_words = defaultdict(set)
-    word_count = Counter()
-
-    for post in posts:
-        title = post.title
-        uid = post.user_id
-
-        if len(title) < 15:
-            reasons[post.id] = "Short title"
-
-        if title in user_titles_set[uid]:
-            reasons[post.id] = "Duplicate"
-        else:
-            user_titles_set[uid].add(title)
-            user_titles[uid].append(title)
-
-        user_posts[uid].append(post)
-
-        # Count words
-        words = set(title.lower().split())
-        user_unique_words[uid].update(words)
-        word_count.update(words)
-
-    return reasons, user_titles, user_posts, word_count, user_unique_words
-
-
-def detect_bot_users(user_titles: Dict[int, List[str]]) -> List[int]:
-    bot_users = []
+@router.get("/single/{post_id}", response_model=PostBase)
+async def get_post(
+    post_id: int = Path(..., description="ID of the post to fetch"),
+):
+    if post_id not in POST_IDS:
+        raise HTTPException(status_code=400, detail=ID_RANGE_ERROR)
+    # Concurrent lookups share one query (see app.services.post_loader)
+    post = await post_loader.load(post_id)
 
-    for uid, titles in user_titles.items():
-        similar_count = 0
-        n = len(titles)
-        for i in range(n):
-            for j in range(i + 1, n):
-                similarity = fuzz.ratio(titles[i], titles[j])
-                if similarity >= 70:
-                    similar_count += 1
-                    if similar_count > 5:
-                        bot_users.append(uid)
-                        break
-            if uid in bot_users:
-                break
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
 
-    return bot_users
+    return post
 
 
-def assign_flag_reasons(posts: List[Post]):
-    reasons, user_titles, user_posts, word_count, user_unique_words = categorize_posts(
-        posts
-    )
-    bot_users = detect_bot_users(user_titles)
+@router.get("/batch", response_model=PostBatchResponse)
+async def get_posts_batch(
+    ids: str = Query(..., description="Comma-separated post IDs"),
+):
+    try:
+        post_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    if not post_ids:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if any(i not in POST_IDS for i in post_ids):
+        raise HTTPException(status_code=400, detail=ID_RANGE_ERROR)
+    if len(post_ids) > settings.POST_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.POST_BATCH_MAX_IDS} ids per request",
+        )
 
-    # Mark all bots
-    for uid in bot_users:
-        for post in user_posts[uid]:
-            reasons[post.id] = "Bot"
+    posts = await post_loader.load_many(post_ids)
+    return {
+        "items": [posts[i] for i in post_ids if i in posts],
+        "missing": [i for i in post_ids if i not in posts],
+    }
 
-    # Reset and assign in a single loop
-    for post in posts:
-        post.flag_reason = reasons.get(post.id, None)
 
-    return reasons, user_titles, user_posts, word_count, user_unique_words
+def post_filter_values(params: PostFilterParams) -> dict:
+    # Equality filters as {column name: value}
+    values = {}
+    if params.reason:
+        values["flag_reason"] = params.reason
+    if params.user_id:
+        values["user_id"] = params.user_id
+    return values
 
 
-def get_top_users(user_unique_words: Dict[int, set]) -> List[int]:
-    user_word_counts = [(uid, len(words)) for uid, words in user_unique_words.items()]
-    user_word_counts.sort(key=lambda x: x[1], reverse=True)
-    return [uid for uid, _ in user_word_counts[:3]]
+def post_filters(params: PostFilterParams) -> list:
+    return [getattr(Post, name) == v for name, v in post_filter_values(params).items()]
 
 
-@router.get("/single/{post_id}", response_model=PostBase)
-async def get_post(
-    post_id: int = Path(..., description="ID of the post to fetch"),
-    db: AsyncSession = Depends(get_session),
-):
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalars().first()
+def sql_ordering(order_by: Optional[str]) -> str:
+    # Without the in-memory index there are no relevance scores
+    if order_by is None or order_by == "relevance":
+        return "id:asc"
+    return order_by
 
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
 
-    return post
+def cached_response(request: Request, cached: CachedResponse, hit: bool) -> Response:
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": settings.RESPONSE_CACHE_CONTROL,
+        "X-Cache": "HIT" if hit else "MISS",
+    }
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.get("/analyze-posts", response_model=AnalyzePostsResponse)
 async def analyze_posts(
-    db: AsyncSession = Depends(get_session),
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
+    # Only connects if the summary has to be built
+    write_db: AsyncSession = Depends(get_session),
     params: PostQueryParams = Depends(),
 ):
-    reason = params.reason
+    if params.debug:
+        with collect_timings() as timings:
+            response = await build_analysis(request, db, params, write_db)
+        response.timings = timings
+        return ORJSONResponse(response.model_dump())
+
+    key = await response_cache.key_for("analyze-posts", params, db)
+    cached = await response_cache.get(key)
+    hit = cached is not None
+    if not hit:
+        response = await build_analysis(request, db, params, write_db)
+        with span("serialize"):
+            body = orjson.dumps(response.model_dump())
+        cached = await response_cache.set(key, body)
+    return cached_response(request, cached, hit)
+
+
+async def build_analysis(
+    request: Request,
+    db: AsyncSession,
+    params: PostQueryParams,
+    write_db: Optional[AsyncSession] = None,
+) -> AnalyzePostsResponse:
     search = params.search
-    user_id = params.user_id
     order_by = params.order_by
     page = params.page
     page_size = params.page_size
+    cursor = params.cursor
 
     start_time = time.perf_counter()
-    await fetch_posts(db)
-
-    # Fetch all posts from DB
-    result = await db.execute(select(Post))
-    all_posts = result.scalars().all()
-
-    if all_posts:
-        reasons, user_titles, user_posts, word_count, user_unique_words = (
-            assign_flag_reasons(all_posts)
-        )
-        db.add_all(all_posts)
-        await db.commit()
 
-        # Count flag reasons
-        flag_counts = Counter(
-            post.flag_reason for post in all_posts if post.flag_reason
+    # Posts are ingested and flagged in the background (see
+    # app.services.ingestion), which also refreshes the stored summary.
+    summary = await read_summary(db)
+    if summary is None:
+        summary = await ensure_summary(request.app.state.analyzer, write_db or db)
+
+    index = getattr(request.app.state, "search", None)
+    ranked = index is not None and index.ready
+
+    # Paginated result. Only the SQL path hands out cursors, so a cursor
+    # stays on it even once the index has finished loading.
+    if search and ranked and not cursor:
+        paginated = await search_page(
+            db,
+            index,
+            search,
+            columns=POST_COLUMNS,
+            base_filters=post_filters(params),
+            ordering=order_by or "id:asc",
+            page=page,
+            page_size=page_size,
         )
     else:
-        word_count = Counter()
-        user_unique_words = defaultdict(set)
-        flag_counts = Counter()
-
-    # Build dynamic filters
-    filters = []
-    if reason:
-        filters.append(Post.flag_reason == reason)
-    if user_id:
-        filters.append(Post.user_id == user_id)
-
-    # Paginated result
-    paginated = await paginate_composite(
-        model=Post,
-        db=db,
-        page=page,
-        page_size=page_size,
-        search=search,
-        search_columns=[Post.title],
-        base_filters=filters,
-        ordering=order_by or "id:asc",
-        schema=PostBase,
-    )
+        try:
+            paginated = await paginate_composite(
+                model=Post,
+                db=db,
+                page=page,
+                page_size=page_size,
+                search=search,
+                search_columns=[Post.title],
+                filter_by=post_filter_values(params),
+                ordering=sql_ordering(order_by),
+                columns=POST_COLUMNS,
+                cursor=cursor,
+                count_strategy=settings.COUNT_STRATEGY,
+                data_version=summary.refreshed_at,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    # Summary panel data
-    top_users = get_top_users(user_unique_words) if user_unique_words else []
-    common_words = (
-        [{"word": word, "count": count} for word, count in word_count.most_common(10)]
-        if word_count
-        else []
-    )
+    end_time = time.perf_counter()
 
-    distinct_users = list({post.user_id for post in all_posts})
-    required_reasons = {"Bot", "Short title", "Duplicate"}
-    distinct_reasons = list(
-        {post.flag_reason for post in all_posts if post.flag_reason} | required_reasons
+    # The only validation pass; the endpoint returns a ready Response, so
+    # FastAPI does not validate it again against response_model.
+    return AnalyzePostsResponse.model_validate(
+        {
+            "posts": paginated,
+            "summary": {
+                "top_three_users": summary.top_three_users,
+                "common_words": summary.common_words,
+                "bot_count": summary.bot_count,
+                "short_title_count": summary.short_title_count,
+                "duplicate_count": summary.duplicate_count,
+            },
+            "filters": {
+                "all_users": summary.all_users,
+                "all_flag_reasons": summary.all_flag_reasons,
+                "relevance_available": ranked,
+            },
+            "duration": end_time - start_time,
+            "last_synced_at": request.app.state.ingestion.last_synced_at,
+            "summary_refreshed_at": summary.refreshed_at,
+        }
     )
 
-    end_time = time.perf_counter()
 
-    return AnalyzePostsResponse(
-        posts=paginated,
-        summary=SummaryPanel(
-            top_three_users=top_users,
-            common_words=common_words,
-            bot_count=flag_counts.get("Bot", 0),
-            short_title_count=flag_counts.get("Short title", 0),
-            duplicate_count=flag_counts.get("Duplicate", 0),
-        ),
-        filters=FiltersPanel(
-            all_users=distinct_users,
-            all_flag_reasons=distinct_reasons,
-        ),
-        duration=end_time - start_time,
+@router.get("/export")
+async def export_posts(
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
+    params: ExportQueryParams = Depends(),
+):
+    """Stream every post matching the filters as NDJSON or CSV."""
+    filters = post_filters(params)
+    if params.search:
+        filters.append(search_filter(params.search, [Post.title]))
+
+    _, order_col, direction = parse_ordering(Post, sql_ordering(params.order_by))
+    order = desc if direction == "desc" else asc
+    query = (
+        select(*POST_COLUMNS)
+        .where(*filters)
+        .order_by(*(order(key) for key in sort_keys_for(Post, order_col)))
+    )
+
+    await set_trigram_threshold(db, params.search)
+    return StreamingResponse(
+        export_rows(db, query, params.format, request.is_disconnected),
+        media_type=EXPORT_FORMATS[params.format],
+        headers={
+            "Content-Disposition": f'attachment; filename="posts.{params.format}"'
+        },
     )
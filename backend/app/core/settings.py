@@ -4,6 +4,112 @@ import os
 class Settings:
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Read-only endpoints use this replica when set, else DATABASE_URL
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+
+    # Connection pools, one for writes and one for reads
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+    DB_READ_MAX_OVERFLOW: int = int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Prepared statements kept per connection by the asyncpg driver (0: off,
+    # e.g. behind pgbouncer in transaction mode)
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+    # Partitions the analyzer reads at once on its first load
+    POSTS_PARTITION_CONCURRENCY: int = int(
+        os.getenv("POSTS_PARTITION_CONCURRENCY", "4")
+    )
+
+    # Background ingestion
+    POSTS_SOURCE_URL: str = os.getenv(
+        "POSTS_SOURCE_URL", "https://jsonplaceholder.typicode.com/posts"
+    )
+    # JSON list of sources (see app.services.sources.PostSource); overrides
+    # POSTS_SOURCE_URL, e.g.
+    # [{"name": "a", "url": "https://a.test/posts", "paging": "page"}]
+    POSTS_SOURCES: str = os.getenv("POSTS_SOURCES", "")
+    INGESTION_ENABLED: bool = os.getenv("INGESTION_ENABLED", "true").lower() == "true"
+    INGESTION_INTERVAL: float = float(os.getenv("INGESTION_INTERVAL", "300"))
+    INGESTION_JITTER: float = float(os.getenv("INGESTION_JITTER", "0.1"))
+    INGESTION_RETRY_BASE: float = float(os.getenv("INGESTION_RETRY_BASE", "5"))
+    INGESTION_MAX_BACKOFF: float = float(os.getenv("INGESTION_MAX_BACKOFF", "600"))
+    INGESTION_TIMEOUT: float = float(os.getenv("INGESTION_TIMEOUT", "10"))
+    INGESTION_MAX_CONNECTIONS: int = int(os.getenv("INGESTION_MAX_CONNECTIONS", "10"))
+
+    # Admission control: JSON object of path prefix -> {"concurrency",
+    # "queue", "timeout"} (see app.services.admission.AdmissionLimit).
+    # Requests past a route's limits get a 503 with Retry-After.
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_LIMITS: str = os.getenv(
+        "ADMISSION_LIMITS",
+        '{"/posts/analyze-posts": {"concurrency": 6, "queue": 24, "timeout": 2},'
+        ' "/posts/export": {"concurrency": 2, "queue": 2, "timeout": 5}}',
+    )
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+    # Post analysis executor: "process", "thread" or "inline"
+    ANALYSIS_EXECUTOR: str = os.getenv("ANALYSIS_EXECUTOR", "process")
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+    ANALYSIS_INLINE_THRESHOLD: int = int(os.getenv("ANALYSIS_INLINE_THRESHOLD", "1000"))
+    ANALYSIS_PROCESS_THRESHOLD: int = int(
+        os.getenv("ANALYSIS_PROCESS_THRESHOLD", "20000")
+    )
+
+    # Total counts for paginated queries: "exact", "cached" or "estimated"
+    COUNT_STRATEGY: str = os.getenv("COUNT_STRATEGY", "cached")
+    COUNT_CACHE_SIZE: int = int(os.getenv("COUNT_CACHE_SIZE", "1024"))
+    COUNT_CACHE_TTL: float = float(os.getenv("COUNT_CACHE_TTL", "300"))
+    COUNT_ESTIMATE_THRESHOLD: int = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "100000"))
+
+    # /posts/analyze-posts response cache
+    RESPONSE_CACHE_ENABLED: bool = (
+        os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    )
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    # Seconds between reads of the stored summary's refreshed_at, which moves
+    # cached responses to new keys after writes by any worker
+    RESPONSE_CACHE_VERSION_POLL: float = float(
+        os.getenv("RESPONSE_CACHE_VERSION_POLL", "1")
+    )
+    # Sent to clients; "no-cache" makes browsers revalidate with If-None-Match
+    RESPONSE_CACHE_CONTROL: str = os.getenv("RESPONSE_CACHE_CONTROL", "no-cache")
+
+    # Where common_words/top users come from: "python" (the analyzer's
+    # incremental counters) or "sql" (aggregated in Postgres on refresh)
+    SUMMARY_AGGREGATION: str = os.getenv("SUMMARY_AGGREGATION", "python")
+
+    # Title search: "sql" (ILIKE/pg_trgm) or "memory" (in-process inverted
+    # index with relevance ranking; falls back to SQL past the size limit).
+    # With several workers, each index catches up with the others' writes at
+    # its next sync, so searches can lag by up to INGESTION_INTERVAL
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "sql")
+    SEARCH_INDEX_MAX_POSTS: int = int(os.getenv("SEARCH_INDEX_MAX_POSTS", "500000"))
+    # pg_trgm similarity threshold for the SQL search's % operator; set on
+    # each connection at connect time
+    SEARCH_TRIGRAM_THRESHOLD: float = float(
+        os.getenv("SEARCH_TRIGRAM_THRESHOLD", "0.7")
+    )
+    SEARCH_FUZZY_THRESHOLD: float = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.5"))
+
+    # /posts/single and /posts/batch: lookups arriving within the window are
+    # fetched in one query; found posts are cached until the next ingestion
+    POST_LOADER_WINDOW: float = float(os.getenv("POST_LOADER_WINDOW", "0.002"))
+    POST_LOADER_MAX_BATCH: int = int(os.getenv("POST_LOADER_MAX_BATCH", "100"))
+    POST_CACHE_SIZE: int = int(os.getenv("POST_CACHE_SIZE", "1024"))
+    # Seconds between reads of the stored summary's refreshed_at, which drops
+    # cached posts after writes by other workers
+    POST_CACHE_VERSION_POLL: float = float(os.getenv("POST_CACHE_VERSION_POLL", "1"))
+    POST_BATCH_MAX_IDS: int = int(os.getenv("POST_BATCH_MAX_IDS", "100"))
+
+    # Prebuilt paginate_composite statements, one per filter/order signature
+    QUERY_SHAPE_CACHE_SIZE: int = int(os.getenv("QUERY_SHAPE_CACHE_SIZE", "256"))
+
+    # Statements at least this slow are counted and logged
+    SLOW_QUERY_SECONDS: float = float(os.getenv("SLOW_QUERY_SECONDS", "0.5"))
 
 
 settings = Settings()
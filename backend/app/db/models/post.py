@@ -1,12 +1,102 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, DDL, Index, Integer, String, Text, event
 from app.db.session import Base
 
+# Hash partitions of posts by user_id, as created by migration b5d2e7c41f63.
+# Changing the count takes a new migration that rebuilds the table.
+POSTS_PARTITIONS = 16
+
 
 class Post(Base):
     __tablename__ = "posts"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False)
+    # Partitioned tables need the partition key in their primary key
+    user_id = Column(Integer, nullable=False, index=True, primary_key=True)
     title = Column(String(255), nullable=False)
     body = Column(Text, nullable=False)
-    flag_reason = Column(String(100), nullable=True)
+    flag_reason = Column(String(100), nullable=True, index=True)
+
+    __table_args__ = (
+        # ORDER BY title, id and keyset seeks on (title, id)
+        Index("ix_posts_title_id", "title", "id"),
+        # ILIKE '%word%' and the pg_trgm % operator in title search
+        Index(
+            "ix_posts_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        {"postgresql_partition_by": "HASH (user_id)"},
+    )
+
+    # Ids are unique across partitions (see id_unique_ddl), so lookups and
+    # bulk updates keep using id alone
+    __mapper_args__ = {"primary_key": [id]}
+
+
+def partition_name(remainder: int) -> str:
+    return f"posts_p{remainder}"
+
+
+def partition_ddl(partitions: int) -> list:
+    return [
+        f"CREATE TABLE {partition_name(r)} PARTITION OF posts "
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {r})"
+        for r in range(partitions)
+    ]
+
+
+def id_unique_ddl() -> list:
+    """Triggers keeping post ids unique across users.
+
+    A unique index on a partitioned table must include the partition key, so
+    (id, user_id) is the most the primary key can enforce. Ids can't change
+    once stored, and after each insert statement the ids it wrote are looked
+    up under other users. Writers in concurrent transactions aren't checked
+    against each other; the app's writers all hold the posts-write advisory
+    lock.
+    """
+    return [
+        """
+        CREATE OR REPLACE FUNCTION posts_check_id_unique() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            duplicate integer;
+        BEGIN
+            SELECT w.id INTO duplicate FROM written w
+            JOIN posts p ON p.id = w.id AND p.user_id <> w.user_id
+            LIMIT 1;
+            IF FOUND THEN
+                RAISE EXCEPTION 'post id % already belongs to another user',
+                    duplicate
+                    USING ERRCODE = 'unique_violation',
+                          CONSTRAINT = 'posts_id_unique';
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION posts_keep_id() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            RAISE EXCEPTION 'post id % can''t change', OLD.id
+                USING ERRCODE = 'check_violation',
+                      CONSTRAINT = 'posts_id_unique';
+        END
+        $$
+        """,
+        "CREATE TRIGGER posts_id_unique AFTER INSERT ON posts "
+        "REFERENCING NEW TABLE AS written "
+        "FOR EACH STATEMENT EXECUTE FUNCTION posts_check_id_unique()",
+        # Row-level BEFORE UPDATE triggers also fire for rows that move to
+        # another partition, and only when id is set at all
+        "CREATE TRIGGER posts_keep_id BEFORE UPDATE OF id ON posts "
+        "FOR EACH ROW WHEN (OLD.id IS DISTINCT FROM NEW.id) "
+        "EXECUTE FUNCTION posts_keep_id()",
+    ]
+
+
+for statement in partition_ddl(POSTS_PARTITIONS) + id_unique_ddl():
+    # DDL() formats its string with %
+    event.listen(Post.__table__, "after_create", DDL(statement.replace("%", "%%")))
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Integer, String, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import Base
+
+# Key of the single row describing the whole posts table
+POSTS_SUMMARY_KEY = "posts"
+
+
+class PostSummary(Base):
+    """Summary and filter panels of /analyze-posts, refreshed by the analyzer."""
+
+    __tablename__ = "post_summaries"
+
+    key = Column(String(32), primary_key=True)
+    top_three_users = Column(JSONB, nullable=False)
+    common_words = Column(JSONB, nullable=False)
+    bot_count = Column(Integer, nullable=False)
+    short_title_count = Column(Integer, nullable=False)
+    duplicate_count = Column(Integer, nullable=False)
+    all_users = Column(JSONB, nullable=False)
+    all_flag_reasons = Column(JSONB, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+async def summary_version(db: AsyncSession):
+    """The stored summary's ``refreshed_at``; every write of posts moves it."""
+    return await db.scalar(
+        select(PostSummary.refreshed_at).where(PostSummary.key == POSTS_SUMMARY_KEY)
+    )
@@ -0,0 +1,101 @@
+"""Convert the posts table between a plain and a hash-partitioned table.
+
+The ``partition posts by user_id`` migration runs these in its upgrade and
+downgrade. Each conversion copies every row inside one transaction holding
+an exclusive lock on posts.
+"""
+
+from typing import List
+
+from sqlalchemy import Connection, column, table, text
+
+from app.db.models.post import Post, id_unique_ddl, partition_ddl, partition_name
+
+POST_COLUMNS = "id, user_id, title, body, flag_reason"
+_CREATE_POSTS = """
+CREATE TABLE posts (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    flag_reason VARCHAR(100),
+    PRIMARY KEY ({key})
+){partition_by}
+"""
+
+
+def partition_table(remainder: int):
+    """One partition of posts, for reading it on its own."""
+    return table(
+        partition_name(remainder),
+        column("id"),
+        column("user_id"),
+        column("title"),
+        column("body"),
+        column("flag_reason"),
+    )
+
+
+def partition_count(conn: Connection) -> int:
+    """Partitions of posts; 0 when it is a plain table."""
+    return conn.scalar(
+        text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'posts'::regclass")
+    )
+
+
+def partition_posts(conn: Connection, partitions: int):
+    """Move every post into a table hash-partitioned by user_id."""
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    if partition_count(conn):
+        raise ValueError("posts is already partitioned")
+    statements = [
+        _CREATE_POSTS.format(
+            key="id, user_id", partition_by=" PARTITION BY HASH (user_id)"
+        ),
+        *partition_ddl(partitions),
+    ]
+    _rebuild(conn, "posts_unpartitioned", statements)
+    # After the copy: the rows came from a table keyed by id alone
+    for statement in id_unique_ddl():
+        conn.execute(text(statement))
+
+
+def unpartition_posts(conn: Connection):
+    """Move every post back into a plain table keyed by id."""
+    if not partition_count(conn):
+        raise ValueError("posts is not partitioned")
+    _rebuild(
+        conn, "posts_partitioned", [_CREATE_POSTS.format(key="id", partition_by="")]
+    )
+    # Their triggers went with the old table
+    for function in ("posts_check_id_unique", "posts_keep_id"):
+        conn.execute(text(f"DROP FUNCTION IF EXISTS {function}()"))
+
+
+def _rebuild(conn: Connection, old_name: str, create: List[str]):
+    conn.execute(text("LOCK TABLE posts IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text(f"ALTER TABLE posts RENAME TO {old_name}"))
+    conn.execute(
+        text(f"ALTER TABLE {old_name} RENAME CONSTRAINT posts_pkey TO {old_name}_pkey")
+    )
+    # The new table's indexes take over these names
+    for index in Post.__table__.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+    for statement in create:
+        conn.execute(text(statement))
+    conn.execute(
+        text(
+            f"INSERT INTO posts ({POST_COLUMNS}) SELECT {POST_COLUMNS} FROM {old_name}"
+        )
+    )
+
+    trigram = conn.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+    for index in Post.__table__.indexes:
+        if index.dialect_options["postgresql"]["using"] == "gin" and not trigram:
+            continue
+        index.create(conn)
+    # Drops the old partitions along with their parent
+    conn.execute(text(f"DROP TABLE {old_name}"))
+    conn.execute(text("ANALYZE posts"))
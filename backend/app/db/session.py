@@ -1,19 +1,57 @@
 from app.core.settings import settings
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.services.metrics import TimedQueuePool, instrument_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=1800,
+
+def make_engine(url: str, pool_size: int, max_overflow: int, role: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            # Sent with the startup packet, so searches don't need a SET
+            "server_settings": {
+                "pg_trgm.similarity_threshold": str(settings.SEARCH_TRIGRAM_THRESHOLD)
+            },
+        },
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def record_threshold(dbapi_connection, connection_record):
+        connection_record.info["trigram_threshold"] = settings.SEARCH_TRIGRAM_THRESHOLD
+
+    instrument_engine(engine, role=role)
+    return engine
+
+
+# Writes, and reads that must see them
+engine = make_engine(
+    settings.DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW, "write"
+)
+# Read-only endpoints; without a replica this is a second pool on the primary
+read_engine = make_engine(
+    settings.DATABASE_REPLICA_URL or settings.DATABASE_URL,
+    settings.DB_READ_POOL_SIZE,
+    settings.DB_READ_MAX_OVERFLOW,
+    "read",
 )
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
 Base = declarative_base()
 
@@ -21,3 +59,8 @@ Base = declarative_base()
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_session():
+    async with ReadSessionLocal() as session:
+        yield session
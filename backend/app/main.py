@@ -1,10 +1,70 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api import posts
+from app.core.settings import settings
+from app.services.admission import AdmissionMiddleware
+from app.services.analysis import IncrementalAnalyzer
+from app.services.executor import AnalysisExecutor
+from app.services.ingestion import IngestionScheduler
+from app.services.metrics import (
+    registry,
+    update_executor_metrics,
+    update_pool_metrics,
+)
+from app.db.session import ReadSessionLocal
+from app.services.response_cache import response_cache
+from app.services.search import SEARCH_BACKENDS, SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+async def load_search_index(index: SearchIndex):
+    # Searches use SQL until this finishes
+    try:
+        async with ReadSessionLocal() as db:
+            await index.load(db)
+        # Responses cached meanwhile came from the SQL search
+        await response_cache.invalidate()
+    except Exception:
+        logger.exception("Loading the search index failed; using SQL search")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.executor = AnalysisExecutor()
+    app.state.analyzer = IncrementalAnalyzer(executor=app.state.executor)
+    if settings.SEARCH_BACKEND not in SEARCH_BACKENDS:
+        raise ValueError(f"Invalid search backend: {settings.SEARCH_BACKEND}")
+    app.state.search = None
+    if settings.SEARCH_BACKEND == "memory":
+        app.state.search = SearchIndex()
+    app.state.ingestion = IngestionScheduler(
+        analyzer=app.state.analyzer, search_index=app.state.search
+    )
+    if settings.INGESTION_ENABLED:
+        await app.state.ingestion.start()
+    warmup = None
+    if app.state.search is not None:
+        warmup = asyncio.create_task(load_search_index(app.state.search))
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await app.state.ingestion.stop()
+    app.state.executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(posts.router, prefix="/posts", tags=["posts"])
+if settings.ADMISSION_ENABLED:
+    # Added before CORS so that shed requests still get CORS headers
+    app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -17,3 +77,11 @@ app.add_middleware(
 @app.get("/")
 def home():
     return {"message": "Home"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Per-process metrics; scrape each worker separately
+    update_executor_metrics(app.state.executor)
+    update_pool_metrics()
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
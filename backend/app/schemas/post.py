@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 
 
 class PostBase(BaseModel):
@@ -20,6 +21,12 @@ class PostResponse(PostBase):
     pass
 
 
+class PostBatchResponse(BaseModel):
+    # In the order requested
+    items: List[PostBase]
+    missing: List[int]
+
+
 class WordCount(BaseModel):
     word: str
     count: int
@@ -36,14 +43,20 @@ class SummaryPanel(BaseModel):
 class FiltersPanel(BaseModel):
     all_users: List[int]
     all_flag_reasons: List[str]
+    # Whether order_by=relevance ranks search matches (the in-memory index
+    # is loaded); otherwise it orders by id
+    relevance_available: bool = False
 
 
 class PaginatedPosts(BaseModel):
     items: List[PostBase]
     total_count: int
+    total_count_exact: bool = True
     current_page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
 
 class AnalyzePostsResponse(BaseModel):
@@ -51,14 +64,38 @@ class AnalyzePostsResponse(BaseModel):
     summary: SummaryPanel
     filters: FiltersPanel
     duration: Optional[float] = None
+    last_synced_at: Optional[datetime] = None
+    summary_refreshed_at: Optional[datetime] = None
+    # Seconds per stage, only with ?debug=true
+    timings: Optional[Dict[str, float]] = None
 
 
-class PostQueryParams(BaseModel):
+class PostFilterParams(BaseModel):
     reason: Optional[str] = Field(None, description="Filter posts by reason")
     search: Optional[str] = Field(None, description="Search posts by title")
     user_id: Optional[int] = Field(None, description="Filter posts by user ID")
-    order_by: Optional[Literal["title:asc", "title:desc", "id:asc", "id:desc"]] = Field(
-        None, description="Order by column (e.g., 'title:asc' or 'title:desc')"
+    order_by: Optional[
+        Literal["title:asc", "title:desc", "id:asc", "id:desc", "relevance"]
+    ] = Field(
+        None,
+        description=(
+            "Order by column (e.g., 'title:asc' or 'title:desc'), or 'relevance' "
+            "to rank search matches"
+        ),
     )
+
+
+class PostQueryParams(PostFilterParams):
     page: int = Field(1, ge=1)
     page_size: int = Field(10, ge=1, le=100)
+    cursor: Optional[str] = Field(
+        None,
+        description="Cursor from next_cursor/prev_cursor; switches to keyset pagination",
+    )
+    debug: bool = Field(
+        False, description="Include per-stage timings; bypasses the response cache"
+    )
+
+
+class ExportQueryParams(PostFilterParams):
+    format: Literal["ndjson", "csv"] = Field("ndjson", description="Export format")
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.settings import settings
+from app.services.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    span,
+)
+
+
+class AdmissionLimit(NamedTuple):
+    """How many requests a route runs at once, and how many may wait.
+
+    A request finding every slot taken waits at most ``timeout`` seconds
+    behind up to ``queue`` others; past either bound it is rejected.
+    """
+
+    concurrency: int
+    queue: int = 0
+    timeout: float = 1.0
+
+
+def load_limits(raw: Optional[str]) -> Dict[str, AdmissionLimit]:
+    """Limits from a JSON object of path prefix -> ``AdmissionLimit`` fields."""
+    if not raw:
+        return {}
+    limits = {}
+    for prefix, config in json.loads(raw).items():
+        limit = AdmissionLimit(**config)
+        if limit.concurrency < 1 or limit.queue < 0 or limit.timeout < 0:
+            raise ValueError(f"Invalid admission limit for {prefix}: {limit}")
+        limits[prefix] = limit
+    return limits
+
+
+class Saturated(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionGate:
+    """Concurrency slots plus a bounded wait queue for one route."""
+
+    def __init__(self, route: str, limit: AdmissionLimit):
+        self.route = route
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit.concurrency)
+
+    async def acquire(self):
+        if self._slots.locked():
+            if self.waiting >= self.limit.queue:
+                raise Saturated("queue_full")
+            self._set_waiting(self.waiting + 1)
+            try:
+                with span("admission_wait"):
+                    await asyncio.wait_for(self._slots.acquire(), self.limit.timeout)
+            except asyncio.TimeoutError:
+                raise Saturated("timeout")
+            finally:
+                self._set_waiting(self.waiting - 1)
+        else:
+            await self._slots.acquire()
+        self.active += 1
+        ADMISSION_IN_FLIGHT.labels(self.route).set(self.active)
+
+    def release(self):
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.labels(self.route).set(self.active)
+        self._slots.release()
+
+    def _set_waiting(self, waiting: int):
+        self.waiting = waiting
+        ADMISSION_QUEUE_DEPTH.labels(self.route).set(waiting)
+
+
+class AdmissionMiddleware:
+    """Caps concurrent requests per path prefix and sheds the excess.
+
+    Each prefix in ``limits`` gets its own ``AdmissionGate``, so a burst on
+    one expensive route fills its queue and is answered with a fast 503
+    and ``Retry-After`` while other routes keep their share of the
+    connection pool and event loop. Paths without a limit pass through.
+    A streamed response holds its slot until the body is sent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Optional[Dict[str, AdmissionLimit]] = None,
+        retry_after: int = settings.ADMISSION_RETRY_AFTER,
+    ):
+        self.app = app
+        if limits is None:
+            limits = load_limits(settings.ADMISSION_LIMITS)
+        self.retry_after = retry_after
+        # Longest prefix first, so /posts/export wins over /posts
+        self.gates: List[Tuple[str, AdmissionGate]] = [
+            (prefix.rstrip("/"), AdmissionGate(prefix, limit))
+            for prefix, limit in sorted(
+                limits.items(), key=lambda item: len(item[0]), reverse=True
+            )
+        ]
+
+    def gate_for(self, path: str) -> Optional[AdmissionGate]:
+        for prefix, gate in self.gates:
+            if path == prefix or path.startswith(prefix + "/"):
+                return gate
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        gate = self.gate_for(scope["path"]) if scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await gate.acquire()
+        except Saturated as e:
+            ADMISSION_REJECTED.labels(gate.route, e.reason).inc()
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
@@ -0,0 +1,68 @@
+from typing import List
+
+from sqlalchemy import desc, func, literal, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.post import Post
+from app.services.metrics import span
+
+AGGREGATION_MODES = ("python", "sql")
+
+# Every character str.split() splits on; Postgres' \s only covers ASCII
+PYTHON_WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000-\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
+SPLIT_PATTERN = f"[{PYTHON_WHITESPACE}]+"
+
+
+def post_words():
+    """Distinct (post id, user id, word) rows, tokenized like ``title_words``.
+
+    ``str.split()`` drops leading/trailing whitespace, which is what the empty
+    string filter undoes for ``regexp_split_to_table``. ``lower()`` matches
+    ``str.lower()`` on a UTF-8 ctype except for the few characters Python
+    lowercases to two code points (e.g. U+0130).
+    """
+    words = (
+        func.regexp_split_to_table(func.lower(Post.title), literal(SPLIT_PATTERN))
+        .table_valued("word")
+        .render_derived("words")
+    )
+    return (
+        select(Post.id, Post.user_id, words.c.word)
+        .select_from(Post)
+        .join(words, true())
+        .where(words.c.word != "")
+        .distinct()
+        .subquery("post_words")
+    )
+
+
+async def common_words_sql(db: AsyncSession, limit: int = 10) -> List[dict]:
+    words = post_words()
+    count = func.count().label("count")
+    # COLLATE "C" orders ties by code point, like sorting str in Python
+    query = (
+        select(words.c.word, count)
+        .group_by(words.c.word)
+        .order_by(desc(count), words.c.word.collate("C"))
+        .limit(limit)
+    )
+    with span("common_words_sql"):
+        result = await db.execute(query)
+    return [{"word": word, "count": n} for word, n in result.all()]
+
+
+async def top_users_sql(db: AsyncSession, limit: int = 3) -> List[int]:
+    words = post_words()
+    count = func.count(words.c.word.distinct()).label("count")
+    query = (
+        select(words.c.user_id, count)
+        .group_by(words.c.user_id)
+        .order_by(desc(count), words.c.user_id)
+        .limit(limit)
+    )
+    with span("top_users_sql"):
+        result = await db.execute(query)
+    return [uid for uid, _ in result.all()]
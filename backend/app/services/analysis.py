@@ -0,0 +1,416 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.db.models.post import POSTS_PARTITIONS, Post
+from app.core.settings import settings
+from app.db.partitioning import partition_table
+from app.db.models.post_summary import POSTS_SUMMARY_KEY, PostSummary
+from app.services.aggregation import (
+    AGGREGATION_MODES,
+    common_words_sql,
+    top_users_sql,
+)
+from app.services.metrics import span
+from app.services.flags import (
+    FLAG_BOT,
+    FLAG_DUPLICATE,
+    FLAG_SHORT_TITLE,
+    REQUIRED_FLAG_REASONS,
+    PostColumns,
+    PostRow,
+    UserState,
+    build_user_states,
+    discard_words,
+)
+from app.services.pagination import count_cache
+from app.services.post_loader import post_loader
+from app.services.response_cache import response_cache
+from app.services.single_flight import SingleFlight, advisory_lock
+
+if TYPE_CHECKING:
+    from app.services.executor import AnalysisExecutor
+
+# Advisory lock held by everything that rewrites posts in bulk (summary
+# builds, ingestion syncs); their UPDATEs and upserts touch the same rows in
+# different orders and would otherwise deadlock
+POSTS_LOCK = "posts-write"
+
+
+class IncrementalAnalyzer:
+    """Keeps the per-user state behind ``assign_flag_reasons`` in memory.
+
+    Flags only depend on the posts of the same user, so folding in a new or
+    changed post only re-flags that user. ``apply`` returns the posts whose
+    flag differs from what the database holds, which is all that needs to be
+    written back.
+
+    Batches large enough for the ``executor`` to offload rebuild the touched
+    users from scratch in worker processes instead of updating them in place.
+
+    With ``aggregation="sql"`` the stored summary takes its common words and
+    top users from Postgres instead of the in-memory counters.
+
+    Every worker process holds its own analyzer but only sees the rows its
+    own syncs wrote. ``version`` is the ``refreshed_at`` of the summary this
+    analyzer last stored; when the stored summary has moved on, another
+    worker has written posts since, and the state is loaded again before
+    anything is re-flagged.
+    """
+
+    def __init__(
+        self,
+        executor: Optional["AnalysisExecutor"] = None,
+        aggregation: str = settings.SUMMARY_AGGREGATION,
+    ):
+        if aggregation not in AGGREGATION_MODES:
+            raise ValueError(f"Invalid summary aggregation mode: {aggregation}")
+        self.executor = executor
+        self.aggregation = aggregation
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.users: Dict[int, UserState] = {}
+        self.post_users: Dict[int, int] = {}
+        self.flags: Dict[int, Optional[str]] = {}
+        self.word_count: Counter = Counter()
+        self.flag_counts: Counter = Counter()
+        self.version: Optional[datetime] = None
+        self.loaded = False
+
+    # ------------------------
+    # State updates
+    # ------------------------
+
+    def apply(self, posts: Iterable) -> Dict[int, Optional[str]]:
+        touched = set()
+
+        for post in posts:
+            self._record_baseline(post)
+
+            old_uid = self.post_users.get(post.id)
+            if old_uid is not None:
+                if (
+                    old_uid == post.user_id
+                    and self.users[old_uid].posts[post.id] == post.title
+                ):
+                    continue
+                discard_words(self.word_count, self.users[old_uid].remove(post.id))
+                del self.post_users[post.id]
+                if not self.users[old_uid].posts:
+                    del self.users[old_uid]
+                touched.add(old_uid)
+
+            state = self.users.get(post.user_id)
+            if state is None:
+                state = self.users[post.user_id] = UserState()
+            self.word_count.update(state.add(post.id, post.title))
+            self.post_users[post.id] = post.user_id
+            touched.add(post.user_id)
+
+        return self._reflag(touched)
+
+    async def apply_async(self, posts: Iterable) -> Dict[int, Optional[str]]:
+        if not isinstance(posts, PostColumns):
+            posts = list(posts)
+        if self.executor is None or not self.executor.should_offload(len(posts)):
+            return self.apply(posts)
+
+        # Full post lists of every touched user, as they look after the batch
+        user_rows: Dict[int, Dict[int, str]] = {}
+        owners: Dict[int, int] = {}
+        for post in posts:
+            self._record_baseline(post)
+            old_uid = owners.get(post.id, self.post_users.get(post.id))
+            if (
+                post.id not in owners
+                and old_uid == post.user_id
+                and self.users[old_uid].posts[post.id] == post.title
+            ):
+                continue
+            if old_uid is not None and old_uid != post.user_id:
+                self._user_rows(user_rows, old_uid).pop(post.id, None)
+            self._user_rows(user_rows, post.user_id)[post.id] = post.title
+            owners[post.id] = post.user_id
+
+        rows = [
+            PostRow(post_id, uid, title)
+            for uid, titles in user_rows.items()
+            for post_id, title in titles.items()
+        ]
+        states: Dict[int, UserState] = {}
+        for part in await self.executor.map_users(build_user_states, rows):
+            states.update(part)
+
+        for uid in user_rows:
+            self._drop_user(uid)
+        for uid, state in states.items():
+            self.users[uid] = state
+            self.post_users.update(dict.fromkeys(state.posts, uid))
+            self.word_count.update(state.words)
+
+        return self._reflag(user_rows)
+
+    def _record_baseline(self, post):
+        if post.id in self.flags:
+            return
+        # Baseline is whatever the row currently stores
+        flag = getattr(post, "flag_reason", None)
+        self.flags[post.id] = flag
+        if flag:
+            self.flag_counts[flag] += 1
+
+    def _user_rows(self, user_rows: Dict[int, Dict[int, str]], uid: int):
+        if uid not in user_rows:
+            state = self.users.get(uid)
+            user_rows[uid] = dict(state.posts) if state else {}
+        return user_rows[uid]
+
+    def _drop_user(self, uid: int):
+        state = self.users.pop(uid, None)
+        if state is None:
+            return
+        for post_id in state.posts:
+            if self.post_users.get(post_id) == uid:
+                del self.post_users[post_id]
+        self.word_count.subtract(state.words)
+        for word in state.words:
+            if self.word_count[word] <= 0:
+                del self.word_count[word]
+
+    def _reflag(self, uids: Iterable[int]) -> Dict[int, Optional[str]]:
+        changed = {}
+        for uid in uids:
+            state = self.users.get(uid)
+            if state is None:
+                continue
+            for post_id in state.posts:
+                flag = state.flag(post_id)
+                old = self.flags.get(post_id)
+                if old != flag:
+                    if old:
+                        self.flag_counts[old] -= 1
+                    if flag:
+                        self.flag_counts[flag] += 1
+                    self.flags[post_id] = flag
+                    changed[post_id] = flag
+        return changed
+
+    # ------------------------
+    # Summary
+    # ------------------------
+
+    def common_words(self, limit: int = 10) -> List[dict]:
+        words = sorted(self.word_count.items(), key=lambda x: (-x[1], x[0]))
+        return [{"word": word, "count": count} for word, count in words[:limit]]
+
+    def top_users(self, limit: int = 3) -> List[int]:
+        counts = sorted(
+            ((uid, len(state.words)) for uid, state in self.users.items()),
+            key=lambda x: (-x[1], x[0]),
+        )
+        return [uid for uid, _ in counts[:limit]]
+
+    def user_unique_words(self) -> Dict[int, set]:
+        return {uid: set(state.words) for uid, state in self.users.items()}
+
+    def all_users(self) -> List[int]:
+        return sorted(self.users)
+
+    def all_flag_reasons(self) -> List[str]:
+        present = {flag for flag, count in self.flag_counts.items() if count > 0}
+        return sorted(present | REQUIRED_FLAG_REASONS)
+
+    def summary(self) -> dict:
+        return {
+            "top_three_users": self.top_users(),
+            "common_words": self.common_words(),
+            "bot_count": self.flag_counts.get(FLAG_BOT, 0),
+            "short_title_count": self.flag_counts.get(FLAG_SHORT_TITLE, 0),
+            "duplicate_count": self.flag_counts.get(FLAG_DUPLICATE, 0),
+            "all_users": self.all_users(),
+            "all_flag_reasons": self.all_flag_reasons(),
+        }
+
+    # ------------------------
+    # Database
+    # ------------------------
+
+    async def load(self, db: AsyncSession):
+        async with self._lock:
+            if self.loaded:
+                return
+            with span("load_posts"):
+                rows = await load_partitions(db.bind, POSTS_PARTITIONS)
+            with span("assign_flags"):
+                changed = await self.apply_async(rows)
+            await save_flags(db, changed, self.post_users)
+            await self._save_summary(db, self.summary())
+            self.loaded = True
+
+    async def catch_up(self, db: AsyncSession):
+        """Drop the state if another worker stored a summary since this one.
+
+        Callers hold ``POSTS_LOCK``, so no other worker writes in between.
+        """
+        if not self.loaded:
+            return
+        stored = await read_summary(db)
+        async with self._lock:
+            if stored is not None and stored.refreshed_at != self.version:
+                self._reset()
+
+    async def refresh(self, db: AsyncSession) -> PostSummary:
+        await self.catch_up(db)
+        await self.load(db)
+        async with self._lock:
+            summary = self.summary()
+        return await self._save_summary(db, summary)
+
+    async def _save_summary(self, db: AsyncSession, summary: dict) -> PostSummary:
+        row = await save_summary(db, await self.aggregate(db, summary))
+        self.version = row.refreshed_at
+        return row
+
+    async def aggregate(self, db: AsyncSession, summary: dict) -> dict:
+        if self.aggregation == "sql":
+            summary["common_words"] = await common_words_sql(db)
+            summary["top_three_users"] = await top_users_sql(db)
+        return summary
+
+    async def ingest(
+        self, db: AsyncSession, posts: Iterable
+    ) -> Dict[int, Optional[str]]:
+        # A first load may or may not see these rows; applying them again
+        # afterwards is a no-op for the ones it already picked up.
+        posts = list(posts)
+        if posts:
+            await self.catch_up(db)
+        await self.load(db)
+        if not posts:
+            return {}
+        async with self._lock:
+            with span("assign_flags"):
+                changed = await self.apply_async(posts)
+            summary = self.summary()
+        await save_flags(db, changed, self.post_users)
+        await self._save_summary(db, summary)
+        return changed
+
+
+async def load_post_columns(
+    db: AsyncSession, batch_size: int = 5000, partition: Optional[int] = None
+) -> PostColumns:
+    """Every post's id, user id, title and flag, without bodies or ORM state.
+
+    Rows are streamed into the columns ``batch_size`` at a time, so the full
+    result set never exists as row objects. ``partition`` reads only the
+    posts in that partition of a partitioned table.
+    """
+    columns = PostColumns()
+    source = Post.__table__ if partition is None else partition_table(partition)
+    result = await db.stream(
+        select(source.c.id, source.c.user_id, source.c.title, source.c.flag_reason)
+        .order_by(source.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        for post_id, user_id, title, flag_reason in partition:
+            columns.append(post_id, user_id, title, flag_reason)
+    return columns
+
+
+async def load_partitions(
+    engine: AsyncEngine,
+    partitions: int,
+    concurrency: int = settings.POSTS_PARTITION_CONCURRENCY,
+) -> PostColumns:
+    """``load_post_columns`` over each partition, ``concurrency`` at a time.
+
+    Every partition is read on its own connection. A user's posts all sit in
+    one partition, so each user's posts keep their id order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(partition: int) -> PostColumns:
+        async with semaphore, AsyncSession(engine) as db:
+            return await load_post_columns(db, partition=partition)
+
+    columns = PostColumns()
+    for part in await asyncio.gather(*(load(i) for i in range(partitions))):
+        columns.extend(part)
+    return columns
+
+
+async def save_flags(
+    db: AsyncSession,
+    changed: Dict[int, Optional[str]],
+    owners: Dict[int, int],
+):
+    """Store new flags by post id; ``owners`` maps ids to user ids.
+
+    Posts are updated by (id, user_id), the table's primary key, so each row
+    is looked up in its own partition only.
+    """
+    if not changed:
+        return
+    rows = [
+        {"id": post_id, "user_id": owners[post_id], "flag_reason": flag}
+        for post_id, flag in changed.items()
+    ]
+    with span("save_flags"):
+        await db.execute(update(Post), rows)
+        await db.commit()
+    count_cache.invalidate()
+    post_loader.invalidate()
+
+
+async def save_summary(db: AsyncSession, summary: dict) -> PostSummary:
+    values = dict(summary, refreshed_at=datetime.now(timezone.utc))
+    stmt = (
+        insert(PostSummary)
+        .values(key=POSTS_SUMMARY_KEY, **values)
+        .on_conflict_do_update(index_elements=[PostSummary.key], set_=values)
+        .returning(PostSummary)
+    )
+    with span("save_summary"):
+        row = await db.scalar(stmt, execution_options={"populate_existing": True})
+        await db.commit()
+    # New flags were written just before; cached responses are now stale
+    await response_cache.invalidate()
+    return row
+
+
+async def read_summary(db: AsyncSession) -> Optional[PostSummary]:
+    with span("read_summary"):
+        return await db.get(PostSummary, POSTS_SUMMARY_KEY, populate_existing=True)
+
+
+summary_flight = SingleFlight()
+
+
+async def ensure_summary(
+    analyzer: IncrementalAnalyzer, db: AsyncSession
+) -> PostSummary:
+    """The stored summary, building it with ``analyzer`` if there is none.
+
+    Requests arriving together share one build in this process, and the
+    advisory lock holds other workers back until it is stored; they then
+    read it instead of loading and flagging every post themselves.
+    """
+
+    async def build() -> PostSummary:
+        async with advisory_lock(db.bind, POSTS_LOCK):
+            # Another worker may have stored it while this one waited
+            summary = await read_summary(db)
+            if summary is None:
+                summary = await analyzer.refresh(db)
+            return summary
+
+    return await summary_flight.do("summary", build)
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.core.settings import settings
+from app.services.metrics import EXECUTOR_TASKS
+
+EXECUTOR_MODES = ("process", "thread", "inline")
+
+
+def partition_by_user(rows: Sequence, parts: int) -> List[list]:
+    """Split rows into at most ``parts`` lists, never splitting a user.
+
+    Users are placed largest first into the currently smallest partition so
+    the partitions end up with roughly the same number of posts.
+    """
+    by_user: Dict[int, list] = defaultdict(list)
+    for row in rows:
+        by_user[row.user_id].append(row)
+
+    heap = [(0, i, []) for i in range(max(1, min(parts, len(by_user))))]
+    for user_rows in sorted(by_user.values(), key=len, reverse=True):
+        size, i, partition = heapq.heappop(heap)
+        partition.extend(user_rows)
+        heapq.heappush(heap, (size + len(user_rows), i, partition))
+
+    return [partition for _, _, partition in sorted(heap) if partition]
+
+
+def _run_timed(fn: Callable, rows: list):
+    start = time.perf_counter()
+    result = fn(rows)
+    return result, time.perf_counter() - start
+
+
+class AnalysisExecutor:
+    """Runs per-user analysis off the event loop.
+
+    Inputs below ``inline_threshold`` posts run inline, inputs below
+    ``process_threshold`` go to a thread pool and anything larger is split by
+    ``user_id`` across a process pool. ``fn`` must be a module-level function
+    taking a list of rows so it can be pickled.
+    """
+
+    def __init__(
+        self,
+        mode: str = settings.ANALYSIS_EXECUTOR,
+        max_workers: int = settings.ANALYSIS_WORKERS,
+        inline_threshold: int = settings.ANALYSIS_INLINE_THRESHOLD,
+        process_threshold: int = settings.ANALYSIS_PROCESS_THRESHOLD,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Invalid analysis executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.inline_threshold = inline_threshold
+        self.process_threshold = process_threshold
+
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+        self.tasks_total = 0
+        self.task_seconds_total = 0.0
+        self.task_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    def should_offload(self, size: int) -> bool:
+        return self.mode != "inline" and size >= self.inline_threshold
+
+    def _pool_for(self, size: int) -> Optional[Executor]:
+        if not self.should_offload(size):
+            return None
+        if self.mode == "thread" or size < self.process_threshold:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="analysis"
+                )
+            return self._threads
+        if self._processes is None:
+            # spawn: forking a process that runs an event loop is not safe
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._processes
+
+    async def map_users(self, fn: Callable, rows: Sequence) -> list:
+        pool = self._pool_for(len(rows))
+        if pool is None:
+            result, elapsed = _run_timed(fn, list(rows))
+            self._record(elapsed, 0.0)
+            return [result]
+
+        loop = asyncio.get_running_loop()
+        partitions = partition_by_user(rows, self.max_workers)
+        return await asyncio.gather(
+            *(self._submit(loop, pool, fn, partition) for partition in partitions)
+        )
+
+    async def _submit(self, loop, pool: Executor, fn: Callable, rows: list):
+        self.queue_depth += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        submitted = time.perf_counter()
+        try:
+            result, elapsed = await loop.run_in_executor(pool, _run_timed, fn, rows)
+        finally:
+            self.queue_depth -= 1
+        self._record(elapsed, time.perf_counter() - submitted - elapsed)
+        return result
+
+    def _record(self, elapsed: float, waited: float):
+        self.tasks_total += 1
+        EXECUTOR_TASKS.inc()
+        self.task_seconds_total += elapsed
+        self.task_seconds_max = max(self.task_seconds_max, elapsed)
+        self.wait_seconds_total += max(0.0, waited)
+
+    def metrics(self) -> dict:
+        return {
+            "mode": self.mode,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "tasks_total": self.tasks_total,
+            "task_seconds_total": self.task_seconds_total,
+            "task_seconds_max": self.task_seconds_max,
+            "wait_seconds_total": self.wait_seconds_total,
+        }
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_COLUMNS = ["id", "user_id", "title", "body", "flag_reason"]
+
+# Rows fetched per round trip of the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+
+def encode_ndjson(rows, header: bool = False) -> str:
+    return "".join(json.dumps(dict(row._mapping)) + "\n" for row in rows)
+
+
+def encode_csv(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(tuple(row) for row in rows)
+    return buffer.getvalue()
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+async def export_rows(
+    db: AsyncSession,
+    query,
+    fmt: str = "ndjson",
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """Encode ``query`` rows batch by batch from a server-side cursor.
+
+    Only one batch is held in memory at a time. Streaming stops as soon as
+    ``is_disconnected`` reports the client went away.
+    """
+    encode = ENCODERS[fmt]
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    try:
+        first = True
+        async for rows in result.partitions():
+            if is_disconnected is not None and await is_disconnected():
+                break
+            yield encode(rows, header=first)
+            first = False
+        if first and fmt == "csv":
+            yield encode([], header=True)
+    finally:
+        await result.close()
+        # Ends the read transaction the cursor lived in
+        await db.rollback()
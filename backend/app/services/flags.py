@@ -0,0 +1,264 @@
+from array import array
+from bisect import insort
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.services.similarity import count_similar, count_similar_pairs
+
+if TYPE_CHECKING:
+    from app.db.models.post import Post
+
+# Kept free of database imports so worker processes can load it cheaply.
+
+FLAG_BOT = "Bot"
+FLAG_DUPLICATE = "Duplicate"
+FLAG_SHORT_TITLE = "Short title"
+REQUIRED_FLAG_REASONS = {FLAG_BOT, FLAG_SHORT_TITLE, FLAG_DUPLICATE}
+
+SHORT_TITLE_LENGTH = 15
+# A user is a bot once more than this many of their title pairs are similar.
+BOT_SIMILAR_PAIRS = 5
+
+
+class PostRow(NamedTuple):
+    id: int
+    user_id: int
+    title: str
+    flag_reason: Optional[str] = None
+
+
+# flag_reason <-> one-byte code in PostColumns
+FLAG_CODES = (None, FLAG_BOT, FLAG_DUPLICATE, FLAG_SHORT_TITLE)
+_FLAG_CODE = {flag: code for code, flag in enumerate(FLAG_CODES)}
+
+
+class PostColumns:
+    """Posts held column by column for analytics.
+
+    Ids and user ids live in ``array("i")`` (4 bytes each) and flags in a
+    byte per post, next to a plain list of titles; there is no per-post
+    object. Iterating yields short-lived ``PostRow`` tuples.
+    """
+
+    __slots__ = ("ids", "user_ids", "titles", "flags")
+
+    def __init__(self, rows: Iterable = ()):
+        self.ids = array("i")
+        self.user_ids = array("i")
+        self.titles: List[str] = []
+        self.flags = array("b")
+        for row in rows:
+            self.append(row[0], row[1], row[2], row[3] if len(row) > 3 else None)
+
+    def append(
+        self, post_id: int, user_id: int, title: str, flag_reason: Optional[str]
+    ):
+        self.ids.append(post_id)
+        self.user_ids.append(user_id)
+        self.titles.append(title)
+        self.flags.append(_FLAG_CODE[flag_reason])
+
+    def extend(self, other: "PostColumns"):
+        self.ids.extend(other.ids)
+        self.user_ids.extend(other.user_ids)
+        self.titles.extend(other.titles)
+        self.flags.extend(other.flags)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[PostRow]:
+        for post_id, uid, title, code in zip(
+            self.ids, self.user_ids, self.titles, self.flags
+        ):
+            yield PostRow(post_id, uid, title, FLAG_CODES[code])
+
+    def user_titles(self) -> Dict[int, List[str]]:
+        """Each user's distinct titles, in post order."""
+        titles: Dict[int, dict] = defaultdict(dict)
+        for uid, title in zip(self.user_ids, self.titles):
+            titles[uid][title] = None
+        return {uid: list(user) for uid, user in titles.items()}
+
+    def user_words(self) -> Dict[int, set]:
+        words: Dict[int, set] = defaultdict(set)
+        for uid, title in zip(self.user_ids, self.titles):
+            words[uid].update(title.lower().split())
+        return words
+
+
+# -----------------------------
+# Categorize & Analyze Posts
+# -----------------------------
+
+
+def categorize_posts(posts: "List[Post] | PostColumns"):
+    """Per-post reasons and per-user groupings of ``posts``.
+
+    For ``PostColumns``, ``user_posts`` holds each user's post ids in an
+    ``array("i")`` instead of the post objects.
+    """
+    reasons: Dict[int, str] = {}
+    user_titles = defaultdict(list)
+    user_titles_set = defaultdict(set)
+    user_unique_words = defaultdict(set)
+    word_count = Counter()
+
+    if isinstance(posts, PostColumns):
+        user_posts = defaultdict(lambda: array("i"))
+        # The id stands in for the post
+        items = zip(posts.ids, posts.user_ids, posts.titles, posts.ids)
+    else:
+        user_posts = defaultdict(list)
+        items = ((post.id, post.user_id, post.title, post) for post in posts)
+
+    for post_id, uid, title, post in items:
+        if len(title) < SHORT_TITLE_LENGTH:
+            reasons[post_id] = FLAG_SHORT_TITLE
+
+        if title in user_titles_set[uid]:
+            reasons[post_id] = FLAG_DUPLICATE
+        else:
+            user_titles_set[uid].add(title)
+            user_titles[uid].append(title)
+
+        user_posts[uid].append(post)
+
+        # Count words
+        words = set(title.lower().split())
+        user_unique_words[uid].update(words)
+        word_count.update(words)
+
+    return reasons, user_titles, user_posts, word_count, user_unique_words
+
+
+def detect_bot_users(user_titles: "Dict[int, List[str]] | PostColumns") -> List[int]:
+    if isinstance(user_titles, PostColumns):
+        user_titles = user_titles.user_titles()
+    return [
+        uid
+        for uid, titles in user_titles.items()
+        if count_similar_pairs(titles, BOT_SIMILAR_PAIRS + 1) > BOT_SIMILAR_PAIRS
+    ]
+
+
+def assign_flag_reasons(posts: List["Post"]):
+    reasons, user_titles, user_posts, word_count, user_unique_words = categorize_posts(
+        posts
+    )
+    bot_users = detect_bot_users(user_titles)
+
+    # Mark all bots
+    for uid in bot_users:
+        for post in user_posts[uid]:
+            reasons[post.id] = FLAG_BOT
+
+    # Reset and assign in a single loop
+    for post in posts:
+        post.flag_reason = reasons.get(post.id, None)
+
+    return reasons, user_titles, user_posts, word_count, user_unique_words
+
+
+def get_top_users(user_unique_words: "Dict[int, set] | PostColumns") -> List[int]:
+    if isinstance(user_unique_words, PostColumns):
+        user_unique_words = user_unique_words.user_words()
+    user_word_counts = [(uid, len(words)) for uid, words in user_unique_words.items()]
+    user_word_counts.sort(key=lambda x: x[1], reverse=True)
+    return [uid for uid, _ in user_word_counts[:3]]
+
+
+# -----------------------------
+# Per-user State
+# -----------------------------
+
+
+def title_words(title: str) -> set:
+    return set(title.lower().split())
+
+
+class UserState:
+    __slots__ = ("posts", "titles", "words", "similar_pairs")
+
+    def __init__(self):
+        # post id -> title
+        self.posts: Dict[int, str] = {}
+        # distinct title -> sorted ids of the posts using it
+        self.titles: Dict[str, List[int]] = {}
+        # word -> number of this user's posts containing it
+        self.words: Counter = Counter()
+        # similar distinct-title pairs, exact up to BOT_SIMILAR_PAIRS + 1
+        self.similar_pairs = 0
+
+    @property
+    def is_bot(self) -> bool:
+        return self.similar_pairs > BOT_SIMILAR_PAIRS
+
+    def add(self, post_id: int, title: str, count_pairs: bool = True) -> set:
+        ids = self.titles.get(title)
+        if ids is None:
+            if count_pairs and not self.is_bot:
+                self.similar_pairs += count_similar(
+                    title, self.titles, BOT_SIMILAR_PAIRS + 1 - self.similar_pairs
+                )
+            self.titles[title] = [post_id]
+        else:
+            insort(ids, post_id)
+
+        self.posts[post_id] = title
+        words = title_words(title)
+        self.words.update(words)
+        return words
+
+    def remove(self, post_id: int) -> set:
+        title = self.posts.pop(post_id)
+
+        ids = self.titles[title]
+        ids.remove(post_id)
+        if not ids:
+            del self.titles[title]
+            if self.is_bot:
+                # The capped count can't be decremented, so count again
+                self.recount_pairs()
+            else:
+                self.similar_pairs -= count_similar(title, self.titles)
+
+        words = title_words(title)
+        discard_words(self.words, words)
+        return words
+
+    def recount_pairs(self):
+        self.similar_pairs = count_similar_pairs(
+            list(self.titles), BOT_SIMILAR_PAIRS + 1
+        )
+
+    def flag(self, post_id: int) -> Optional[str]:
+        title = self.posts[post_id]
+        if self.is_bot:
+            return FLAG_BOT
+        if self.titles[title][0] != post_id:
+            return FLAG_DUPLICATE
+        if len(title) < SHORT_TITLE_LENGTH:
+            return FLAG_SHORT_TITLE
+        return None
+
+
+def discard_words(counter: Counter, words: Iterable[str]):
+    for word in words:
+        counter[word] -= 1
+        if counter[word] <= 0:
+            del counter[word]
+
+
+def build_user_states(rows: Iterable[PostRow]) -> Dict[int, UserState]:
+    """Build per-user state from scratch; runs in executor workers."""
+    states: Dict[int, UserState] = {}
+    for row in rows:
+        state = states.get(row.user_id)
+        if state is None:
+            state = states[row.user_id] = UserState()
+        state.add(row.id, row.title, count_pairs=False)
+
+    for state in states.values():
+        state.recount_pairs()
+    return states
@@ -0,0 +1,359 @@
+import asyncio
+import logging
+import random
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import AsyncIterable, Iterable, Iterator, List, NamedTuple, Optional
+
+import httpx
+from sqlalchemy import Integer, any_, bindparam, delete, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.db.models.post import Post
+from app.db.session import AsyncSessionLocal
+from app.services.analysis import POSTS_LOCK, IncrementalAnalyzer
+from app.services.metrics import span
+from app.services.pagination import count_cache
+from app.services.post_loader import post_loader
+from app.services.response_cache import response_cache
+from app.services.search import SearchIndex
+from app.services.single_flight import advisory_lock
+from app.services.sources import PostSource, fetch_source, load_sources
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------
+# Fetch Posts from API
+# ------------------------
+
+# 4 bind parameters per row keeps a batch well under asyncpg's 32767 limit
+UPSERT_BATCH_SIZE = 5000
+# Parsed batches waiting for the database, across all sources
+INGEST_QUEUE_SIZE = 4
+
+
+class IngestResult(NamedTuple):
+    inserted: int
+    updated: int
+    unchanged: int
+    # id, user_id, title, flag_reason of every inserted or updated row
+    posts: list
+    # Names of sources that could not be fetched
+    failed: tuple = ()
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated)
+
+
+def upstream_rows(raw_posts: Iterable[dict]) -> Iterator[dict]:
+    for p in raw_posts:
+        yield {
+            "id": int(p["id"]),
+            "user_id": int(p["userId"]),
+            "title": str(p["title"]),
+            "body": str(p["body"]),
+        }
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _upsert_statement():
+    stmt = insert(Post)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        # A partitioned table's primary key includes the partition key
+        index_elements=[Post.id, Post.user_id],
+        set_={
+            "user_id": excluded.user_id,
+            "title": excluded.title,
+            "body": excluded.body,
+        },
+        # Identical rows are left alone and so not returned below
+        where=or_(
+            Post.user_id.is_distinct_from(excluded.user_id),
+            Post.title.is_distinct_from(excluded.title),
+            Post.body.is_distinct_from(excluded.body),
+        ),
+    ).returning(Post.id, Post.user_id, Post.title, Post.flag_reason)
+
+
+async def _prepare_partitioned(db: AsyncSession, batch: List[dict]) -> set:
+    """Ids in ``batch`` that already exist, after moving posts between users.
+
+    Partitioned tables can't return xmax, so existing ids are looked up
+    first. A post whose user changed belongs in another partition: its old
+    row is deleted and the upsert inserts it again. Syncs hold ``POSTS_LOCK``,
+    so nothing writes posts in between.
+    """
+    ids = bindparam("ids", type_=ARRAY(Integer))
+    result = await db.execute(
+        select(Post.id, Post.user_id).where(Post.id == any_(ids)),
+        {"ids": [row["id"] for row in batch]},
+    )
+    owners = dict(result.all())
+    moved = [
+        row["id"]
+        for row in batch
+        if row["id"] in owners and owners[row["id"]] != row["user_id"]
+    ]
+    if moved:
+        await db.execute(delete(Post).where(Post.id == any_(ids)), {"ids": moved})
+    return set(owners)
+
+
+async def upsert_batches(
+    db: AsyncSession, batches: AsyncIterable[List[dict]]
+) -> IngestResult:
+    inserted = updated = total = 0
+    posts = []
+    stmt = _upsert_statement()
+
+    async for batch in batches:
+        # ON CONFLICT can't touch the same row twice in one statement; the
+        # last copy of a post wins
+        batch = list({row["id"]: row for row in batch}.values())
+        total += len(batch)
+        with span("upsert_posts"):
+            existing = await _prepare_partitioned(db, batch)
+            result = await db.execute(stmt.values(batch))
+        for row in result.all():
+            if row.id not in existing:
+                inserted += 1
+            else:
+                updated += 1
+            posts.append(row)
+    await db.commit()
+
+    if inserted or updated:
+        count_cache.invalidate()
+        post_loader.invalidate()
+        await response_cache.invalidate()
+    return IngestResult(inserted, updated, total - inserted - updated, posts)
+
+
+async def upsert_posts(
+    db: AsyncSession, rows: Iterable[dict], batch_size: int = UPSERT_BATCH_SIZE
+) -> IngestResult:
+    async def batches():
+        for batch in _batches(rows, batch_size):
+            yield batch
+
+    return await upsert_batches(db, batches())
+
+
+async def fetch_sources(
+    db: AsyncSession,
+    client: httpx.AsyncClient,
+    sources: List[PostSource],
+    batch_size: int = UPSERT_BATCH_SIZE,
+    queue_size: int = INGEST_QUEUE_SIZE,
+) -> IngestResult:
+    """Fetch every source concurrently and upsert rows as they are parsed.
+
+    Sources hand batches to one upserting consumer through a bounded queue,
+    so a slow database holds back the fetches instead of buffering payloads.
+    A failing source is logged and skipped; the sync fails only when every
+    source does.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    failed: List[str] = []
+    errors: List[Exception] = []
+
+    async def produce(source: PostSource):
+        try:
+            await fetch_source(client, source, queue.put, batch_size)
+        except Exception as e:
+            logger.warning("Fetching posts from %s failed: %s", source.name, e)
+            failed.append(source.name)
+            errors.append(e)
+        # Not in a finally: once the consumer is gone, a producer cancelled
+        # while blocked on the full queue would block on it again
+        await queue.put(None)
+
+    async def batches():
+        remaining = len(sources)
+        while remaining:
+            batch = await queue.get()
+            if batch is None:
+                remaining -= 1
+            else:
+                yield batch
+        if failed and len(failed) == len(sources):
+            # Nothing is committed
+            raise errors[0]
+
+    producers = [asyncio.create_task(produce(source)) for source in sources]
+    try:
+        result = await upsert_batches(db, batches())
+    finally:
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+
+    return result._replace(failed=tuple(failed))
+
+
+async def fetch_posts(
+    db: AsyncSession,
+    client: httpx.AsyncClient,
+    url: str = settings.POSTS_SOURCE_URL,
+) -> IngestResult:
+    return await fetch_sources(db, client, [PostSource("default", url)])
+
+
+# ------------------------
+# Background Scheduler
+# ------------------------
+
+
+class IngestionScheduler:
+    """Polls the upstream post stores in the background.
+
+    ``sources`` defaults to ``POSTS_SOURCES``, or to the single store at
+    ``url`` when that is unset. One pooled ``httpx.AsyncClient`` is shared
+    by every source and sync. Successful syncs
+    are spaced by ``interval`` (+/- ``jitter`` as a fraction of the delay);
+    failures back off exponentially from ``retry_base`` up to ``max_backoff``.
+    Newly ingested posts are handed to the ``analyzer`` so flags stay current.
+
+    Every worker process runs a scheduler; ``sync_lock`` names the advisory
+    lock that makes their syncs, and summary builds, take turns rather than
+    write the same rows at once (None: no lock).
+    """
+
+    def __init__(
+        self,
+        url: str = settings.POSTS_SOURCE_URL,
+        sources: Optional[List[PostSource]] = None,
+        interval: float = settings.INGESTION_INTERVAL,
+        jitter: float = settings.INGESTION_JITTER,
+        retry_base: float = settings.INGESTION_RETRY_BASE,
+        max_backoff: float = settings.INGESTION_MAX_BACKOFF,
+        timeout: float = settings.INGESTION_TIMEOUT,
+        max_connections: int = settings.INGESTION_MAX_CONNECTIONS,
+        analyzer: Optional[IncrementalAnalyzer] = None,
+        search_index: Optional[SearchIndex] = None,
+        session_factory=AsyncSessionLocal,
+        sync_lock: Optional[str] = POSTS_LOCK,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if sources is None:
+            sources = load_sources(settings.POSTS_SOURCES, url)
+        self.sources = sources
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.analyzer = analyzer
+        self.search_index = search_index
+        self.session_factory = session_factory
+        self.sync_lock = sync_lock
+        self.transport = transport
+
+        self.client: Optional[httpx.AsyncClient] = None
+        self.last_synced_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            transport=self.transport,
+        )
+
+    async def start(self):
+        if self._task is not None:
+            return
+        if self.client is None:
+            self.client = self._build_client()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def next_delay(self) -> float:
+        if self.failures:
+            delay = min(self.max_backoff, self.retry_base * 2 ** (self.failures - 1))
+        else:
+            delay = self.interval
+        spread = delay * self.jitter
+        return max(0.0, delay + random.uniform(-spread, spread))
+
+    async def sync_once(self) -> IngestResult:
+        if self.client is None:
+            self.client = self._build_client()
+
+        async with self.session_factory() as db:
+            lock = nullcontext()
+            if self.sync_lock is not None:
+                lock = advisory_lock(db.bind, self.sync_lock)
+            async with lock:
+                if self.search_index is not None:
+                    await self.search_index.catch_up(db)
+                result = await fetch_sources(db, self.client, self.sources)
+                # Before the analyzer, whose summary save invalidates cached
+                # responses
+                if self.search_index is not None:
+                    self.search_index.apply(result.posts)
+                if self.analyzer is not None:
+                    await self.analyzer.ingest(db, result.posts)
+                    if self.search_index is not None and result.posts:
+                        # The summary this sync stored covers what it applied
+                        self.search_index.version = self.analyzer.version
+
+        self.last_synced_at = datetime.now(timezone.utc)
+        self.last_error = None
+        if result.failed:
+            self.last_error = f"Failed sources: {', '.join(result.failed)}"
+        self.failures = 0
+        return result
+
+    async def _run(self):
+        while True:
+            try:
+                result = await self.sync_once()
+                logger.info(
+                    "Ingested posts from %s: %d inserted, %d updated, %d unchanged",
+                    ", ".join(source.name for source in self.sources),
+                    result.inserted,
+                    result.updated,
+                    result.unchanged,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning(
+                    "Post ingestion failed (attempt %d): %s", self.failures, e
+                )
+            await asyncio.sleep(self.next_delay())
@@ -0,0 +1,195 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+registry = CollectorRegistry()
+
+STAGE_SECONDS = Histogram(
+    "adinsights_stage_seconds",
+    "Time spent in each stage of ingestion and analyze-posts",
+    ["stage"],
+    registry=registry,
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "adinsights_db_pool_checkout_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+    registry=registry,
+)
+QUERY_SECONDS = Histogram(
+    "adinsights_db_query_seconds",
+    "Database statement execution time",
+    registry=registry,
+)
+SLOW_QUERIES = Counter(
+    "adinsights_db_slow_queries_total",
+    "Statements slower than SLOW_QUERY_SECONDS",
+    registry=registry,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "adinsights_db_pool_connections",
+    "Pooled database connections by engine (read/write) and state",
+    ["engine", "state"],
+    registry=registry,
+)
+DB_PREPARED_STATEMENTS = Gauge(
+    "adinsights_db_prepared_statements",
+    "Prepared statements cached by the driver on idle pooled connections",
+    ["engine"],
+    registry=registry,
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "adinsights_single_flight_calls_total",
+    "Calls that started a run (leader) or joined one in flight (shared)",
+    ["key", "role"],
+    registry=registry,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "adinsights_admission_in_flight",
+    "Requests holding an admission slot, by route",
+    ["route"],
+    registry=registry,
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "adinsights_admission_queue_depth",
+    "Requests waiting for an admission slot, by route",
+    ["route"],
+    registry=registry,
+)
+ADMISSION_REJECTED = Counter(
+    "adinsights_admission_rejected_total",
+    "Requests shed with a 503, by route and reason (queue_full, timeout)",
+    ["route", "reason"],
+    registry=registry,
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "adinsights_analysis_queue_depth",
+    "Analysis tasks waiting for or running in the executor",
+    registry=registry,
+)
+EXECUTOR_TASKS = Counter(
+    "adinsights_analysis_tasks_total",
+    "Analysis tasks run by the executor",
+    registry=registry,
+)
+
+# ------------------------
+# Stage spans
+# ------------------------
+
+# Per-request stage timings, collected only while ``collect_timings`` is active
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings():
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+# ------------------------
+# Database instrumentation
+# ------------------------
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
+# Instrumented engines and, per engine, prepared statements cached on each
+# pooled connection as of its last checkin
+_engines: Dict[str, object] = {}
+_prepared_statements: Dict[str, Dict[int, int]] = {}
+
+
+def instrument_engine(
+    engine,
+    slow_query_seconds: float = settings.SLOW_QUERY_SECONDS,
+    role: str = "write",
+):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    _engines[role] = sync_engine
+    statements = _prepared_statements.setdefault(role, {})
+
+    @event.listens_for(sync_engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        # The asyncpg adapter's LRU of prepared statements
+        cache = getattr(dbapi_connection, "_prepared_statement_cache", None)
+        statements[id(connection_record)] = len(cache) if cache else 0
+
+    @event.listens_for(sync_engine, "close")
+    def close(dbapi_connection, connection_record):
+        statements.pop(id(connection_record), None)
+
+    def observe(elapsed: float, statement: str):
+        QUERY_SECONDS.observe(elapsed)
+        if elapsed >= slow_query_seconds:
+            SLOW_QUERIES.inc()
+            logger.warning("Slow query (%.3fs): %s", elapsed, statement[:500])
+
+    # The start lives on the execution context, which is dropped with the
+    # statement whether or not it fails
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        observe(time.perf_counter() - context._query_start, statement)
+
+    # Failed statements don't reach after_cursor_execute; errors raised
+    # before the cursor ran have no start to time
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        start = getattr(exception_context.execution_context, "_query_start", None)
+        if start is not None:
+            observe(time.perf_counter() - start, exception_context.statement or "")
+
+
+def update_pool_metrics():
+    for role, sync_engine in _engines.items():
+        pool = sync_engine.pool
+        DB_POOL_CONNECTIONS.labels(role, "checked_out").set(pool.checkedout())
+        DB_POOL_CONNECTIONS.labels(role, "idle").set(pool.checkedin())
+        DB_PREPARED_STATEMENTS.labels(role).set(
+            sum(_prepared_statements[role].values())
+        )
+
+
+def update_executor_metrics(executor):
+    metrics = executor.metrics()
+    EXECUTOR_QUEUE_DEPTH.set(metrics["queue_depth"])
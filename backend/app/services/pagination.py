@@ -1,7 +1,351 @@
-from sqlalchemy import select, func, text, desc, asc, or_, and_, bindparam
+import base64
+import json
+import time
+from collections import OrderedDict
+from sqlalchemy import select, func, text, desc, asc, or_, and_, bindparam, tuple_
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Type
+from typing import Callable, Optional, Type
+
+from app.core.settings import settings
+from app.services.metrics import span
+
+COUNT_STRATEGIES = ("exact", "cached", "estimated")
+
+# Renders ":name" placeholders, which text() accepts back for EXPLAIN
+_named_dialect = postgresql.dialect(paramstyle="named")
+
+# ------------------------
+# Cursors
+# ------------------------
+
+
+def encode_cursor(ordering: str, direction: str, values: list) -> str:
+    payload = json.dumps({"o": ordering, "d": direction, "v": values})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: str, columns: list = ()) -> tuple:
+    """Return ``(direction, values)`` from a cursor issued for ``ordering``.
+
+    ``columns`` are the columns the values were read from (the order column,
+    then id); each value must be a non-null instance of its column's type.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values = payload["d"], payload["v"]
+        cursor_ordering = payload["o"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if (
+        direction not in ("next", "prev")
+        or not isinstance(values, list)
+        or len(values) != 2
+    ):
+        raise ValueError("Invalid cursor")
+    if cursor_ordering != ordering:
+        raise ValueError("Cursor does not match the requested ordering")
+    for value, col in zip(values, columns):
+        if not _is_value_of(value, col):
+            raise ValueError("Invalid cursor")
+    return direction, values
+
+
+def _is_value_of(value, col) -> bool:
+    try:
+        expected = col.type.python_type
+    except NotImplementedError:
+        return value is not None
+    # JSON true/false would otherwise pass for integer columns
+    if isinstance(value, bool) and expected is not bool:
+        return False
+    return isinstance(value, expected)
+
+
+# ------------------------
+# Counts
+# ------------------------
+
+
+class CountCache:
+    """LRU/TTL cache of exact counts keyed by the normalized count query.
+
+    Ingestion calls ``invalidate`` after writing; the generation check stops a
+    count that was started before an invalidation from being stored after it.
+    Other workers' writes don't reach this process's cache, so callers that
+    know the data version put it in the key (see ``paginate_composite``).
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.COUNT_CACHE_SIZE,
+        ttl: float = settings.COUNT_CACHE_TTL,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value: int, generation: int):
+        if generation != self.generation:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+count_cache = CountCache()
+
+
+def _count_key(query, *extra) -> tuple:
+    compiled = query.compile(dialect=_named_dialect)
+    params = tuple(sorted((k, repr(v)) for k, v in compiled.params.items()))
+    return (compiled.string, params) + extra
+
+
+async def estimate_rows(db: AsyncSession, query, params: dict = None) -> int:
+    compiled = query.compile(dialect=_named_dialect)
+    result = await db.execute(
+        text(f"EXPLAIN (FORMAT JSON) {compiled.string}"),
+        {**compiled.params, **(params or {})},
+    )
+    return int(result.scalar_one()[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+    db: AsyncSession,
+    model,
+    filters: list,
+    strategy: str = "exact",
+    estimate_threshold: int = settings.COUNT_ESTIMATE_THRESHOLD,
+    cache_key: tuple = (),
+    query=None,
+    params: dict = None,
+    query_key: tuple = None,
+) -> tuple[int, bool]:
+    """Return ``(count, is_exact)`` for ``model`` rows matching ``filters``.
+
+    A prebuilt count ``query`` taking bind ``params`` can be passed instead;
+    its ``query_key`` then stands in for the compiled SQL in the cache key.
+    """
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Invalid count strategy: {strategy}")
+
+    total_query = query
+    if total_query is None:
+        total_query = select(func.count()).select_from(model)
+        if filters:
+            total_query = total_query.where(*filters)
+
+    if strategy == "estimated":
+        with span("count_estimate"):
+            estimate = await estimate_rows(db, select(model.id).where(*filters), params)
+        if estimate >= estimate_threshold:
+            return estimate, False
+
+    key = None
+    if strategy == "cached":
+        if query_key is not None:
+            values = tuple(sorted((k, repr(v)) for k, v in (params or {}).items()))
+            key = (query_key, values) + cache_key
+        else:
+            key = _count_key(total_query, *cache_key)
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    generation = count_cache.generation
+    with span("count_query"):
+        total_result = await db.execute(total_query, params)
+        total_count = total_result.scalar_one()
+
+    if key is not None:
+        count_cache.set(key, total_count, generation)
+    return total_count, True
+
+
+# ------------------------
+# Query shapes
+# ------------------------
+
+
+class QueryShapeCache:
+    """LRU of statements built once per filter/order signature.
+
+    The statements take every request value as a bind parameter. A repeat
+    request skips building the select, and SQLAlchemy finds the compiled
+    SQL through the statement's memoized cache key instead of generating
+    it again.
+    """
+
+    def __init__(self, max_size: int = settings.QUERY_SHAPE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: tuple, build: Callable):
+        statement = self._entries.get(key)
+        if statement is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return statement
+        self.misses += 1
+        statement = self._entries[key] = build()
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return statement
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+query_shapes = QueryShapeCache()
+
+
+# ------------------------
+# Filters and ordering
+# ------------------------
+
+
+def uses_trigram(search: str | None) -> bool:
+    # Only words of 4+ characters go through the % operator
+    return bool(search) and any(len(word) >= 4 for word in search.split())
+
+
+async def set_trigram_threshold(
+    db: AsyncSession,
+    search: str | None,
+    trigram_threshold: float = settings.SEARCH_TRIGRAM_THRESHOLD,
+):
+    """Make the ``%`` operator use ``trigram_threshold`` in this transaction.
+
+    Connections from ``make_engine`` already start with the configured
+    threshold, and nothing is sent for them. Otherwise ``set_config(...,
+    true)`` is the parameterized ``SET LOCAL``: it ends with the transaction
+    instead of staying on the pooled connection.
+    """
+    if not uses_trigram(search):
+        return
+    conn = await db.connection()
+    if conn.info.get("trigram_threshold") == trigram_threshold:
+        return
+    await db.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+        {"threshold": str(trigram_threshold)},
+    )
+
+
+def search_params(search: str) -> tuple[tuple, dict]:
+    """Return ``(shape, bind params)`` for ``search``.
+
+    The shape says, per word, whether it also goes through the trigram
+    ``%`` operator.
+    """
+    shape = []
+    params = {}
+    for idx, word in enumerate(search.strip().split()):
+        shape.append(len(word) >= 4)
+        params[f"word{idx}"] = word
+        params[f"word{idx}_like"] = f"%{word}%"
+    return tuple(shape), params
+
+
+def search_clauses(shape: tuple, search_columns: list) -> list:
+    clauses = []
+    for idx, fuzzy in enumerate(shape):
+        word_filters = []
+        for col in search_columns:
+            if fuzzy:
+                # fuzzy search only for longer strings
+                word_filters.append(col.op("%")(bindparam(f"word{idx}")))
+            word_filters.append(col.ilike(bindparam(f"word{idx}_like")))
+        clauses.append(or_(*word_filters))
+    return clauses
+
+
+def search_filter(search: str, search_columns: list):
+    shape, params = search_params(search)
+    return and_(*search_clauses(shape, search_columns)).params(params)
+
+
+def equality_clauses(model, names: tuple) -> list:
+    return [getattr(model, name) == bindparam(f"eq_{name}") for name in names]
+
+
+def parse_ordering(model, ordering: str) -> tuple:
+    """Return ``(column name, column, "asc" | "desc")`` for ``ordering``."""
+    try:
+        if ":" in ordering:
+            col_name, direction = ordering.split(":")
+        else:
+            col_name = ordering.lstrip("-")
+            direction = "desc" if ordering.startswith("-") else "asc"
+
+        order_col = getattr(model, col_name)
+    except AttributeError:
+        raise ValueError(f"Invalid ordering column: {ordering}")
+    return col_name, order_col, direction
+
+
+def sort_keys_for(model, order_col) -> list:
+    # id breaks ties so (order column, id) is unique and can be seeked on
+    return [order_col] if order_col is model.id else [order_col, model.id]
+
+
+def _page_query(
+    model,
+    columns: list,
+    options: list,
+    filters: list,
+    sort_keys: list,
+    sort_desc: bool,
+    seek_forward: Optional[bool],
+):
+    # Plain column tuples skip ORM identity/state overhead
+    query = select(*columns) if columns else select(model)
+
+    if options:
+        for opt in options:
+            query = query.options(opt)
+
+    if filters:
+        query = query.where(*filters)
+
+    if seek_forward is not None:
+        key = tuple_(*sort_keys)
+        value = tuple_(
+            *(bindparam(f"seek{i}", type_=k.type) for i, k in enumerate(sort_keys))
+        )
+        query = query.where(key > value if seek_forward else key < value)
+
+    query = query.order_by(*(desc(k) if sort_desc else asc(k) for k in sort_keys))
+    return query.offset(bindparam("page_offset")).limit(bindparam("page_limit"))
 
 
 async def paginate_composite(
@@ -15,85 +359,144 @@ async def paginate_composite(
     ordering: str = "id:asc",
     schema: Type[BaseModel] | None = None,
     options: list = None,
-    trigram_threshold: float = 0.7,
+    columns: list = None,
+    trigram_threshold: float = settings.SEARCH_TRIGRAM_THRESHOLD,
+    cursor: str | None = None,
+    count_strategy: str = "exact",
+    estimate_threshold: int = settings.COUNT_ESTIMATE_THRESHOLD,
+    filter_by: dict = None,
+    data_version=None,
 ):
+    """One page of ``model`` rows plus total count and keyset cursors.
+
+    ``filter_by`` holds equality filters as ``{column name: value}``. With
+    no ``base_filters`` or ``options`` (arbitrary expressions), the count and
+    page statements come from ``query_shapes``. Cached counts are also keyed
+    by ``data_version`` (e.g. the stored summary's ``refreshed_at``), so a
+    count from before any worker's write isn't reused after it.
+    """
     base_filters = base_filters or []
     search_columns = search_columns or []
-    filters = list(base_filters)
+    filter_by = filter_by or {}
 
     # Set trigram threshold
-    if search and len(search) >= 4:
-        await db.execute(
-            text(f"SET pg_trgm.similarity_threshold = {trigram_threshold}")
-        )
+    await set_trigram_threshold(db, search, trigram_threshold)
 
-    # Apply search filter
+    # Filter signature and the values bound into it
+    names = tuple(sorted(filter_by))
+    params = {f"eq_{name}": filter_by[name] for name in names}
+    shape = ()
     if search and search_columns:
-        words = search.strip().split()
-        search_filters = []
-
-        for idx, word in enumerate(words):
-            word_filters = []
-            for col in search_columns:
-                if len(word) < 4:
-                    word_filters.append(col.ilike(f"%{word}%"))
-                else:
-                    # fuzzy search only for longer strings
-                    word_filters.append(
-                        text(f"{col.key} % :word{idx}").bindparams(
-                            bindparam(f"word{idx}", word)
-                        )
-                    )
-                    word_filters.append(col.ilike(f"%{word}%"))
-            search_filters.append(or_(*word_filters))
-
-        filters.append(and_(*search_filters))
+        shape, word_params = search_params(search)
+        params.update(word_params)
 
     # Parse ordering string
-    try:
-        if ":" in ordering:
-            col_name, direction = ordering.split(":")
-        else:
-            col_name = ordering.lstrip("-")
-            direction = "desc" if ordering.startswith("-") else "asc"
+    col_name, order_col, direction = parse_ordering(model, ordering)
 
-        order_col = getattr(model, col_name)
-        order_clause = desc(order_col) if direction == "desc" else asc(order_col)
-    except AttributeError:
-        raise ValueError(f"Invalid ordering column: {ordering}")
+    descending = direction == "desc"
+    sort_keys = sort_keys_for(model, order_col)
+
+    seek = None
+    seek_forward = None
+    offset = (page - 1) * page_size
+    if cursor:
+        seek, values = decode_cursor(cursor, ordering, [order_col, model.id])
+        values = values[-len(sort_keys) :]
+        # Walking backwards flips both the comparison and the sort order
+        seek_forward = (seek == "next") != descending
+        params.update({f"seek{i}": value for i, value in enumerate(values)})
+        offset = 0
+    reverse = seek == "prev"
+    sort_desc = descending != reverse
+
+    def filters() -> list:
+        return (
+            base_filters
+            + equality_clauses(model, names)
+            + search_clauses(shape, search_columns)
+        )
+
+    signature = (
+        model.__name__,
+        names,
+        shape,
+        tuple(col.key for col in search_columns),
+    )
+    cacheable = not base_filters and not options
+
+    def build_count():
+        return select(func.count()).select_from(model).where(*filters())
+
+    def build_page():
+        return _page_query(
+            model, columns, options, filters(), sort_keys, sort_desc, seek_forward
+        )
+
+    if cacheable:
+        count_query = query_shapes.get(("count",) + signature, build_count)
+        page_key = signature + (
+            tuple(col.key for col in columns or ()),
+            col_name,
+            sort_desc,
+            seek_forward,
+        )
+        page_query = query_shapes.get(("page",) + page_key, build_page)
+    else:
+        count_query = build_count()
+        page_query = build_page()
 
     # Count total
-    total_query = select(func.count()).select_from(model)
-    if filters:
-        total_query = total_query.where(*filters)
+    count_params = {k: v for k, v in params.items() if not k.startswith("seek")}
+    total_count, total_count_exact = await count_rows(
+        db,
+        model,
+        filters(),
+        strategy=count_strategy,
+        estimate_threshold=estimate_threshold,
+        # The trigram operator's result depends on the session threshold
+        cache_key=(trigram_threshold, data_version),
+        query=count_query,
+        params=count_params,
+        query_key=signature if cacheable else None,
+    )
 
-    total_result = await db.execute(total_query)
-    total_count = total_result.scalar_one()
+    params["page_offset"] = offset
+    params["page_limit"] = page_size + 1
+    with span("page_query"):
+        result = await db.execute(page_query, params)
+        items = list(result.all() if columns else result.scalars().all())
 
-    # Build main query
-    offset = (page - 1) * page_size
-    query = select(model)
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if reverse:
+        items.reverse()
 
-    if options:
-        for opt in options:
-            query = query.options(opt)
+    def cursor_for(item, seek_direction: str) -> str:
+        values = [getattr(item, col_name), item.id]
+        return encode_cursor(ordering, seek_direction, values)
 
-    if filters:
-        query = query.where(*filters)
+    if seek == "prev":
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, seek == "next" or offset > 0
 
-    query = query.order_by(order_clause).offset(offset).limit(page_size)
-    result = await db.execute(query)
-    items = result.scalars().all()
+    next_cursor = cursor_for(items[-1], "next") if items and has_next else None
+    prev_cursor = cursor_for(items[0], "prev") if items and has_prev else None
 
+    if columns:
+        items = [row._asdict() for row in items]
     if schema:
-        items = [schema.from_orm(item) for item in items]
+        items = [schema.model_validate(item) for item in items]
 
     total_pages = (total_count + page_size - 1) // page_size
 
     return {
         "total_count": total_count,
+        "total_count_exact": total_count_exact,
         "current_page": page,
         "page_size": page_size,
         "total_pages": total_pages,
         "items": items,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
     }
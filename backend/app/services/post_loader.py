@@ -0,0 +1,189 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.db.models.post import Post
+from app.db.models.post_summary import summary_version
+from app.db.session import ReadSessionLocal
+from app.services.metrics import span
+
+LOADER_COLUMNS = [Post.id, Post.user_id, Post.title, Post.body, Post.flag_reason]
+# Ids the posts.id column (int4) can hold
+POST_IDS = range(-(2**31), 2**31)
+
+
+class PostLoader:
+    """Loads posts by id, batching concurrent lookups into one query.
+
+    Ids requested within ``window`` seconds of each other are fetched together
+    with ``id = ANY(:ids)``, dataloader-style; a batch is sent early once
+    ``max_batch`` ids are waiting. Found posts are kept in a bounded LRU.
+    Ingestion calls ``invalidate`` after writing; as with the count cache,
+    the generation check stops a query started before an invalidation from
+    storing its rows after it.
+
+    Other workers' writes don't call ``invalidate`` here, so cached rows are
+    also tied to the stored summary's ``refreshed_at`` (``version``), which
+    every write moves. Each batch reads it along with its rows, and lookups
+    served from the cache re-read it at most once per ``version_poll``
+    seconds; a newer version empties the cache.
+    """
+
+    def __init__(
+        self,
+        session_factory=ReadSessionLocal,
+        window: float = settings.POST_LOADER_WINDOW,
+        max_batch: int = settings.POST_LOADER_MAX_BATCH,
+        cache_size: int = settings.POST_CACHE_SIZE,
+        version_poll: float = settings.POST_CACHE_VERSION_POLL,
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.version_poll = version_poll
+        self.generation = 0
+        self.version = None
+        self._polled_at: Optional[float] = None
+        self._cache: OrderedDict = OrderedDict()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def load(self, post_id: int) -> Optional[dict]:
+        return (await self.load_many([post_id])).get(post_id)
+
+    async def load_many(self, post_ids: Iterable[int]) -> Dict[int, dict]:
+        """Posts by id; ids that don't exist are left out."""
+        await self._poll_version()
+        loop = asyncio.get_running_loop()
+        found = {}
+        waiting = {}
+        for post_id in dict.fromkeys(post_ids):
+            if post_id not in POST_IDS:
+                # Can't be stored, and would fail the whole batch's query
+                continue
+            row = self._cache.get(post_id)
+            if row is not None:
+                self._cache.move_to_end(post_id)
+                found[post_id] = row
+                continue
+            future = self._pending.get(post_id)
+            if future is None:
+                future = self._pending[post_id] = loop.create_future()
+            waiting[post_id] = future
+
+        if waiting:
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+            # Shielded: a cancelled caller must not cancel a lookup that
+            # other requests share
+            rows = await asyncio.gather(
+                *(asyncio.shield(future) for future in waiting.values())
+            )
+            for post_id, row in zip(waiting, rows):
+                if row is not None:
+                    found[post_id] = row
+        return found
+
+    def invalidate(self):
+        self.generation += 1
+        self._cache.clear()
+
+    async def _poll_version(self):
+        # Only cached rows can be stale; batches read the version themselves
+        now = time.monotonic()
+        if not self._cache or (
+            self._polled_at is not None and now - self._polled_at < self.version_poll
+        ):
+            return
+        self._polled_at = now
+        async with self.session_factory() as db:
+            self._observe(await summary_version(db))
+
+    def _observe(self, version):
+        self._polled_at = time.monotonic()
+        if version is not None and (self.version is None or version > self.version):
+            self.version = version
+            self._cache.clear()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._fetch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[int, asyncio.Future]):
+        generation = self.generation
+        rows: Dict[int, dict] = {}
+        errors: Dict[int, Exception] = {}
+        try:
+            async with self.session_factory() as db:
+                with span("post_batch_query"):
+                    # Read first, so the rows are at least as new as it
+                    version = await summary_version(db)
+                    await self._query(db, list(batch), rows, errors)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._observe(version)
+        cacheable = generation == self.generation and version == self.version
+        for post_id, future in batch.items():
+            row = rows.get(post_id)
+            if row is not None and cacheable:
+                self._cache[post_id] = row
+            if future.done():
+                continue
+            if post_id in errors:
+                future.set_exception(errors[post_id])
+            else:
+                future.set_result(row)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _query(self, db: AsyncSession, ids: List[int], rows: dict, errors: dict):
+        """Read ``ids`` into ``rows``; ids whose query failed go to ``errors``.
+
+        A failed query is retried as two halves on the same connection, so a
+        bad id fails only its own lookup instead of the whole batch.
+        """
+        try:
+            result = await db.execute(
+                select(*LOADER_COLUMNS).where(
+                    Post.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+                )
+            )
+        except DBAPIError as e:
+            if e.connection_invalidated:
+                raise
+            await db.rollback()
+            if len(ids) == 1:
+                errors[ids[0]] = e
+                return
+            middle = len(ids) // 2
+            await self._query(db, ids[:middle], rows, errors)
+            await self._query(db, ids[middle:], rows, errors)
+            return
+        rows.update((row.id, row._asdict()) for row in result)
+
+    def __len__(self):
+        return len(self._cache)
+
+
+post_loader = PostLoader()
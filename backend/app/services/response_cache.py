@@ -0,0 +1,182 @@
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.db.models.post_summary import summary_version
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+# ------------------------
+# Backends
+# ------------------------
+
+
+class CacheBackend(ABC):
+    """Storage for cached responses and the data version they were built at.
+
+    Implementations backed by a shared store (e.g. Redis) let every worker
+    see the same entries and the same version.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: CachedResponse): ...
+
+    @abstractmethod
+    async def get_version(self) -> int: ...
+
+    @abstractmethod
+    async def bump_version(self) -> int: ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU/TTL store."""
+
+    def __init__(
+        self,
+        max_size: int = settings.RESPONSE_CACHE_SIZE,
+        ttl: float = settings.RESPONSE_CACHE_TTL,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedResponse):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_version(self) -> int:
+        return self.version
+
+    async def bump_version(self) -> int:
+        # Entries of older versions can never be hit again
+        self.version += 1
+        self._entries.clear()
+        return self.version
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ------------------------
+# Cache
+# ------------------------
+
+
+def normalize_params(params: BaseModel) -> dict:
+    """Drop the differences between params that produce the same response."""
+    values = params.model_dump()
+    search = " ".join((values.get("search") or "").split()).lower()
+    values["search"] = search or None
+    values["order_by"] = values.get("order_by") or "id:asc"
+    # user_id=0 is treated as "no filter" by the endpoint
+    values["user_id"] = values.get("user_id") or None
+    values["reason"] = values.get("reason") or None
+    return values
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    """Caches serialized responses keyed by normalized params and data version.
+
+    Ingestion calls ``invalidate`` after writing, which bumps the version;
+    a response built from older data is stored under the old version and
+    never served.
+
+    Other worker processes don't see that bump with the per-process backend,
+    so keys given a ``db`` also carry the stored summary's ``refreshed_at``,
+    which every worker's writes update. It is read at most once per
+    ``version_poll`` seconds.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        enabled: bool = settings.RESPONSE_CACHE_ENABLED,
+        version_poll: float = settings.RESPONSE_CACHE_VERSION_POLL,
+    ):
+        self.backend = backend or MemoryBackend()
+        self.enabled = enabled
+        self.version_poll = version_poll
+        self.hits = 0
+        self.misses = 0
+        self._data_version = None
+        self._polled_at: Optional[float] = None
+
+    async def data_version(self, db: AsyncSession):
+        now = time.monotonic()
+        if self._polled_at is None or now - self._polled_at >= self.version_poll:
+            self._data_version = await summary_version(db)
+            self._polled_at = now
+        return self._data_version
+
+    async def key_for(
+        self, namespace: str, params: BaseModel, db: Optional[AsyncSession] = None
+    ) -> str:
+        version = await self.backend.get_version()
+        if db is not None and self.enabled:
+            data_version = await self.data_version(db)
+            version = f"{version}:{data_version.isoformat() if data_version else ''}"
+        payload = json.dumps(normalize_params(params), sort_keys=True)
+        return f"{namespace}:{version}:{payload}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        cached = await self.backend.get(key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    async def set(self, key: str, body: bytes) -> CachedResponse:
+        cached = CachedResponse(body, make_etag(body))
+        if self.enabled:
+            await self.backend.set(key, cached)
+        return cached
+
+    async def invalidate(self):
+        await self.backend.bump_version()
+        # This worker's own write: read the new data version right away
+        self._polled_at = None
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.db.models.post import Post
+from app.db.models.post_summary import summary_version
+from app.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKENDS = ("sql", "memory")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Query words shorter than this only match exactly or as a substring,
+# like the ILIKE-only branch of the SQL search
+FUZZY_MIN_LENGTH = 4
+SUBSTRING_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+
+_token_re = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _token_re.findall(text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    # Padded like pg_trgm: two spaces in front, one behind
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Doc(NamedTuple):
+    user_id: int
+    title: str
+    tokens: Counter
+    length: int
+
+
+class SearchIndex:
+    """Inverted index over post title tokens with BM25 ranking.
+
+    Each query word expands to the indexed tokens that equal it, contain it
+    (like ``ILIKE '%word%'``) or, for words of ``FUZZY_MIN_LENGTH`` or more,
+    share at least ``fuzzy_threshold`` of their trigrams with it. A post
+    matches when every query word matches one of its tokens.
+
+    The index holds at most ``max_posts`` posts. Past that it switches itself
+    off, and callers go back to the SQL search.
+
+    Each worker process holds its own index and only applies the rows its
+    own syncs wrote. ``version`` is the stored summary's ``refreshed_at``
+    the index has caught up with; ``catch_up`` reloads it once another
+    worker has written posts since.
+    """
+
+    def __init__(
+        self,
+        max_posts: int = settings.SEARCH_INDEX_MAX_POSTS,
+        fuzzy_threshold: float = settings.SEARCH_FUZZY_THRESHOLD,
+    ):
+        self.max_posts = max_posts
+        self.fuzzy_threshold = fuzzy_threshold
+        self.enabled = True
+        self.loaded = False
+        self.version = None
+        self._lock = asyncio.Lock()
+        self._pending: Optional[list] = None
+        self._clear()
+
+    def _clear(self):
+        self.docs: Dict[int, Doc] = {}
+        # token -> {post id: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        # trigram -> tokens containing it
+        self.trigram_tokens: Dict[str, Set[str]] = {}
+        self.total_length = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self.loaded
+
+    # ------------------------
+    # Updates
+    # ------------------------
+
+    def add(self, post_id: int, user_id: int, title: str):
+        if post_id in self.docs:
+            self.remove(post_id)
+        if len(self.docs) >= self.max_posts:
+            self._disable()
+            return
+
+        tokens = Counter(tokenize(title))
+        doc = Doc(user_id, title, tokens, sum(tokens.values()))
+        self.docs[post_id] = doc
+        self.total_length += doc.length
+        for token, tf in tokens.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                for trigram in trigrams(token):
+                    self.trigram_tokens.setdefault(trigram, set()).add(token)
+            postings[post_id] = tf
+
+    def remove(self, post_id: int):
+        doc = self.docs.pop(post_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc.length
+        for token in doc.tokens:
+            postings = self.postings[token]
+            del postings[post_id]
+            if not postings:
+                del self.postings[token]
+                for trigram in trigrams(token):
+                    tokens = self.trigram_tokens[trigram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.trigram_tokens[trigram]
+
+    def apply(self, posts: Iterable):
+        if not self.enabled:
+            return
+        if not self.loaded:
+            # A load is reading the table; replay these once it is done
+            if self._pending is not None:
+                self._pending.extend(posts)
+            return
+        for post in posts:
+            self.add(post.id, post.user_id, post.title)
+
+    def _disable(self):
+        logger.warning(
+            "Search index passed %d posts; falling back to SQL search",
+            self.max_posts,
+        )
+        self.enabled = False
+        self._clear()
+
+    async def load(self, db: AsyncSession):
+        async with self._lock:
+            if self.loaded or not self.enabled:
+                return
+            self._pending = []
+            try:
+                # Read first: a write during the load moves the stored
+                # version past this one, and the next sync reloads
+                version = await summary_version(db)
+                with span("search_index_load"):
+                    result = await db.stream(
+                        select(Post.id, Post.user_id, Post.title).execution_options(
+                            yield_per=5000
+                        )
+                    )
+                    async for post in result:
+                        self.add(post.id, post.user_id, post.title)
+                        if not self.enabled:
+                            break
+                    await result.close()
+                self.loaded = True
+                self.version = version
+                self.apply(self._pending)
+            finally:
+                self._pending = None
+
+    async def catch_up(self, db: AsyncSession):
+        """Reload if another worker wrote posts since this index last did.
+
+        Syncs call this holding ``POSTS_LOCK``; searches use SQL meanwhile.
+        """
+        if not self.ready or await summary_version(db) == self.version:
+            return
+        self.loaded = False
+        self._clear()
+        await self.load(db)
+
+    # ------------------------
+    # Matching
+    # ------------------------
+
+    def expand(self, word: str) -> Dict[str, float]:
+        """Indexed tokens matching one query word, with a match weight."""
+        matches: Dict[str, float] = {}
+        if word in self.postings:
+            matches[word] = 1.0
+
+        word_trigrams = trigrams(word)
+        if len(word) >= 3:
+            # A token containing the word has all of the word's unpadded
+            # trigrams
+            candidates = set.intersection(
+                *(
+                    self.trigram_tokens.get(word[i : i + 3], set())
+                    for i in range(len(word) - 2)
+                )
+            )
+        else:
+            candidates = self.postings.keys()
+        for token in candidates:
+            if token != word and word in token:
+                matches[token] = SUBSTRING_WEIGHT
+
+        if len(word) >= FUZZY_MIN_LENGTH:
+            shared = Counter()
+            for trigram in word_trigrams:
+                shared.update(self.trigram_tokens.get(trigram, ()))
+            for token, common in shared.items():
+                if token in matches:
+                    continue
+                token_trigrams = len(trigrams(token))
+                similarity = common / (len(word_trigrams) + token_trigrams - common)
+                if similarity >= self.fuzzy_threshold:
+                    matches[token] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def search(self, query: str) -> Dict[int, float]:
+        """BM25 score of every post matching all words of ``query``."""
+        words = tokenize(query)
+        if not words or not self.docs:
+            return {}
+
+        n_docs = len(self.docs)
+        avg_length = self.total_length / n_docs
+        scores: Optional[Dict[int, float]] = None
+
+        for word in dict.fromkeys(words):
+            word_scores: Dict[int, float] = {}
+            for token, weight in self.expand(word).items():
+                postings = self.postings[token]
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for post_id, tf in postings.items():
+                    norm = K1 * (1 - B + B * self.docs[post_id].length / avg_length)
+                    score = weight * idf * tf * (K1 + 1) / (tf + norm)
+                    # A word counts once per post, through its best token
+                    if score > word_scores.get(post_id, 0.0):
+                        word_scores[post_id] = score
+
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {
+                    post_id: score + word_scores[post_id]
+                    for post_id, score in scores.items()
+                    if post_id in word_scores
+                }
+            if not scores:
+                return {}
+        return scores or {}
+
+    def rank(self, scores: Dict[int, float], ordering: str) -> List[int]:
+        if ordering == "relevance":
+            return sorted(scores, key=lambda post_id: (-scores[post_id], post_id))
+        column, _, direction = ordering.partition(":")
+        if column == "title":
+            key = lambda post_id: (self.docs[post_id].title, post_id)  # noqa: E731
+        else:
+            key = None
+        return sorted(scores, key=key, reverse=direction == "desc")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "posts": len(self.docs),
+            "tokens": len(self.postings),
+            "trigrams": len(self.trigram_tokens),
+        }
+
+
+# ------------------------
+# Search pages
+# ------------------------
+
+
+async def search_page(
+    db: AsyncSession,
+    index: SearchIndex,
+    search: str,
+    columns: list,
+    base_filters: list = None,
+    ordering: str = "relevance",
+    page: int = 1,
+    page_size: int = 10,
+) -> dict:
+    """A ``paginate_composite``-shaped page with matching done in memory.
+
+    Other filters are applied by Postgres to the matched ids, and the page
+    rows are read by primary key.
+    """
+    with span("search_match"):
+        scores = index.search(search)
+    if scores and base_filters:
+        ids = bindparam("ids", list(scores), type_=ARRAY(Integer))
+        with span("search_filter"):
+            result = await db.execute(
+                select(Post.id).where(Post.id == any_(ids), *base_filters)
+            )
+            kept = set(result.scalars().all())
+        scores = {post_id: scores[post_id] for post_id in kept}
+
+    ranked = index.rank(scores, ordering)
+    offset = (page - 1) * page_size
+    page_ids = ranked[offset : offset + page_size]
+
+    items = []
+    if page_ids:
+        ids = bindparam("page_ids", page_ids, type_=ARRAY(Integer))
+        with span("page_query"):
+            result = await db.execute(select(*columns).where(Post.id == any_(ids)))
+            rows = {row.id: row._asdict() for row in result.all()}
+        # Rows deleted since they were indexed are skipped
+        items = [rows[post_id] for post_id in page_ids if post_id in rows]
+
+    total_count = len(ranked)
+    return {
+        "total_count": total_count,
+        "total_count_exact": True,
+        "current_page": page,
+        "page_size": page_size,
+        "total_pages": (total_count + page_size - 1) // page_size,
+        "items": items,
+        "next_cursor": None,
+        "prev_cursor": None,
+    }
@@ -0,0 +1,70 @@
+from bisect import bisect_right
+from typing import Iterable, List, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+SIMILARITY_THRESHOLD = 70
+# fuzzywuzzy rounds the ratio to an int, so 69.5 already counts as 70
+SCORE_CUTOFF = SIMILARITY_THRESHOLD - 0.5
+# ratio <= 2 * shorter / (shorter + longer), so a pair can only reach the
+# cutoff when the longer title is at most this many times the shorter one.
+MAX_LENGTH_FACTOR = (200 - SCORE_CUTOFF) / SCORE_CUTOFF
+
+CHUNK_SIZE = 256
+
+
+def _score(queries: List[str], choices: List[str]) -> np.ndarray:
+    return process.cdist(
+        queries,
+        choices,
+        scorer=fuzz.ratio,
+        score_cutoff=SCORE_CUTOFF,
+        # Called per title on the event loop and inside every
+        # AnalysisExecutor process; parallelism is the executor's job
+        workers=1,
+    )
+
+
+def count_similar(
+    title: str, titles: Iterable[str], limit: Optional[int] = None
+) -> int:
+    """Count titles similar to ``title`` (``fuzz.ratio >= 70``)."""
+    longest = len(title) * MAX_LENGTH_FACTOR
+    shortest = len(title) / MAX_LENGTH_FACTOR
+    candidates = [t for t in titles if shortest <= len(t) <= longest]
+    if not candidates:
+        return 0
+
+    count = int(np.count_nonzero(_score([title], candidates)))
+    return count if limit is None else min(count, limit)
+
+
+def count_similar_pairs(
+    titles: Iterable[str], limit: Optional[int] = None, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Count similar title pairs, stopping early once ``limit`` is reached.
+
+    Titles are sorted by length so every title's candidate partners form a
+    contiguous window; each chunk of titles is scored against its window with
+    one batched ``cdist`` call instead of a Python loop over every pair.
+    """
+    titles = sorted(titles, key=len)
+    lengths = [len(t) for t in titles]
+    n = len(titles)
+    count = 0
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        window_end = bisect_right(lengths, lengths[stop - 1] * MAX_LENGTH_FACTOR)
+        if window_end <= start + 1:
+            continue
+
+        scores = _score(titles[start:stop], titles[start + 1 : window_end])
+        # Row r is titles[start + r] and column c is titles[start + 1 + c],
+        # so the pairs not yet counted are the ones with c >= r.
+        count += int(np.count_nonzero(np.triu(scores)))
+        if limit is not None and count >= limit:
+            return limit
+
+    return count
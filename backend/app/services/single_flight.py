@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services.metrics import SINGLE_FLIGHT_CALLS, span
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one call per key; concurrent callers share its result.
+
+    A caller arriving while a run for ``key`` is in flight awaits that run
+    instead of starting its own. The run is shielded, so a caller giving up
+    doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._flights.get(key)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.labels(str(key), "leader").inc()
+            task = self._flights[key] = asyncio.create_task(fn())
+            task.add_done_callback(partial(self._done, key))
+        else:
+            SINGLE_FLIGHT_CALLS.labels(str(key), "shared").inc()
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Marks the error as retrieved when every caller has given up
+            task.exception()
+
+
+def lock_key(name: str) -> int:
+    # pg_advisory_lock takes a signed 64-bit key; hash() isn't stable
+    # across processes
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@asynccontextmanager
+async def advisory_lock(engine: AsyncEngine, name: str):
+    """Hold the Postgres advisory lock ``name`` for the duration.
+
+    Other worker processes asking for the same lock wait until it is
+    released. The lock belongs to a connection of its own: sessions hand
+    theirs back to the pool on commit, and a session-level lock would go
+    with it.
+    """
+    key = lock_key(name)
+    async with engine.connect() as conn:
+        with span("advisory_lock_wait"):
+            await conn.execute(select(func.pg_advisory_lock(key)))
+        # The lock outlives the transaction; don't sit idle in one
+        await conn.commit()
+        try:
+            yield
+        finally:
+            try:
+                await conn.execute(select(func.pg_advisory_unlock(key)))
+                await conn.commit()
+            except BaseException:
+                # Never return a connection still holding the lock to the pool
+                await conn.invalidate()
+                raise
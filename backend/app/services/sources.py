@@ -0,0 +1,304 @@
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+from app.services.metrics import span
+
+PAGING_MODES = ("none", "page", "offset")
+
+# Post column -> field of an upstream item (jsonplaceholder's names)
+DEFAULT_FIELDS = {"id": "id", "user_id": "userId", "title": "title", "body": "body"}
+
+
+class PostSource(NamedTuple):
+    """One upstream post store.
+
+    ``paging`` is "none" (one request), "page" (``page_param`` counts up from
+    ``first_page``) or "offset" (``offset_param`` steps by ``page_size``);
+    paged sources stop at the first short page. ``items_path`` names the
+    top-level key holding the post array when the payload is an object.
+    ``id_offset`` is added to upstream ids so stores don't overwrite each
+    other's posts.
+    """
+
+    name: str
+    url: str
+    paging: str = "none"
+    page_size: int = 100
+    page_param: str = "_page"
+    offset_param: str = "_start"
+    size_param: str = "_limit"
+    first_page: int = 1
+    max_pages: int = 1000
+    items_path: Optional[str] = None
+    fields: Dict[str, str] = DEFAULT_FIELDS
+    id_offset: int = 0
+    params: Dict[str, Any] = {}
+    # Requests in flight and requests per second (0: unlimited) per source
+    concurrency: int = 2
+    rate_limit: float = 0
+
+    def map_item(self, item: dict) -> dict:
+        fields = self.fields
+        return {
+            "id": int(item[fields["id"]]) + self.id_offset,
+            "user_id": int(item[fields["user_id"]]),
+            "title": str(item[fields["title"]]),
+            "body": str(item[fields["body"]]),
+        }
+
+    def page_params(self, page: int) -> dict:
+        params = dict(self.params)
+        if self.paging == "page":
+            params[self.page_param] = self.first_page + page
+        elif self.paging == "offset":
+            params[self.offset_param] = page * self.page_size
+        if self.paging != "none":
+            params[self.size_param] = self.page_size
+        return params
+
+
+def load_sources(raw: Optional[str], default_url: str) -> List[PostSource]:
+    """Sources from a JSON list of ``PostSource`` fields.
+
+    Without one, the single ``default_url`` store is polled.
+    """
+    if not raw:
+        return [PostSource("default", default_url)]
+
+    sources = []
+    for config in json.loads(raw):
+        fields = {**DEFAULT_FIELDS, **config.pop("fields", {})}
+        source = PostSource(fields=fields, **config)
+        if source.paging not in PAGING_MODES:
+            raise ValueError(f"Invalid paging mode for {source.name}: {source.paging}")
+        if source.concurrency < 1:
+            raise ValueError(f"Invalid concurrency for {source.name}")
+        sources.append(source)
+    if len({source.name for source in sources}) != len(sources):
+        raise ValueError("Post source names must be unique")
+    return sources
+
+
+class RateLimiter:
+    """Spaces request starts at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic):
+        self.interval = 1 / rate if rate else 0.0
+        self.clock = clock
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = self.clock()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# ------------------------
+# Streaming JSON
+# ------------------------
+
+
+class _NeedMore(Exception):
+    pass
+
+
+_nothing = object()
+
+
+class JSONItemsParser:
+    """Parses the items of a JSON array as the payload arrives in chunks.
+
+    The array is the whole document, or the value of ``items_path`` in a
+    top-level object. Only the unparsed tail of the payload is buffered, so
+    memory follows the size of one item rather than of the response.
+    Anything after the array is ignored.
+    """
+
+    _whitespace = " \t\n\r"
+
+    def __init__(self, items_path: Optional[str] = None):
+        self.items_path = items_path
+        self.done = False
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._final = False
+        # "start", "key", "colon", "value", "member_end", "item", "item_end"
+        self._state = "start"
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        items = []
+        try:
+            while not self.done:
+                item = self._step()
+                if item is not _nothing:
+                    items.append(item)
+        except _NeedMore:
+            pass
+        return items
+
+    def close(self) -> List[Any]:
+        self._final = True
+        items = self.feed("")
+        if not self.done:
+            raise ValueError("Truncated JSON payload")
+        return items
+
+    def _peek(self) -> str:
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in self._whitespace:
+            pos += 1
+        self._pos = pos
+        if pos == len(buffer):
+            raise _NeedMore
+        return buffer[pos]
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON payload, found {found!r}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if self._final:
+                raise
+            raise _NeedMore
+        if self._buffer[self._pos] not in '{["':
+            # A number or literal may continue in the next chunk ("1" of
+            # "1.5"); it is complete once a delimiter follows
+            if end == len(self._buffer) or self._buffer[end] not in " \t\n\r,]}":
+                if not self._final:
+                    raise _NeedMore
+                if end != len(self._buffer):
+                    raise ValueError("Invalid JSON value")
+        self._pos = end
+        return value
+
+    def _step(self) -> Any:
+        state = self._state
+        if state == "start":
+            if self.items_path is None:
+                self._expect("[")
+                self._state = "item"
+            else:
+                self._expect("{")
+                self._state = "key"
+        elif state == "key":
+            self._key = self._value()
+            self._state = "colon"
+        elif state == "colon":
+            self._expect(":")
+            self._state = "value"
+        elif state == "value":
+            if self._key == self.items_path:
+                self._expect("[")
+                self._state = "item"
+            else:
+                self._value()
+                self._state = "member_end"
+        elif state == "member_end":
+            if self._peek() == "}":
+                raise ValueError(f"No {self.items_path!r} array in JSON payload")
+            self._expect(",")
+            self._state = "key"
+        elif state == "item":
+            if self._peek() == "]":
+                self._pos += 1
+                self.done = True
+                return _nothing
+            item = self._value()
+            self._state = "item_end"
+            return item
+        elif state == "item_end":
+            if self._peek() == "]":
+                self._pos += 1
+                self.done = True
+            else:
+                self._expect(",")
+                self._state = "item"
+        return _nothing
+
+
+async def iter_json_items(response: httpx.Response, items_path: Optional[str] = None):
+    parser = JSONItemsParser(items_path)
+    async for chunk in response.aiter_text():
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            return
+    for item in parser.close():
+        yield item
+
+
+# ------------------------
+# Fetching
+# ------------------------
+
+
+async def fetch_source(
+    client: httpx.AsyncClient,
+    source: PostSource,
+    put: Callable[[List[dict]], Awaitable[None]],
+    batch_size: int = 1000,
+):
+    """Stream every post of ``source`` to ``put`` in batches of mapped rows.
+
+    Paged sources are read by ``source.concurrency`` workers taking the next
+    page number in turn until one of them sees a short page.
+    """
+    limiter = RateLimiter(source.rate_limit)
+    next_page = 0
+    last_page = source.max_pages if source.paging != "none" else 1
+
+    async def fetch_page(page: int) -> int:
+        await limiter.wait()
+        count = 0
+        batch = []
+        with span("fetch_upstream"):
+            async with client.stream(
+                "GET", source.url, params=source.page_params(page)
+            ) as response:
+                response.raise_for_status()
+                async for item in iter_json_items(response, source.items_path):
+                    batch.append(source.map_item(item))
+                    count += 1
+                    if len(batch) >= batch_size:
+                        await put(batch)
+                        batch = []
+        if batch:
+            await put(batch)
+        return count
+
+    async def worker():
+        nonlocal next_page, last_page
+        while next_page < last_page:
+            page = next_page
+            next_page += 1
+            if await fetch_page(page) < source.page_size:
+                # Pages past the end are empty; stop handing them out
+                last_page = min(last_page, page + 1)
+
+    workers = 1 if source.paging == "none" else source.concurrency
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.services.admission import AdmissionLimit, AdmissionMiddleware, load_limits
+from app.services.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+
+
+def make_app(limits):
+    app = FastAPI()
+    app.state.release = asyncio.Event()
+    app.state.started = 0
+
+    @app.get("/slow")
+    async def slow():
+        app.state.started += 1
+        await app.state.release.wait()
+        return {"ok": True}
+
+    @app.get("/fast")
+    async def fast():
+        return {"ok": True}
+
+    app.add_middleware(AdmissionMiddleware, limits=limits, retry_after=3)
+    return app
+
+
+def client_for(app):
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+def test_load_limits():
+    limits = load_limits('{"/a": {"concurrency": 2, "queue": 4}}')
+    assert limits == {"/a": AdmissionLimit(2, 4, 1.0)}
+    assert load_limits("") == {}
+    with pytest.raises(ValueError):
+        load_limits('{"/a": {"concurrency": 0}}')
+
+
+def test_longest_prefix_wins():
+    middleware = AdmissionMiddleware(
+        None, {"/posts": AdmissionLimit(1), "/posts/export/": AdmissionLimit(2)}
+    )
+    assert middleware.gate_for("/posts/export").route == "/posts/export/"
+    assert middleware.gate_for("/posts/single/1").route == "/posts"
+    assert middleware.gate_for("/postsfoo") is None
+    assert middleware.gate_for("/") is None
+
+
+@pytest.mark.asyncio
+async def test_burst_is_shed_without_starving_other_routes():
+    app = make_app({"/slow": AdmissionLimit(concurrency=1, queue=1, timeout=5)})
+    rejected = ADMISSION_REJECTED.labels("/slow", "queue_full")
+    before = rejected._value.get()
+
+    async with client_for(app) as client:
+        running = asyncio.create_task(client.get("/slow"))
+        queued = asyncio.create_task(client.get("/slow"))
+        while (
+            app.state.started < 1
+            or ADMISSION_QUEUE_DEPTH.labels("/slow")._value.get() < 1
+        ):
+            await asyncio.sleep(0.01)
+
+        shed = await client.get("/slow")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "3"
+        assert rejected._value.get() == before + 1
+
+        # The saturated route doesn't hold up the others
+        assert (await client.get("/fast")).status_code == 200
+
+        app.state.release.set()
+        assert (await running).status_code == 200
+        assert (await queued).status_code == 200
+
+    assert ADMISSION_QUEUE_DEPTH.labels("/slow")._value.get() == 0
+    assert app.state.started == 2
+
+
+@pytest.mark.asyncio
+async def test_waiting_past_the_timeout_is_shed():
+    app = make_app({"/slow": AdmissionLimit(concurrency=1, queue=5, timeout=0.05)})
+
+    async with client_for(app) as client:
+        running = asyncio.create_task(client.get("/slow"))
+        while app.state.started < 1:
+            await asyncio.sleep(0.01)
+
+        late = await client.get("/slow")
+        assert late.status_code == 503
+
+        app.state.release.set()
+        assert (await running).status_code == 200
+        # The slot is free again
+        assert (await client.get("/slow")).status_code == 200
@@ -0,0 +1,84 @@
+import random
+import sys
+from collections import Counter, defaultdict
+
+import pytest
+
+from app.db.models.post import Post
+from app.services.aggregation import PYTHON_WHITESPACE, common_words_sql, top_users_sql
+from app.services.analysis import IncrementalAnalyzer, read_summary
+from app.services.flags import title_words
+
+WORDS = ["Alpha", "beta", "GAMMA", "delta", "école", "Straße", "x", "b2", "a-b", "é"]
+SPACES = [" ", "  ", "\t", "\n", "\xa0", "　", "\x1f", " "]
+
+
+def test_whitespace_class_matches_str_split():
+    expected = {c for c in map(chr, range(sys.maxunicode + 1)) if c.isspace()}
+    listed = set()
+    for part in PYTHON_WHITESPACE.split(" - "):
+        listed.update(part)
+    listed.update(map(chr, range(0x2000, 0x200B)))
+    assert listed == expected
+
+
+def random_title(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(1, 6))]
+    title = rng.choice(SPACES) if rng.random() < 0.3 else ""
+    for word in words:
+        title += word + rng.choice(SPACES)
+    return title.rstrip() if rng.random() < 0.5 else title
+
+
+def python_stats(posts):
+    word_count = Counter()
+    user_words = defaultdict(set)
+    for post in posts:
+        words = title_words(post.title)
+        word_count.update(words)
+        user_words[post.user_id].update(words)
+    common = sorted(word_count.items(), key=lambda x: (-x[1], x[0]))
+    users = sorted(
+        ((uid, len(words)) for uid, words in user_words.items()),
+        key=lambda x: (-x[1], x[0]),
+    )
+    return [{"word": w, "count": n} for w, n in common], [uid for uid, _ in users]
+
+
+async def seed(db, n=400, seed=0):
+    rng = random.Random(seed)
+    posts = [
+        Post(id=i, user_id=rng.randint(1, 25), title=random_title(rng), body="")
+        for i in range(1, n + 1)
+    ]
+    db.add_all(posts)
+    await db.commit()
+    return posts
+
+
+@pytest.mark.asyncio
+async def test_sql_aggregation_matches_python(pg_session):
+    posts = await seed(pg_session)
+    common, users = python_stats(posts)
+
+    assert await common_words_sql(pg_session, limit=1000) == common
+    assert await top_users_sql(pg_session, limit=1000) == users
+    assert await common_words_sql(pg_session) == common[:10]
+    assert await top_users_sql(pg_session) == users[:3]
+
+
+@pytest.mark.asyncio
+async def test_sql_mode_stores_the_same_summary(pg_session):
+    await seed(pg_session, seed=1)
+
+    python_summary = await IncrementalAnalyzer(aggregation="python").refresh(pg_session)
+    expected = (python_summary.common_words, python_summary.top_three_users)
+    await IncrementalAnalyzer(aggregation="sql").refresh(pg_session)
+
+    stored = await read_summary(pg_session)
+    assert (stored.common_words, stored.top_three_users) == expected
+
+
+def test_invalid_aggregation_mode():
+    with pytest.raises(ValueError):
+        IncrementalAnalyzer(aggregation="spark")
@@ -1,17 +1,16 @@
 from app.api.posts import (
+    assign_flag_reasons,
     categorize_posts,
     detect_bot_users,
     get_top_users,
-    gather_duplicates_posts,
-    gather_posts_for_users,
-    get_words,
 )
 from app.db.models.post import Post
+from app.services.flags import PostColumns, PostRow, title_words
 
 
-def test_get_words():
+def test_title_words():
     title = "Hello World Again"
-    words = get_words(title)
+    words = title_words(title)
     assert words == {"hello", "world", "again"}
 
 
@@ -26,17 +25,22 @@ def test_categorize_posts_basic():
     ]
 
     (
-        shorter_titles,
-        duplicates,
+        reasons,
         user_titles,
         user_posts,
         word_count,
         user_unique_words,
     ) = categorize_posts(posts)
 
-    assert len(shorter_titles) == 4  # "Short" < 15 chars
-    assert duplicates[1] == {"Hello world"}  # duplicate title detected
+    assert reasons == {
+        1: "Short title",  # all titles are < 15 chars
+        2: "Short title",
+        3: "Short title",
+        4: "Duplicate",  # duplicate title detected
+    }
+    assert user_titles[1] == ["Hello world", "Hello again"]
     assert 1 in user_titles and 2 in user_titles
+    assert [p.id for p in user_posts[1]] == [1, 2, 4]
     assert word_count["hello"] == 3  # Appears 3 times total
     assert "short" in user_unique_words[2]
 
@@ -66,35 +70,55 @@ def test_get_top_users():
         3: {"test", "case", "python", "fastapi"},
     }
 
-    top_user_ids, top_three_users = get_top_users(user_unique_words)
+    top_three_users = get_top_users(user_unique_words)
 
-    assert top_user_ids[0] == 3
     assert top_three_users == [3, 1, 2]
 
 
-def test_gather_duplicates_posts():
-    duplicates = {1: {"Hello world"}}
-    user_posts = {
-        1: [
-            Post(id=1, user_id=1, title="Hello world", body="Body 1"),
-            Post(id=2, user_id=1, title="Hello again", body="Body 2"),
-        ]
-    }
+def test_assign_flag_reasons_marks_every_post_of_a_bot():
+    titles = ["A fairly long title number %d" % i for i in range(7)]
+    posts = [
+        Post(id=i, user_id=1, title=title, body="") for i, title in enumerate(titles)
+    ]
+    posts.append(Post(id=100, user_id=2, title="A fairly long title", body=""))
+    posts.append(Post(id=101, user_id=2, title="A fairly long title", body=""))
 
-    dup_posts = gather_duplicates_posts(duplicates, user_posts)
-    assert len(dup_posts) == 1
-    assert dup_posts[0].title == "Hello world"
+    assign_flag_reasons(posts)
 
+    assert {p.flag_reason for p in posts if p.user_id == 1} == {"Bot"}
+    assert [p.flag_reason for p in posts if p.user_id == 2] == [None, "Duplicate"]
 
-def test_gather_posts_for_users():
-    user_posts = {
-        1: [Post(id=1, user_id=1, title="Post 1", body="Body 1")],
-        2: [Post(id=2, user_id=2, title="Post 2", body="Body 2")],
+
+def test_post_columns_match_orm_posts():
+    titles = ["A fairly long title number %d" % i for i in range(7)]
+    posts = [
+        Post(id=i, user_id=1, title=title, body="") for i, title in enumerate(titles)
+    ]
+    posts += [
+        Post(id=100, user_id=2, title="Hello world", body=""),
+        Post(id=101, user_id=2, title="Hello world", body=""),
+        Post(id=102, user_id=3, title="Yet another long title", body=""),
+    ]
+    columns = PostColumns((p.id, p.user_id, p.title) for p in posts)
+
+    expected = categorize_posts(posts)
+    reasons, user_titles, user_posts, word_count, user_unique_words = categorize_posts(
+        columns
+    )
+    assert reasons == expected[0]
+    assert user_titles == expected[1]
+    assert {uid: list(ids) for uid, ids in user_posts.items()} == {
+        uid: [p.id for p in user] for uid, user in expected[2].items()
     }
+    assert word_count == expected[3]
+    assert user_unique_words == expected[4]
+
+    assert detect_bot_users(columns) == detect_bot_users(expected[1]) == [1]
+    assert get_top_users(columns) == get_top_users(expected[4])
 
-    posts = gather_posts_for_users([1], user_posts)
-    assert len(posts) == 1
-    assert posts[0].user_id == 1
 
-    posts_all = gather_posts_for_users([1, 2], user_posts)
-    assert len(posts_all) == 2
+def test_post_columns_round_trip_flags():
+    columns = PostColumns([(1, 2, "title", "Bot"), (3, 4, "other", None)])
+    assert len(columns) == 2
+    assert list(columns) == [PostRow(1, 2, "title", "Bot"), PostRow(3, 4, "other")]
+    assert columns.ids.itemsize == 4
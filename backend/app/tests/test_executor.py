@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from app.services.executor import AnalysisExecutor, partition_by_user
+from app.services.flags import PostRow, build_user_states
+
+
+def make_rows(n_users=12, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    post_id = 1
+    for uid in range(1, n_users + 1):
+        for _ in range(rng.randint(1, 40)):
+            title = " ".join(rng.choice(["foo", "bar", "baz", "qux"]) for _ in range(4))
+            rows.append(PostRow(post_id, uid, title))
+            post_id += 1
+    return rows
+
+
+def test_partition_by_user_keeps_users_together():
+    rows = make_rows()
+    partitions = partition_by_user(rows, 4)
+
+    assert len(partitions) == 4
+    assert sorted(r.id for p in partitions for r in p) == [r.id for r in rows]
+    owners = {}
+    for i, partition in enumerate(partitions):
+        for row in partition:
+            assert owners.setdefault(row.user_id, i) == i
+
+
+def test_partition_by_user_balances_post_counts():
+    rows = [PostRow(i, i % 8, "t") for i in range(800)]
+    sizes = [len(p) for p in partition_by_user(rows, 4)]
+    assert sizes == [200, 200, 200, 200]
+
+
+def test_partition_by_user_with_fewer_users_than_parts():
+    rows = [PostRow(1, 1, "a"), PostRow(2, 2, "b")]
+    assert len(partition_by_user(rows, 8)) == 2
+    assert partition_by_user([], 8) == []
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        AnalysisExecutor(mode="gpu")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+async def test_map_users_merges_to_same_states(mode):
+    rows = make_rows()
+    expected = build_user_states(rows)
+
+    executor = AnalysisExecutor(
+        mode=mode, max_workers=2, inline_threshold=10, process_threshold=10
+    )
+    try:
+        merged = {}
+        for part in await executor.map_users(build_user_states, rows):
+            merged.update(part)
+    finally:
+        executor.shutdown()
+
+    assert merged.keys() == expected.keys()
+    for uid, state in expected.items():
+        assert merged[uid].posts == state.posts
+        assert merged[uid].similar_pairs == state.similar_pairs
+
+    metrics = executor.metrics()
+    assert metrics["tasks_total"] == (1 if mode == "inline" else 2)
+    assert metrics["queue_depth"] == 0
+    assert metrics["task_seconds_total"] > 0
+
+
+@pytest.mark.asyncio
+async def test_small_inputs_stay_inline():
+    executor = AnalysisExecutor(mode="process", inline_threshold=100)
+    await executor.map_users(build_user_states, make_rows(n_users=2)[:50])
+    assert executor._processes is None and executor._threads is None
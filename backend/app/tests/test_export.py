@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models.post import Post
+from app.services.export import export_rows
+
+
+async def seed(db, n=250):
+    db.add_all(
+        Post(
+            id=i,
+            user_id=i % 5,
+            title=f'title "{i}", with comma',
+            body=f"line one\nline {i}",
+            flag_reason="Bot" if i % 10 == 0 else None,
+        )
+        for i in range(1, n + 1)
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_streams_every_matching_row(pg_session, client):
+    await seed(pg_session)
+    response = await client.get(
+        "/posts/export", params={"reason": "Bot", "order_by": "id:desc"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == list(range(250, 0, -10))
+    assert rows[0] == {
+        "id": 250,
+        "user_id": 0,
+        "title": 'title "250", with comma',
+        "body": "line one\nline 250",
+        "flag_reason": "Bot",
+    }
+
+
+@pytest.mark.asyncio
+async def test_export_csv(pg_session, client):
+    await seed(pg_session)
+    response = await client.get("/posts/export", params={"format": "csv", "user_id": 3})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="posts.csv"' in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "user_id", "title", "body", "flag_reason"]
+    assert [int(row[0]) for row in rows[1:]] == list(range(3, 251, 5))
+    assert rows[1][3] == "line one\nline 3"
+
+
+@pytest.mark.asyncio
+async def test_empty_csv_export_still_has_header(pg_session, client):
+    response = await client.get("/posts/export", params={"format": "csv"})
+    assert response.text.splitlines() == ["id,user_id,title,body,flag_reason"]
+
+
+@pytest.mark.asyncio
+async def test_export_stops_when_client_disconnects(pg_session):
+    await seed(pg_session)
+    checks = []
+
+    async def is_disconnected():
+        checks.append(True)
+        return len(checks) > 2
+
+    query = select(Post.id, Post.user_id, Post.title, Post.body, Post.flag_reason)
+    chunks = [
+        chunk
+        async for chunk in export_rows(
+            pg_session, query, is_disconnected=is_disconnected, batch_size=50
+        )
+    ]
+    # Two batches went out before the disconnect was noticed
+    assert len(chunks) == 2
+    assert sum(len(chunk.splitlines()) for chunk in chunks) == 100
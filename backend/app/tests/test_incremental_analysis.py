@@ -0,0 +1,165 @@
+import random
+from collections import Counter
+
+import pytest
+
+from app.api.posts import assign_flag_reasons
+from app.db.models.post import Post
+from app.services.analysis import IncrementalAnalyzer
+from app.services.executor import AnalysisExecutor
+
+VOCAB_RNG = random.Random(0)
+WORDS = [
+    "".join(VOCAB_RNG.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(n))
+    for n in [VOCAB_RNG.randint(3, 9) for _ in range(300)]
+]
+
+
+def random_title(rng: random.Random, uid: int, rows: dict) -> str:
+    roll = rng.random()
+    if roll < 0.1:
+        return rng.choice(WORDS)  # short
+    if roll < 0.2:
+        # reuse one of the user's titles so duplicates show up
+        titles = [t for u, t in rows.values() if u == uid]
+        if titles:
+            return rng.choice(titles)
+    if uid == 1 and roll < 0.6:
+        # near-duplicates so user 1 tends to turn into a bot
+        return "lorem ipsum dolor sit amet " + rng.choice(WORDS)
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7)))
+
+
+def full_recompute(rows):
+    posts = [
+        Post(id=pid, user_id=uid, title=title, body="")
+        for pid, (uid, title) in sorted(rows.items())
+    ]
+    _, _, _, word_count, user_unique_words = assign_flag_reasons(posts)
+    return {p.id: p.flag_reason for p in posts}, word_count, user_unique_words
+
+
+def assert_matches_full_recompute(analyzer, rows):
+    flags, word_count, user_unique_words = full_recompute(rows)
+    assert analyzer.flags == flags
+    assert analyzer.word_count == word_count
+    assert analyzer.user_unique_words() == dict(user_unique_words)
+    assert +analyzer.flag_counts == Counter(f for f in flags.values() if f)
+
+
+def test_new_posts_match_full_recompute():
+    rng = random.Random(1)
+    analyzer = IncrementalAnalyzer()
+    rows = {}
+    next_id = 1
+
+    for _ in range(20):
+        batch = []
+        for _ in range(rng.randint(1, 30)):
+            uid = rng.randint(1, 6)
+            title = random_title(rng, uid, rows)
+            rows[next_id] = (uid, title)
+            batch.append(Post(id=next_id, user_id=uid, title=title))
+            next_id += 1
+        analyzer.apply(batch)
+        assert_matches_full_recompute(analyzer, rows)
+
+
+def test_changed_posts_match_full_recompute():
+    rng = random.Random(2)
+    analyzer = IncrementalAnalyzer()
+    rows = {}
+    for pid in range(1, 201):
+        uid = rng.randint(1, 5)
+        rows[pid] = (uid, random_title(rng, uid, rows))
+    analyzer.apply(Post(id=pid, user_id=u, title=t) for pid, (u, t) in rows.items())
+    assert_matches_full_recompute(analyzer, rows)
+
+    for _ in range(30):
+        batch = []
+        for pid in rng.sample(sorted(rows), rng.randint(1, 15)):
+            uid, title = rows[pid]
+            if rng.random() < 0.2:
+                uid = rng.randint(1, 5)  # reassigned to another user
+            else:
+                title = random_title(rng, uid, rows)
+            rows[pid] = (uid, title)
+            batch.append(Post(id=pid, user_id=uid, title=title))
+        analyzer.apply(batch)
+        assert_matches_full_recompute(analyzer, rows)
+
+
+@pytest.mark.asyncio
+async def test_offloaded_batches_match_full_recompute():
+    rng = random.Random(4)
+    executor = AnalysisExecutor(mode="thread", max_workers=3, inline_threshold=5)
+    analyzer = IncrementalAnalyzer(executor=executor)
+    rows = {}
+
+    try:
+        for step in range(15):
+            batch = []
+            for _ in range(rng.randint(1, 40)):
+                if rows and rng.random() < 0.3:
+                    pid = rng.choice(sorted(rows))  # edit or reassign
+                else:
+                    pid = len(rows) + 1
+                uid = rng.randint(1, 6)
+                title = random_title(rng, uid, rows)
+                rows[pid] = (uid, title)
+                batch.append(Post(id=pid, user_id=uid, title=title))
+            await analyzer.apply_async(batch)
+            assert_matches_full_recompute(analyzer, rows)
+    finally:
+        executor.shutdown()
+
+    assert executor.tasks_total > 0
+
+
+def test_out_of_order_ids_match_full_recompute():
+    rng = random.Random(3)
+    rows = {pid: (rng.randint(1, 3), rng.choice(WORDS)) for pid in range(1, 80)}
+    ids = list(rows)
+    rng.shuffle(ids)
+
+    analyzer = IncrementalAnalyzer()
+    for pid in ids:
+        analyzer.apply([Post(id=pid, user_id=rows[pid][0], title=rows[pid][1])])
+    assert_matches_full_recompute(analyzer, rows)
+
+
+def test_apply_only_reports_changed_flags():
+    analyzer = IncrementalAnalyzer()
+    stored = analyzer.apply(
+        [
+            Post(id=1, user_id=1, title="A perfectly fine title", flag_reason=None),
+            Post(id=2, user_id=1, title="Short", flag_reason="Short title"),
+            Post(id=3, user_id=2, title="Short", flag_reason=None),
+        ]
+    )
+    # Post 2 already stores its flag, post 3 does not
+    assert stored == {3: "Short title"}
+
+    # Re-applying unchanged rows is a no-op
+    assert analyzer.apply([Post(id=1, user_id=1, title="A perfectly fine title")]) == {}
+
+    changed = analyzer.apply([Post(id=4, user_id=1, title="Short")])
+    assert changed == {4: "Duplicate"}
+    assert analyzer.flag_counts["Duplicate"] == 1
+
+
+def test_bot_flag_is_withdrawn_when_titles_change():
+    analyzer = IncrementalAnalyzer()
+    similar = [f"Buy cheap watches now {i}" for i in range(5)]
+    analyzer.apply(Post(id=i, user_id=1, title=t) for i, t in enumerate(similar))
+    assert analyzer.users[1].is_bot
+    assert set(analyzer.flags.values()) == {"Bot"}
+
+    changed = analyzer.apply(
+        [
+            Post(id=0, user_id=1, title="Completely unrelated heading"),
+            Post(id=1, user_id=1, title="Something else entirely here"),
+        ]
+    )
+    assert not analyzer.users[1].is_bot
+    assert changed == {i: None for i in range(5)}
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.db.models.post import Post
+
+N_POSTS = 20000
+N_USERS = 200
+
+
+async def seed(db):
+    await db.execute(
+        insert(Post),
+        [
+            {
+                "id": i,
+                "user_id": i % N_USERS,
+                "title": f"title {i} word{i % 997}",
+                "body": "",
+                "flag_reason": "Bot" if i % 100 == 0 else None,
+            }
+            for i in range(1, N_POSTS + 1)
+        ],
+    )
+    await db.commit()
+    await db.execute(text("ANALYZE posts"))
+
+
+def index_names(plan) -> set:
+    if isinstance(plan, list):
+        return set().union(*(index_names(p) for p in plan)) if plan else set()
+    if not isinstance(plan, dict):
+        return set()
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for value in plan.values():
+        if isinstance(value, (dict, list)):
+            names |= index_names(value)
+    return names
+
+
+async def explain(db, query: str) -> set:
+    plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {query}"))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    # Plans name each partition's own copy of an index; report the parent's
+    roots = await db.scalars(
+        text(
+            "SELECT coalesce(pg_partition_root(name::regclass)::text, name) "
+            "FROM unnest(CAST(:names AS text[])) AS name"
+        ),
+        {"names": sorted(index_names(plan))},
+    )
+    return set(roots)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query, index",
+    [
+        ("SELECT * FROM posts WHERE user_id = 7", "ix_posts_user_id"),
+        ("SELECT * FROM posts WHERE flag_reason = 'Bot'", "ix_posts_flag_reason"),
+        ("SELECT * FROM posts ORDER BY title, id LIMIT 10", "ix_posts_title_id"),
+        (
+            "SELECT * FROM posts WHERE (title, id) > ('title 5', 5) "
+            "ORDER BY title, id LIMIT 10",
+            "ix_posts_title_id",
+        ),
+    ],
+)
+async def test_filters_use_btree_indexes(pg_session, query, index):
+    await seed(pg_session)
+    assert index in await explain(pg_session, query)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT * FROM posts WHERE title ILIKE '%word42%'",
+        "SELECT * FROM posts WHERE title % 'word42'",
+    ],
+)
+async def test_search_uses_trigram_index(pg_session, pg_trgm, query):
+    await seed(pg_session)
+    assert "ix_posts_title_trgm" in await explain(pg_session, query)
@@ -0,0 +1,221 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.db.models.post import Post
+from app.services import ingestion
+from app.services.analysis import IncrementalAnalyzer
+from app.services.ingestion import (
+    IngestionScheduler,
+    IngestResult,
+    fetch_posts,
+    fetch_sources,
+    upsert_posts,
+)
+from app.services.sources import PostSource
+
+
+class DummySession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("session_factory", DummySession)
+    kwargs.setdefault("sync_lock", None)
+    kwargs.setdefault("jitter", 0)
+    return IngestionScheduler(url="http://upstream.test/posts", **kwargs)
+
+
+def test_next_delay_uses_interval_after_success():
+    scheduler = make_scheduler(interval=30)
+    assert scheduler.next_delay() == 30
+
+
+def test_next_delay_backs_off_and_caps():
+    scheduler = make_scheduler(interval=30, retry_base=2, max_backoff=10)
+    delays = []
+    for failures in range(1, 6):
+        scheduler.failures = failures
+        delays.append(scheduler.next_delay())
+    assert delays == [2, 4, 8, 10, 10]
+
+
+def test_next_delay_jitter_bounds():
+    scheduler = make_scheduler(interval=100, jitter=0.2)
+    for _ in range(50):
+        assert 80 <= scheduler.next_delay() <= 120
+
+
+@pytest.mark.asyncio
+async def test_sync_once_records_last_sync(monkeypatch):
+    clients = []
+
+    result = IngestResult(1, 0, 0, ["post"])
+
+    async def fake_fetch(db, client, sources):
+        clients.append(client)
+        return result
+
+    monkeypatch.setattr(ingestion, "fetch_sources", fake_fetch)
+    scheduler = make_scheduler()
+    scheduler.failures = 3
+
+    assert await scheduler.sync_once() is result
+    await scheduler.sync_once()
+
+    assert scheduler.last_synced_at is not None
+    assert scheduler.failures == 0
+    assert clients[0] is clients[1]  # one pooled client across syncs
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_run_loop_backs_off_on_upstream_error(monkeypatch):
+    def handler(request):
+        return httpx.Response(503)
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) == 3:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(ingestion.asyncio, "sleep", fake_sleep)
+    scheduler = make_scheduler(
+        retry_base=1, max_backoff=60, transport=httpx.MockTransport(handler)
+    )
+
+    with pytest.raises(asyncio.CancelledError):
+        await scheduler._run()
+
+    assert sleeps == [1, 2, 4]
+    assert scheduler.failures == 3
+    assert scheduler.last_synced_at is None
+    assert "503" in scheduler.last_error
+    await scheduler.stop()
+
+
+def upstream(n, title="title {}"):
+    return [
+        {"id": i, "userId": i % 3, "title": title.format(i), "body": f"body {i}"}
+        for i in range(1, n + 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_upsert_reports_inserted_updated_unchanged(pg_session):
+    rows = list(ingestion.upstream_rows(upstream(10)))
+    first = await upsert_posts(pg_session, rows, batch_size=3)
+    assert first[:3] == (10, 0, 0)
+    assert sorted(p.id for p in first.posts) == list(range(1, 11))
+
+    rows[0]["title"] = "new title"
+    rows[1]["body"] = "new body"
+    rows.append({"id": 11, "user_id": 1, "title": "fresh", "body": ""})
+    second = await upsert_posts(pg_session, rows, batch_size=3)
+    assert second[:3] == (1, 2, 8)
+    assert {p.id for p in second.posts} == {1, 2, 11}
+
+    again = await upsert_posts(pg_session, rows)
+    assert again[:3] == (0, 0, 11) and not again.changed
+
+    post = await pg_session.get(Post, 1, populate_existing=True)
+    assert post.title == "new title"
+
+
+@pytest.mark.asyncio
+async def test_upsert_keeps_last_duplicate_in_a_batch(pg_session):
+    rows = [
+        {"id": 1, "user_id": 1, "title": "first", "body": ""},
+        {"id": 1, "user_id": 1, "title": "second", "body": ""},
+    ]
+    result = await upsert_posts(pg_session, rows)
+    assert result[:3] == (1, 0, 0)
+    assert result.posts[0].title == "second"
+
+
+@pytest.mark.asyncio
+async def test_fetch_posts_feeds_changed_rows_to_analyzer(pg_session):
+    payload = upstream(6, title="a long enough title {}")
+
+    def handler(request):
+        return httpx.Response(200, json=payload)
+
+    analyzer = IncrementalAnalyzer()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await fetch_posts(pg_session, client, "http://upstream.test/posts")
+        await analyzer.ingest(pg_session, result.posts)
+        assert analyzer.flags == dict.fromkeys(range(1, 7))
+
+        # A retitled post is picked up and re-flagged
+        payload[0]["title"] = "short"
+        result = await fetch_posts(pg_session, client, "http://upstream.test/posts")
+        assert result[:3] == (0, 1, 5)
+        await analyzer.ingest(pg_session, result.posts)
+
+    assert analyzer.flags[1] == "Short title"
+    post = await pg_session.get(Post, 1, populate_existing=True)
+    assert post.flag_reason == "Short title"
+
+
+@pytest.mark.asyncio
+async def test_fetch_sources_merges_sources_and_skips_failing_ones(pg_session):
+    def handler(request):
+        if request.url.host == "a.test":
+            return httpx.Response(200, json=upstream(3))
+        if request.url.host == "b.test":
+            return httpx.Response(200, json={"data": upstream(2)})
+        return httpx.Response(500)
+
+    sources = [
+        PostSource("a", "http://a.test/posts"),
+        PostSource("b", "http://b.test/posts", items_path="data", id_offset=100),
+        PostSource("c", "http://c.test/posts"),
+    ]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await fetch_sources(pg_session, client, sources, batch_size=2)
+
+    assert result[:3] == (5, 0, 0)
+    assert result.failed == ("c",)
+    assert sorted(p.id for p in result.posts) == [1, 2, 3, 101, 102]
+
+
+@pytest.mark.asyncio
+async def test_fetch_sources_fails_when_every_source_fails(pg_session):
+    def handler(request):
+        return httpx.Response(503)
+
+    sources = [PostSource("a", "http://a.test/posts")]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch_sources(pg_session, client, sources)
+
+
+class FailingSession:
+    async def execute(self, *args, **kwargs):
+        # A real round trip suspends before the error comes back
+        await asyncio.sleep(0.01)
+        raise RuntimeError("connection lost")
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_fetch_sources_stops_producers_when_the_upsert_fails():
+    def handler(request):
+        return httpx.Response(200, json=upstream(20000))
+
+    sources = [PostSource("a", "http://a.test/posts")]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(
+                fetch_sources(FailingSession(), client, sources, batch_size=100),
+                timeout=5,
+            )
@@ -0,0 +1,128 @@
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.models.post import Post
+from app.main import app as main_app
+from app.services import metrics
+from app.services.executor import AnalysisExecutor
+from app.services.metrics import (
+    TimedQueuePool,
+    collect_timings,
+    instrument_engine,
+    registry,
+    span,
+)
+from app.tests.conftest import TEST_DATABASE_URL
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+def test_span_feeds_histogram_and_active_collector():
+    before = sample("adinsights_stage_seconds_count", stage="test_stage")
+
+    with span("test_stage"):
+        pass
+    with collect_timings() as timings:
+        with span("test_stage"):
+            pass
+        with span("test_stage"):
+            pass
+        with span("other_stage"):
+            pass
+
+    assert set(timings) == {"test_stage", "other_stage"}
+    assert timings["test_stage"] >= 0
+    assert sample("adinsights_stage_seconds_count", stage="test_stage") == before + 3
+
+
+def test_span_records_even_when_the_stage_fails():
+    before = sample("adinsights_stage_seconds_count", stage="failing_stage")
+    with pytest.raises(RuntimeError):
+        with span("failing_stage"):
+            raise RuntimeError
+    assert sample("adinsights_stage_seconds_count", stage="failing_stage") == (
+        before + 1
+    )
+
+
+@pytest_asyncio.fixture
+async def engine(pg_engine, monkeypatch):
+    # instrument_engine registers engines by role; keep the app's own
+    # registrations out of the test's way and put them back afterwards
+    monkeypatch.setattr(metrics, "_engines", {})
+    monkeypatch.setattr(metrics, "_prepared_statements", {})
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=TimedQueuePool)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_checkout_and_slow_queries_are_recorded(engine):
+    instrument_engine(engine, slow_query_seconds=0)
+    checkouts = sample("adinsights_db_pool_checkout_seconds_count")
+    slow = sample("adinsights_db_slow_queries_total")
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+    assert sample("adinsights_db_pool_checkout_seconds_count") == checkouts + 1
+    assert sample("adinsights_db_slow_queries_total") >= slow + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_queries_are_timed(engine):
+    instrument_engine(engine)
+    queries = sample("adinsights_db_query_seconds_count")
+    async with engine.connect() as conn:
+        # The database's own error comes through, not one from a listener
+        with pytest.raises(DBAPIError, match="division by zero"):
+            await conn.execute(text("SELECT 1 / 0"))
+        assert sample("adinsights_db_query_seconds_count") == queries + 1
+
+        await conn.rollback()
+        await conn.execute(text("SELECT 1"))
+        info = (await conn.get_raw_connection()).info
+
+    assert sample("adinsights_db_query_seconds_count") == queries + 2
+    assert not any("start" in key for key in info)
+
+
+@pytest.mark.asyncio
+async def test_debug_response_has_stage_timings(pg_session, client):
+    pg_session.add_all(
+        Post(id=i, user_id=i % 3, title=f"post title {i}", body="")
+        for i in range(1, 20)
+    )
+    await pg_session.commit()
+
+    debug = await client.get("/posts/analyze-posts", params={"debug": "true"})
+    plain = await client.get("/posts/analyze-posts")
+
+    timings = debug.json()["timings"]
+    assert {"read_summary", "load_posts", "assign_flags", "page_query"} <= set(timings)
+    assert plain.json()["timings"] is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(
+        main_app.state, "executor", AnalysisExecutor(mode="inline"), raising=False
+    )
+    with span("page_query"):
+        pass
+
+    transport = httpx.ASGITransport(app=main_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        response = await api.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'adinsights_stage_seconds_count{stage="page_query"}' in response.text
+    assert "adinsights_db_pool_checkout_seconds" in response.text
+    assert "adinsights_analysis_queue_depth 0.0" in response.text
+    assert "# TYPE adinsights_analysis_tasks_total counter" in response.text
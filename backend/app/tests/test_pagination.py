@@ -0,0 +1,315 @@
+import pytest
+from sqlalchemy import text
+
+from app.db.models.post import Post
+from app.schemas.post import PostBase
+from app.services.pagination import (
+    CountCache,
+    count_cache,
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+    paginate_composite,
+    query_shapes,
+    set_trigram_threshold,
+)
+
+ORDERINGS = ["id:asc", "id:desc", "title:asc", "title:desc"]
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("title:asc", "next", ["Some title", 42])
+    assert decode_cursor(token, "title:asc", [Post.title, Post.id]) == (
+        "next",
+        ["Some title", 42],
+    )
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "", "e30"])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, "id:asc")
+
+
+@pytest.mark.parametrize(
+    "ordering, values",
+    [
+        ("id:asc", ["1", 1]),
+        ("id:asc", [None, None]),
+        ("id:asc", [True, 1]),
+        ("title:asc", [1, 1]),
+        ("title:asc", ["a", "1"]),
+    ],
+)
+def test_cursor_values_must_match_their_columns(ordering, values):
+    column = getattr(Post, ordering.split(":")[0])
+    token = encode_cursor(ordering, "next", values)
+    with pytest.raises(ValueError):
+        decode_cursor(token, ordering, [column, Post.id])
+
+
+def test_cursor_for_other_ordering_is_rejected():
+    token = encode_cursor("title:asc", "next", ["a", 1])
+    with pytest.raises(ValueError):
+        decode_cursor(token, "title:desc")
+
+
+def test_count_cache_evicts_least_recently_used():
+    cache = CountCache(max_size=2, ttl=60)
+    cache.set("a", 1, cache.generation)
+    cache.set("b", 2, cache.generation)
+    assert cache.get("a") == 1
+    cache.set("c", 3, cache.generation)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_count_cache_expires_entries():
+    cache = CountCache(ttl=-1)
+    cache.set("a", 1, cache.generation)
+    assert cache.get("a") is None
+
+
+def test_count_cache_drops_counts_started_before_invalidation():
+    cache = CountCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("a", 1, generation)
+    assert cache.get("a") is None
+
+
+async def seed(db, n=47):
+    # Only a handful of distinct titles so the id tiebreaker matters
+    db.add_all(
+        Post(id=i, user_id=i % 4, title=f"title {i % 6}", body="", flag_reason=None)
+        for i in range(1, n + 1)
+    )
+    await db.commit()
+
+
+def ids(page):
+    return [item.id for item in page["items"]]
+
+
+async def page(db, ordering, **kwargs):
+    return await paginate_composite(
+        model=Post, db=db, ordering=ordering, schema=PostBase, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordering", ORDERINGS)
+async def test_cursor_walk_matches_offset_order(pg_session, ordering):
+    await seed(pg_session)
+    expected = ids(await page(pg_session, ordering, page_size=100))
+
+    walked, cursor = [], None
+    while True:
+        result = await page(pg_session, ordering, page_size=10, cursor=cursor)
+        walked += ids(result)
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    assert walked == expected
+
+    # And back again from the last page
+    backwards = []
+    cursor = result["prev_cursor"]
+    while cursor is not None:
+        result = await page(pg_session, ordering, page_size=10, cursor=cursor)
+        backwards = ids(result) + backwards
+        cursor = result["prev_cursor"]
+    assert backwards + ids(await page(pg_session, ordering, page=5, page_size=10)) == (
+        expected
+    )
+
+
+@pytest.mark.asyncio
+async def test_offset_pages_hand_out_cursors(pg_session):
+    await seed(pg_session)
+    first = await page(pg_session, "title:asc", page_size=10)
+    second = await page(pg_session, "title:asc", page=2, page_size=10)
+
+    assert first["prev_cursor"] is None
+    following = await page(
+        pg_session, "title:asc", page_size=10, cursor=first["next_cursor"]
+    )
+    assert ids(following) == ids(second)
+
+    preceding = await page(
+        pg_session, "title:asc", page_size=10, cursor=second["prev_cursor"]
+    )
+    assert ids(preceding) == ids(first)
+
+
+@pytest.mark.asyncio
+async def test_cursor_respects_filters(pg_session):
+    await seed(pg_session)
+    filters = [Post.user_id == 1]
+    expected = ids(
+        await page(pg_session, "id:desc", page_size=100, base_filters=filters)
+    )
+
+    first = await page(pg_session, "id:desc", page_size=5, base_filters=filters)
+    rest = await page(
+        pg_session,
+        "id:desc",
+        page_size=100,
+        base_filters=filters,
+        cursor=first["next_cursor"],
+    )
+    assert ids(first) + ids(rest) == expected
+    assert rest["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_cached_count_until_invalidated(pg_session):
+    await seed(pg_session)
+    count_cache.invalidate()
+    filters = [Post.user_id == 2]
+
+    assert await count_rows(pg_session, Post, filters, "cached") == (12, True)
+    pg_session.add(Post(id=1000, user_id=2, title="new", body=""))
+    await pg_session.commit()
+
+    # Served from the cache until ingestion invalidates it
+    assert await count_rows(pg_session, Post, filters, "cached") == (12, True)
+    assert await count_rows(pg_session, Post, [Post.user_id == 3], "cached") == (
+        12,
+        True,
+    )
+    count_cache.invalidate()
+    assert await count_rows(pg_session, Post, filters, "cached") == (13, True)
+
+
+@pytest.mark.asyncio
+async def test_cached_count_follows_the_data_version(pg_session):
+    await seed(pg_session)
+    count_cache.invalidate()
+
+    async def total(version):
+        page = await paginate_composite(
+            Post,
+            pg_session,
+            filter_by={"user_id": 2},
+            count_strategy="cached",
+            data_version=version,
+        )
+        return page["total_count"]
+
+    assert await total(1) == 12
+    # Written by another worker: this process's cache is not invalidated
+    pg_session.add(Post(id=1000, user_id=2, title="new", body=""))
+    await pg_session.commit()
+
+    assert await total(1) == 12
+    assert await total(2) == 13
+
+
+@pytest.mark.asyncio
+async def test_estimated_count(pg_session):
+    await seed(pg_session)
+
+    count, exact = await count_rows(
+        pg_session, Post, [], "estimated", estimate_threshold=0
+    )
+    assert not exact and count >= 0
+
+    result = await page(
+        pg_session,
+        "id:asc",
+        count_strategy="estimated",
+        estimate_threshold=10**9,
+    )
+    assert result["total_count"] == 47 and result["total_count_exact"]
+
+
+@pytest.mark.asyncio
+async def test_column_rows_match_orm_rows(pg_session):
+    await seed(pg_session)
+    columns = [Post.id, Post.user_id, Post.title, Post.body, Post.flag_reason]
+
+    orm = await page(pg_session, "title:desc", page=2, page_size=10)
+    fast = await paginate_composite(
+        model=Post,
+        db=pg_session,
+        ordering="title:desc",
+        page=2,
+        page_size=10,
+        columns=columns,
+    )
+
+    assert fast["items"] == [item.model_dump() for item in orm["items"]]
+    assert fast["next_cursor"] == orm["next_cursor"]
+    assert fast["prev_cursor"] == orm["prev_cursor"]
+
+
+@pytest.mark.asyncio
+async def test_query_shapes_are_reused_across_values(pg_session):
+    await seed(pg_session)
+    query_shapes.clear()
+
+    first = await page(pg_session, "id:desc", page_size=5, filter_by={"user_id": 1})
+    assert len(query_shapes) == 2
+
+    misses = query_shapes.misses
+    other = await page(
+        pg_session, "id:desc", page=2, page_size=3, filter_by={"user_id": 2}
+    )
+    assert query_shapes.misses == misses
+    assert ids(other) == [34, 30, 26]
+    assert other["total_count"] == 12
+
+    # Same results as the uncached path with equivalent expressions
+    assert first == await page(
+        pg_session, "id:desc", page_size=5, base_filters=[Post.user_id == 1]
+    )
+
+    # A cursor page and a search each add a page shape; the count is shared
+    rest = await page(
+        pg_session,
+        "id:desc",
+        page_size=100,
+        filter_by={"user_id": 1},
+        cursor=first["next_cursor"],
+    )
+    assert ids(first) + ids(rest) == list(range(45, 0, -4))
+    assert len(query_shapes) == 3
+
+    search = {"search_columns": [Post.title], "filter_by": {"user_id": 1}}
+    found = await page(pg_session, "id:asc", search="e 5", **search)
+    assert ids(found) == [5, 17, 29, 41]
+    again = await page(pg_session, "id:asc", search="e 3", **search)
+    assert ids(again) == [9, 21, 33, 45]
+    assert len(query_shapes) == 5
+
+
+@pytest.mark.asyncio
+async def test_trigram_threshold_is_scoped_to_the_transaction(pg_session):
+    setting = text("SELECT current_setting('pg_trgm.similarity_threshold', true)")
+    before = await pg_session.scalar(setting)
+    await pg_session.commit()
+
+    # Short words never reach the % operator
+    await set_trigram_threshold(pg_session, "abc", 0.25)
+    assert await pg_session.scalar(setting) == before
+
+    await set_trigram_threshold(pg_session, "longer words", 0.25)
+    assert float(await pg_session.scalar(setting)) == 0.25
+    await pg_session.commit()
+
+    # Pooled connections don't keep the value
+    assert await pg_session.scalar(setting) == before
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("values", [["1", 1], [None, None]])
+async def test_analyze_posts_rejects_cursors_with_wrong_values(
+    pg_session, client, values
+):
+    await seed(pg_session)
+    cursor = encode_cursor("id:asc", "next", values)
+
+    response = await client.get("/posts/analyze-posts", params={"cursor": cursor})
+
+    assert response.status_code == 400
@@ -0,0 +1,204 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.post import POSTS_PARTITIONS, Post
+from app.db.partitioning import partition_count, partition_posts
+from app.services.analysis import (
+    IncrementalAnalyzer,
+    load_partitions,
+    load_post_columns,
+)
+from app.services.ingestion import upsert_posts
+
+MIGRATION = (
+    Path(__file__).parents[2]
+    / "alembic"
+    / "versions"
+    / "b5d2e7c41f63_partition_posts_by_user_id.py"
+)
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("partition_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_migration(conn, step: str):
+    with Operations.context(MigrationContext.configure(conn)):
+        getattr(load_migration(), step)()
+
+
+async def seed(engine, users=12, posts_per_user=5):
+    async with AsyncSession(engine) as db:
+        db.add_all(
+            Post(
+                id=u * posts_per_user + n + 1,
+                user_id=u,
+                title=f"title {n} of {u}",
+                body="",
+                flag_reason="Bot" if u == 3 else None,
+            )
+            for u in range(users)
+            for n in range(posts_per_user)
+        )
+        await db.commit()
+
+
+async def posts_in(engine):
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            text("SELECT id, user_id, title, flag_reason FROM posts ORDER BY id")
+        )
+        return rows.all()
+
+
+@pytest_asyncio.fixture
+async def seeded(pg_engine):
+    await seed(pg_engine)
+    return pg_engine
+
+
+@pytest.mark.asyncio
+async def test_migration_round_trip_keeps_every_post(seeded):
+    before = await posts_in(seeded)
+
+    async with seeded.begin() as conn:
+        await conn.run_sync(run_migration, "downgrade")
+        assert await conn.run_sync(partition_count) == 0
+        indexes = await conn.scalars(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = 'posts'")
+        )
+        assert {"posts_pkey", "ix_posts_user_id", "ix_posts_title_id"} <= set(indexes)
+        functions = await conn.scalar(
+            text(
+                "SELECT count(*) FROM pg_proc "
+                "WHERE proname IN ('posts_check_id_unique', 'posts_keep_id')"
+            )
+        )
+        assert functions == 0
+    assert await posts_in(seeded) == before
+
+    async with seeded.begin() as conn:
+        await conn.run_sync(run_migration, "upgrade")
+        assert await conn.run_sync(partition_count) == POSTS_PARTITIONS
+        with pytest.raises(ValueError):
+            await conn.run_sync(partition_posts, POSTS_PARTITIONS)
+    assert await posts_in(seeded) == before
+
+    # The upgrade brings back the uniqueness triggers too
+    async with AsyncSession(seeded) as db:
+        db.add(Post(id=1, user_id=9, title="taken", body=""))
+        with pytest.raises(IntegrityError, match="already belongs"):
+            await db.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "statement, error",
+    [
+        # id 1 belongs to user 0
+        ("INSERT INTO posts VALUES (1, 9, 'taken', '')", "already belongs"),
+        (
+            "INSERT INTO posts VALUES (500, 1, 'a', ''), (500, 2, 'b', '')",
+            "already belongs",
+        ),
+        ("UPDATE posts SET id = 500 WHERE id = 1", "can't change"),
+        ("UPDATE posts SET id = 2, user_id = 9 WHERE id = 1", "can't change"),
+    ],
+)
+async def test_ids_stay_unique_across_users(seeded, statement, error):
+    async with AsyncSession(seeded) as db:
+        with pytest.raises(IntegrityError, match=error):
+            await db.execute(text(statement))
+
+
+@pytest.mark.asyncio
+async def test_posts_can_move_between_users(seeded):
+    async with AsyncSession(seeded) as db:
+        # Same id, new user: moves to another partition
+        await db.execute(text("UPDATE posts SET user_id = 9 WHERE id = 1"))
+        await db.execute(
+            text("INSERT INTO posts VALUES (1000, 1, 'new', '') ON CONFLICT DO NOTHING")
+        )
+        await db.commit()
+
+    posts = {row.id: row for row in await posts_in(seeded)}
+    assert posts[1].user_id == 9
+    assert posts[1000].user_id == 1
+
+
+@pytest.mark.asyncio
+async def test_per_user_queries_scan_one_partition(seeded):
+    async with seeded.connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        plan = "\n".join(
+            await conn.scalars(
+                text("EXPLAIN SELECT id FROM posts WHERE user_id = 7 ORDER BY id")
+            )
+        )
+
+    scanned = [f"posts_p{i}" for i in range(POSTS_PARTITIONS) if f"posts_p{i} " in plan]
+    assert len(scanned) == 1
+
+
+@pytest.mark.asyncio
+async def test_load_partitions_matches_a_full_load(seeded):
+    async with AsyncSession(seeded) as db:
+        full = await load_post_columns(db)
+    parts = await load_partitions(seeded, POSTS_PARTITIONS, concurrency=2)
+
+    assert len(parts) == len(full) == 60
+    assert sorted(parts) == sorted(full)
+    # Each user's posts keep their order
+    assert parts.user_titles() == full.user_titles()
+
+
+@pytest.mark.asyncio
+async def test_analyzer_loads_and_flags_partitioned_posts(seeded):
+    async with AsyncSession(seeded, expire_on_commit=False) as db:
+        await db.execute(
+            text(
+                "UPDATE posts SET flag_reason = NULL, title = CASE user_id "
+                "WHEN 2 THEN 'same title' ELSE title END"
+            )
+        )
+        await db.commit()
+        analyzer = IncrementalAnalyzer()
+        await analyzer.load(db)
+
+    flags = {row.id: row.flag_reason for row in await posts_in(seeded)}
+    assert flags == analyzer.flags
+    # User 2's posts after the first are duplicates
+    assert [i for i, flag in flags.items() if flag == "Duplicate"] == [12, 13, 14, 15]
+    assert analyzer.summary()["all_users"] == list(range(12))
+
+
+@pytest.mark.asyncio
+async def test_upsert_moves_posts_between_partitions(seeded):
+    rows = [
+        # Moves from user 0 to user 9
+        {"id": 1, "user_id": 9, "title": "title 0 of 0", "body": ""},
+        {"id": 2, "user_id": 0, "title": "retitled", "body": ""},
+        {"id": 3, "user_id": 0, "title": "title 2 of 0", "body": ""},
+        {"id": 100, "user_id": 5, "title": "new", "body": ""},
+    ]
+
+    async with AsyncSession(seeded) as db:
+        result = await upsert_posts(db, rows)
+
+    assert (result.inserted, result.updated, result.unchanged) == (1, 2, 1)
+    posts = {row.id: row for row in await posts_in(seeded)}
+    assert len(posts) == 61
+    assert posts[1].user_id == 9
+    assert posts[2].title == "retitled"
+    assert posts[100].user_id == 5
@@ -0,0 +1,173 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models.post import Post
+from app.services.analysis import IncrementalAnalyzer
+from app.services.post_loader import PostLoader, post_loader
+
+
+@pytest.fixture
+def session_factory(pg_engine):
+    factory = sessionmaker(bind=pg_engine, class_=AsyncSession, expire_on_commit=False)
+    opened = []
+
+    def counting():
+        opened.append(1)
+        return factory()
+
+    counting.opened = opened
+    return counting
+
+
+async def seed(session_factory, n=10):
+    async with session_factory() as db:
+        db.add_all(
+            Post(id=i, user_id=i % 3, title=f"title {i}", body="")
+            for i in range(1, n + 1)
+        )
+        await db.commit()
+    session_factory.opened.clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query(session_factory):
+    await seed(session_factory)
+    loader = PostLoader(session_factory, window=0.01)
+
+    results = await asyncio.gather(
+        loader.load(1), loader.load(2), loader.load(2), loader.load_many([3, 99])
+    )
+
+    assert results[0]["title"] == "title 1"
+    assert results[1] == results[2]
+    assert list(results[3]) == [3]
+    assert len(session_factory.opened) == 1
+
+    # Found posts are cached; the unknown id is looked up again
+    assert (await loader.load(1))["id"] == 1
+    assert await loader.load(99) is None
+    assert len(session_factory.opened) == 2
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting(session_factory):
+    await seed(session_factory)
+    loader = PostLoader(session_factory, window=60, max_batch=3)
+
+    found = await asyncio.wait_for(loader.load_many([1, 2, 3]), timeout=5)
+
+    assert sorted(found) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_and_invalidated(session_factory):
+    await seed(session_factory)
+    loader = PostLoader(session_factory, window=0, cache_size=2)
+
+    await loader.load_many([1, 2, 3])
+    assert len(loader) == 2
+
+    loader.invalidate()
+    assert len(loader) == 0
+
+
+@pytest.mark.asyncio
+async def test_rows_read_before_an_invalidation_are_not_cached(session_factory):
+    await seed(session_factory)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @asynccontextmanager
+    async def gated():
+        async with session_factory() as db:
+            started.set()
+            await release.wait()
+            yield db
+
+    loader = PostLoader(gated, window=0)
+    lookup = asyncio.create_task(loader.load(1))
+    await started.wait()
+    loader.invalidate()
+    release.set()
+
+    assert (await lookup)["id"] == 1
+    assert len(loader) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_posts_follow_writes_by_other_workers(session_factory):
+    await seed(session_factory)
+    loader = PostLoader(session_factory, window=0, version_poll=0)
+    async with session_factory() as db:
+        await IncrementalAnalyzer().refresh(db)
+    assert (await loader.load(1))["title"] == "title 1"
+
+    # Another worker's write never calls this loader's invalidate
+    async with session_factory() as db:
+        await db.execute(update(Post).where(Post.id == 1).values(title="retitled"))
+        await db.commit()
+        await IncrementalAnalyzer().refresh(db)
+
+    assert (await loader.load(1))["title"] == "retitled"
+
+
+@pytest.mark.asyncio
+async def test_out_of_range_ids_are_not_found(session_factory):
+    await seed(session_factory)
+    loader = PostLoader(session_factory, window=0.01)
+
+    results = await asyncio.gather(
+        loader.load(1), loader.load(2), loader.load(99999999999)
+    )
+
+    assert [r and r["id"] for r in results] == [1, 2, None]
+
+
+@pytest.mark.asyncio
+async def test_a_failing_id_fails_only_its_own_lookup(session_factory):
+    await seed(session_factory)
+    loader = PostLoader(session_factory)
+    loop = asyncio.get_running_loop()
+    # Past the int4 range, as if it had got by load_many's check
+    batch = {i: loop.create_future() for i in (1, 2**40, 2, 3)}
+
+    await loader._fetch(batch)
+
+    with pytest.raises(DBAPIError):
+        batch[2**40].result()
+    assert [batch[i].result()["id"] for i in (1, 2, 3)] == [1, 2, 3]
+    assert len(session_factory.opened) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_and_single_endpoints(session_factory, client, monkeypatch):
+    await seed(session_factory)
+    monkeypatch.setattr(post_loader, "session_factory", session_factory)
+    post_loader.invalidate()
+
+    batch = await client.get("/posts/batch", params={"ids": "3,1,42,3"})
+    single = await client.get("/posts/single/2")
+    missing = await client.get("/posts/single/42")
+    invalid = await client.get("/posts/batch", params={"ids": "1,x"})
+    out_of_range = await client.get("/posts/batch", params={"ids": "1,99999999999"})
+    single_out_of_range = await client.get("/posts/single/99999999999")
+    too_many = await client.get(
+        "/posts/batch", params={"ids": ",".join(map(str, range(1, 200)))}
+    )
+
+    assert batch.status_code == 200
+    assert [p["id"] for p in batch.json()["items"]] == [3, 1]
+    assert batch.json()["missing"] == [42]
+    assert single.json()["title"] == "title 2"
+    assert missing.status_code == 404
+    assert invalid.status_code == 400
+    assert out_of_range.status_code == 400
+    assert single_out_of_range.status_code == 400
+    assert too_many.status_code == 400
+    post_loader.invalidate()
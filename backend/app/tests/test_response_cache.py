@@ -0,0 +1,111 @@
+import pytest
+
+from app.db.models.post import Post
+from app.schemas.post import PostQueryParams
+from app.services.analysis import IncrementalAnalyzer
+from app.services.response_cache import (
+    MemoryBackend,
+    ResponseCache,
+    etag_matches,
+    make_etag,
+    normalize_params,
+    response_cache,
+)
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_size=2, ttl=60)
+    await backend.set("a", 1)
+    await backend.set("b", 2)
+    assert await backend.get("a") == 1
+    await backend.set("c", 3)
+    assert await backend.get("b") is None
+    assert len(backend) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_entries():
+    backend = MemoryBackend(ttl=-1)
+    await backend.set("a", 1)
+    assert await backend.get("a") is None
+
+
+def test_equivalent_params_normalize_the_same():
+    a = PostQueryParams(search="  Foo   bar ", order_by="id:asc", user_id=0)
+    b = PostQueryParams(search="foo bar")
+    assert normalize_params(a) == normalize_params(b)
+    assert normalize_params(PostQueryParams(search="   ")) == normalize_params(
+        PostQueryParams()
+    )
+
+
+@pytest.mark.asyncio
+async def test_invalidate_moves_to_new_keys():
+    cache = ResponseCache(MemoryBackend())
+    params = PostQueryParams(reason="Bot")
+    key = await cache.key_for("analyze-posts", params)
+    await cache.set(key, b"{}")
+    assert (await cache.get(key)).body == b"{}"
+
+    await cache.invalidate()
+    assert await cache.key_for("analyze-posts", params) != key
+    assert await cache.get(key) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_keys_follow_summaries_stored_by_other_workers(pg_session):
+    cache = ResponseCache(MemoryBackend(), version_poll=0)
+    params = PostQueryParams()
+    before = await cache.key_for("analyze-posts", params, pg_session)
+
+    # Another worker's write never bumps this process's backend version
+    pg_session.add(Post(id=1, user_id=1, title="post title", body=""))
+    await pg_session.commit()
+    await IncrementalAnalyzer().refresh(pg_session)
+
+    assert await cache.key_for("analyze-posts", params, pg_session) != before
+
+
+def test_etag_matching():
+    etag = make_etag(b"{}")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.mark.asyncio
+async def test_analyze_posts_is_cached_until_ingestion(pg_session, client):
+    pg_session.add_all(
+        Post(id=i, user_id=i % 3, title=f"post title {i}", body="")
+        for i in range(1, 20)
+    )
+    await pg_session.commit()
+    # Loading flags and the summary is itself an ingestion-style write
+    await IncrementalAnalyzer().refresh(pg_session)
+
+    first = await client.get("/posts/analyze-posts", params={"reason": "Bot"})
+    assert first.status_code == 200
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    second = await client.get("/posts/analyze-posts?reason=Bot&order_by=id:asc")
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["etag"] == etag
+    assert second.json() == first.json()
+
+    not_modified = await client.get(
+        "/posts/analyze-posts",
+        params={"reason": "Bot"},
+        headers={"If-None-Match": etag},
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    await response_cache.invalidate()
+    third = await client.get("/posts/analyze-posts", params={"reason": "Bot"})
+    assert third.headers["x-cache"] == "MISS"
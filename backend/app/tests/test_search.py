@@ -0,0 +1,199 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.models.post import Post
+from app.services.analysis import IncrementalAnalyzer
+from app.services.search import SearchIndex, search_page
+
+
+def build_index(titles, **kwargs):
+    index = SearchIndex(**kwargs)
+    for post_id, title in enumerate(titles, start=1):
+        index.add(post_id, post_id, title)
+    index.loaded = True
+    return index
+
+
+def test_exact_matches_rank_above_substring_and_fuzzy_matches():
+    index = build_index(
+        [
+            "database tuning",
+            "databases at scale",
+            "databse typo",
+            "unrelated title",
+        ]
+    )
+
+    scores = index.search("database")
+
+    assert set(scores) == {1, 2, 3}
+    assert index.rank(scores, "relevance") == [1, 2, 3]
+
+
+def test_every_query_word_must_match():
+    index = build_index(["red apple pie", "red cherry pie", "green apple"])
+
+    assert set(index.search("apple red")) == {1}
+    assert index.search("apple banana") == {}
+    assert index.search("  ") == {}
+
+
+def test_rarer_terms_score_higher():
+    index = build_index(["common rare", "common", "common", "common"])
+
+    scores = index.search("common")
+
+    # Shorter documents win on the same term
+    assert scores[2] > scores[1]
+    assert index.search("rare")[1] > scores[1]
+
+
+def test_short_words_match_substrings_but_not_fuzzily():
+    index = build_index(["go home", "ago", "gone", "ga"])
+
+    assert set(index.search("go")) == {1, 2, 3}
+
+
+def test_updates_and_removals_keep_the_index_consistent():
+    index = build_index(["first title", "second title"])
+
+    index.apply([SimpleNamespace(id=1, user_id=1, title="renamed post")])
+    index.remove(2)
+
+    assert index.search("title") == {}
+    assert set(index.search("renamed")) == {1}
+    assert index.stats()["tokens"] == 2
+    assert "tit" not in index.trigram_tokens
+
+
+def test_rank_by_column():
+    index = build_index(["b match", "a match", "c match"])
+    scores = index.search("match")
+
+    assert index.rank(scores, "id:desc") == [3, 2, 1]
+    assert index.rank(scores, "title:asc") == [2, 1, 3]
+
+
+def test_index_disables_itself_past_its_size_limit():
+    index = build_index(["one", "two", "three"], max_posts=2)
+
+    assert not index.enabled
+    assert not index.ready
+    assert index.docs == {}
+
+
+async def seed(db):
+    titles = {
+        1: "async database drivers",
+        2: "database migrations",
+        3: "a databse with a typo",
+        4: "frontend styling",
+        5: "database database database",
+    }
+    db.add_all(
+        Post(
+            id=post_id,
+            user_id=post_id % 2,
+            title=title,
+            body="",
+            flag_reason="Bot" if post_id == 5 else None,
+        )
+        for post_id, title in titles.items()
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_load_replays_updates_that_arrive_mid_load(pg_session):
+    await seed(pg_session)
+    index = SearchIndex()
+
+    load = asyncio.create_task(index.load(pg_session))
+    # Let the load start reading the table
+    await asyncio.sleep(0)
+    index.apply([SimpleNamespace(id=6, user_id=0, title="database replay")])
+    await load
+
+    assert index.ready
+    assert len(index.docs) == 6
+    assert 6 in index.search("replay")
+
+
+@pytest.mark.asyncio
+async def test_catch_up_reloads_posts_written_by_another_worker(pg_session):
+    await seed(pg_session)
+    index = SearchIndex()
+    await index.load(pg_session)
+    await index.catch_up(pg_session)
+    assert index.ready and len(index.docs) == 5
+
+    # Another worker ingests a post and stores its summary
+    pg_session.add(Post(id=7, user_id=1, title="elsewhere ingested", body=""))
+    await pg_session.commit()
+    await IncrementalAnalyzer().refresh(pg_session)
+    assert 7 not in index.search("elsewhere")
+
+    await index.catch_up(pg_session)
+    assert index.ready
+    assert 7 in index.search("elsewhere")
+
+
+@pytest.mark.asyncio
+async def test_search_page_applies_sql_filters_and_paginates(pg_session):
+    await seed(pg_session)
+    index = SearchIndex()
+    await index.load(pg_session)
+
+    page = await search_page(
+        pg_session,
+        index,
+        "database",
+        columns=[Post.id, Post.title],
+        base_filters=[Post.flag_reason.is_(None)],
+        ordering="relevance",
+        page=1,
+        page_size=2,
+    )
+
+    assert page["total_count"] == 3
+    assert page["total_pages"] == 2
+    assert [item["id"] for item in page["items"]] == [2, 1]
+    assert page["items"][0] == {"id": 2, "title": "database migrations"}
+
+
+@pytest.mark.asyncio
+async def test_analyze_posts_uses_the_index_when_ready(pg_session, app, client):
+    await seed(pg_session)
+    app.state.search = SearchIndex()
+    # Short enough to skip the trigram operator, which needs pg_trgm
+    params = {"search": "tab", "order_by": "relevance", "page_size": 2}
+
+    # While the index loads, searches page through SQL with cursors
+    warming = await client.get("/posts/analyze-posts", params=params)
+    await app.state.search.load(pg_session)
+    ranked = await client.get(
+        "/posts/analyze-posts",
+        params={"search": "database", "order_by": "relevance"},
+    )
+    cursor = warming.json()["posts"]["next_cursor"]
+    with_cursor = await client.get(
+        "/posts/analyze-posts", params={**params, "cursor": cursor}
+    )
+    app.state.search.enabled = False
+    fallback = await client.get(
+        "/posts/analyze-posts", params={"search": "tab", "order_by": "relevance"}
+    )
+
+    assert not warming.json()["filters"]["relevance_available"]
+    assert ranked.status_code == 200
+    assert [p["id"] for p in ranked.json()["posts"]["items"]] == [5, 2, 1, 3]
+    assert ranked.json()["filters"]["relevance_available"]
+    # The cursor keeps to the SQL path it came from
+    assert with_cursor.status_code == 200
+    pages = warming.json()["posts"]["items"] + with_cursor.json()["posts"]["items"]
+    assert [p["id"] for p in pages] == [1, 2, 3, 5]
+    # The SQL search has no scores and orders by id
+    assert [p["id"] for p in fallback.json()["posts"]["items"]] == [1, 2, 3, 5]
+    assert not fallback.json()["filters"]["relevance_available"]
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import select, text
+
+from app.core.settings import settings
+from app.db.models.post import Post
+from app.db.models.post_summary import PostSummary
+from app.db.session import get_read_session, make_engine
+from app.tests.conftest import TEST_DATABASE_URL
+
+
+@pytest.mark.asyncio
+async def test_make_engine_sizes_pool_and_statement_cache(pg_engine, monkeypatch):
+    engine = make_engine(TEST_DATABASE_URL, pool_size=3, max_overflow=2, role="test")
+    try:
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 2
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            raw = await conn.get_raw_connection()
+            cache = raw.dbapi_connection._prepared_statement_cache
+            assert cache.capacity == 500
+            assert len(cache) >= 1
+
+            # The trigram threshold is set when connecting
+            threshold = await conn.scalar(
+                text("SELECT current_setting('pg_trgm.similarity_threshold')")
+            )
+            assert float(threshold) == settings.SEARCH_TRIGRAM_THRESHOLD
+            assert conn.info["trigram_threshold"] == settings.SEARCH_TRIGRAM_THRESHOLD
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_the_replica_and_writes_to_the_primary(
+    pg_session, replica_session, app, client
+):
+    pg_session.add(Post(id=1, user_id=1, title="written to the primary", body=""))
+    await pg_session.commit()
+    replica_session.add(Post(id=1, user_id=1, title="read from the replica", body=""))
+    await replica_session.commit()
+
+    async def replica():
+        yield replica_session
+
+    app.dependency_overrides[get_read_session] = replica
+    response = await client.get("/posts/analyze-posts")
+
+    assert response.status_code == 200
+    assert response.json()["posts"]["items"][0]["title"] == "read from the replica"
+    # The missing summary was built and stored on the primary
+    assert await pg_session.scalar(select(PostSummary.key)) is not None
+    assert await replica_session.scalar(select(PostSummary.key)) is None
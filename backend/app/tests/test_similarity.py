@@ -0,0 +1,52 @@
+import random
+
+from fuzzywuzzy import fuzz
+
+from app.services.similarity import count_similar, count_similar_pairs
+
+
+def pairwise_count(titles):
+    return sum(
+        1
+        for i in range(len(titles))
+        for j in range(i + 1, len(titles))
+        if fuzz.ratio(titles[i], titles[j]) >= 70
+    )
+
+
+def random_titles(rng, n):
+    stems = ["lorem ipsum dolor", "sunt aut facere", "qui est esse", "ea molestias"]
+    titles = []
+    for _ in range(n):
+        if rng.random() < 0.5:
+            title = rng.choice(stems) + " " + "x" * rng.randint(0, 12)
+        else:
+            title = "".join(rng.choice("abcdef gh") for _ in range(rng.randint(1, 40)))
+        titles.append(title)
+    return titles
+
+
+def test_count_similar_pairs_matches_pairwise_ratio():
+    rng = random.Random(7)
+    for n in (0, 1, 2, 10, 60, 300):
+        titles = random_titles(rng, n)
+        assert count_similar_pairs(titles) == pairwise_count(titles)
+
+
+def test_count_similar_pairs_across_chunks():
+    rng = random.Random(8)
+    titles = random_titles(rng, 150)
+    assert count_similar_pairs(titles, chunk_size=16) == pairwise_count(titles)
+
+
+def test_count_similar_pairs_stops_at_limit():
+    titles = [f"Hello world{'!' * i}" for i in range(10)]
+    assert count_similar_pairs(titles, limit=6) == 6
+
+
+def test_count_similar_matches_pairwise_ratio():
+    rng = random.Random(9)
+    titles = random_titles(rng, 200)
+    for title in titles[:20]:
+        expected = sum(1 for other in titles if fuzz.ratio(title, other) >= 70)
+        assert count_similar(title, titles) == expected
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models.post import Post
+from app.services import ingestion
+from app.services.analysis import (
+    POSTS_LOCK,
+    IncrementalAnalyzer,
+    ensure_summary,
+    read_summary,
+)
+from app.services.single_flight import SingleFlight, advisory_lock, lock_key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    runs = []
+    release = asyncio.Event()
+
+    async def work():
+        runs.append(1)
+        await release.wait()
+        return "result"
+
+    callers = [asyncio.create_task(flight.do("key", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert flight.in_flight("key")
+
+    # A caller giving up doesn't cancel the run the others wait on
+    callers[0].cancel()
+    release.set()
+    assert await asyncio.gather(*callers[1:]) == ["result"] * 4
+    assert len(runs) == 1
+    assert not flight.in_flight("key")
+
+    # Finished runs aren't reused
+    assert await flight.do("key", work) == "result"
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_lock_key_is_stable_and_signed_64_bit():
+    assert lock_key("posts-write") == lock_key("posts-write")
+    assert lock_key("posts-write") != lock_key("posts-read")
+    assert -(2**63) <= lock_key("posts-write") < 2**63
+
+
+@pytest.mark.asyncio
+async def test_advisory_lock_is_held_until_released(pg_engine):
+    order = []
+
+    async def worker(name, delay):
+        await asyncio.sleep(delay)
+        async with advisory_lock(pg_engine, "test-lock"):
+            order.append(f"{name} start")
+            await asyncio.sleep(0.05)
+            order.append(f"{name} end")
+
+    await asyncio.gather(worker("a", 0), worker("b", 0.01))
+    assert order == ["a start", "a end", "b start", "b end"]
+
+
+@pytest.mark.asyncio
+async def test_ensure_summary_builds_once(pg_session, monkeypatch):
+    pg_session.add_all(
+        Post(id=i, user_id=i % 3, title=f"title {i}", body="") for i in range(1, 10)
+    )
+    await pg_session.commit()
+    analyzer = IncrementalAnalyzer()
+    refreshes = []
+    refresh = analyzer.refresh
+
+    async def counting(db):
+        refreshes.append(1)
+        return await refresh(db)
+
+    monkeypatch.setattr(analyzer, "refresh", counting)
+
+    summaries = await asyncio.gather(
+        *(ensure_summary(analyzer, pg_session) for _ in range(5))
+    )
+    assert len(refreshes) == 1
+    assert all(summary is summaries[0] for summary in summaries)
+    assert summaries[0].all_users == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_ensure_summary_reads_what_another_worker_stored(pg_engine, pg_session):
+    factory = sessionmaker(bind=pg_engine, class_=AsyncSession, expire_on_commit=False)
+    pg_session.add(Post(id=1, user_id=1, title="a title", body=""))
+    await pg_session.commit()
+    analyzer = IncrementalAnalyzer()
+
+    # Another worker is building the summary
+    async with advisory_lock(pg_engine, POSTS_LOCK):
+        waiting = asyncio.create_task(ensure_summary(analyzer, pg_session))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        async with factory() as other:
+            await IncrementalAnalyzer().refresh(other)
+
+    summary = await waiting
+    assert summary.all_users == [1]
+    # This worker didn't load and flag the posts again
+    assert not analyzer.loaded
+    assert (await read_summary(pg_session)).refreshed_at == summary.refreshed_at
+
+
+@pytest.mark.asyncio
+async def test_syncs_wait_for_summary_builds(pg_engine, monkeypatch):
+    factory = sessionmaker(bind=pg_engine, class_=AsyncSession, expire_on_commit=False)
+    fetched = []
+
+    async def fake_fetch(db, client, sources):
+        fetched.append(1)
+        return ingestion.IngestResult(0, 0, 0, [])
+
+    monkeypatch.setattr(ingestion, "fetch_sources", fake_fetch)
+    scheduler = ingestion.IngestionScheduler(
+        url="http://upstream.test/posts", session_factory=factory
+    )
+
+    async with advisory_lock(pg_engine, POSTS_LOCK):
+        sync = asyncio.create_task(scheduler.sync_once())
+        await asyncio.sleep(0.05)
+        assert not fetched
+
+    await sync
+    assert fetched == [1]
+    await scheduler.stop()
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from app.services.sources import (
+    JSONItemsParser,
+    PostSource,
+    RateLimiter,
+    fetch_source,
+    load_sources,
+)
+
+
+def parse_in_chunks(text, items_path=None, seed=0):
+    rng = random.Random(seed)
+    parser = JSONItemsParser(items_path)
+    items = []
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 16)
+        items += parser.feed(text[pos : pos + size])
+        pos += size
+    return items + parser.close()
+
+
+def test_parser_handles_items_split_across_chunks():
+    payload = [
+        {"id": i, "title": 'tricky ",]}[ title' * (i % 3), "tags": [1, {"a": []}]}
+        for i in range(40)
+    ] + [-1.5e3, 12345, True, None, "text"]
+    for seed in range(20):
+        for indent in (None, 2):
+            text = json.dumps(payload, indent=indent)
+            assert parse_in_chunks(text, seed=seed) == payload
+
+
+def test_parser_reads_the_array_under_items_path():
+    payload = {"total": 2.5, "meta": {"posts": [0]}, "posts": [{"id": 1}, {"id": 2}]}
+    payload["after"] = [3]
+    for seed in range(20):
+        assert parse_in_chunks(json.dumps(payload), "posts", seed) == payload["posts"]
+
+
+@pytest.mark.parametrize(
+    "text, items_path",
+    [
+        ("[1, 2", None),
+        ("[1.]", None),
+        ('[{"a": 1} {"b": 2}]', None),
+        ('{"total": 1}', "posts"),
+    ],
+)
+def test_parser_rejects_malformed_payloads(text, items_path):
+    parser = JSONItemsParser(items_path)
+    with pytest.raises(ValueError):
+        parser.feed(text)
+        parser.close()
+
+
+def test_load_sources():
+    assert load_sources("", "http://a.test") == [PostSource("default", "http://a.test")]
+
+    sources = load_sources(
+        json.dumps(
+            [
+                {"name": "a", "url": "http://a.test", "paging": "page"},
+                {"name": "b", "url": "http://b.test", "fields": {"user_id": "author"}},
+            ]
+        ),
+        "http://unused.test",
+    )
+    assert [s.name for s in sources] == ["a", "b"]
+    assert sources[1].fields["user_id"] == "author"
+    assert sources[1].fields["title"] == "title"
+
+    with pytest.raises(ValueError):
+        load_sources('[{"name": "a", "url": "x", "paging": "cursor"}]', "")
+    with pytest.raises(ValueError):
+        load_sources('[{"name": "a", "url": "x"}, {"name": "a", "url": "y"}]', "")
+
+
+def test_map_item_and_page_params():
+    source = PostSource(
+        "b",
+        "http://b.test",
+        paging="offset",
+        page_size=30,
+        offset_param="skip",
+        size_param="limit",
+        fields={"id": "id", "user_id": "userId", "title": "title", "body": "text"},
+        id_offset=1000,
+        params={"lang": "en"},
+    )
+    item = {"id": "7", "userId": 2, "title": "t", "text": "b"}
+
+    assert source.map_item(item) == {
+        "id": 1007,
+        "user_id": 2,
+        "title": "t",
+        "body": "b",
+    }
+    assert source.page_params(2) == {"lang": "en", "skip": 60, "limit": 30}
+    assert PostSource("a", "x", paging="page").page_params(0) == {
+        "_page": 1,
+        "_limit": 100,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests(monkeypatch):
+    now = [0.0]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(4, clock=lambda: now[0])
+    for _ in range(3):
+        await limiter.wait()
+
+    assert sleeps == [0.25, 0.5]
+
+
+def items(start, stop):
+    return [
+        {"id": i, "userId": 1, "title": f"title {i}", "body": ""}
+        for i in range(start, stop)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_source_pages_concurrently_until_a_short_page():
+    in_flight = peak = 0
+    requested = []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        page = int(request.url.params["_page"])
+        requested.append(page)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        start = (page - 1) * 10 + 1
+        # 45 posts in all
+        return httpx.Response(200, json=items(start, min(start + 10, 46)))
+
+    source = PostSource(
+        "a", "http://a.test/posts", paging="page", page_size=10, concurrency=3
+    )
+    batches = []
+
+    async def put(batch):
+        batches.append(batch)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await fetch_source(client, source, put, batch_size=4)
+
+    ids = sorted(row["id"] for batch in batches for row in batch)
+    assert ids == list(range(1, 46))
+    assert max(len(batch) for batch in batches) == 4
+    assert peak == 3
+    # At most concurrency - 1 requests past the last page
+    assert sorted(requested)[:5] == [1, 2, 3, 4, 5]
+    assert len(requested) <= 7
+
+
+@pytest.mark.asyncio
+async def test_fetch_source_streams_a_chunked_body():
+    body = json.dumps({"total": 3, "posts": items(1, 4)}).encode()
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start : start + 7]
+
+    def handler(request):
+        return httpx.Response(200, content=chunks())
+
+    source = PostSource("a", "http://a.test/posts", items_path="posts")
+    rows = []
+
+    async def put(batch):
+        rows.extend(batch)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await fetch_source(client, source, put)
+
+    assert [row["title"] for row in rows] == ["title 1", "title 2", "title 3"]
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.api.posts import build_analysis
+from app.db.models.post import Post
+from app.schemas.post import PostQueryParams
+from app.services.ingestion import upsert_posts
+from app.services.analysis import (
+    IncrementalAnalyzer,
+    load_post_columns,
+    read_summary,
+)
+
+
+def make_posts(start, n):
+    return [
+        Post(
+            id=i,
+            user_id=i % 3 + 1,
+            title="same title" if i % 3 == 0 else f"title number {i}",
+            body="",
+        )
+        for i in range(start, start + n)
+    ]
+
+
+async def add_posts(db, posts):
+    db.add_all(posts)
+    await db.commit()
+    return posts
+
+
+@pytest.mark.asyncio
+async def test_refresh_stores_analyzer_summary(pg_session):
+    await add_posts(pg_session, make_posts(1, 30))
+    analyzer = IncrementalAnalyzer()
+
+    assert await read_summary(pg_session) is None
+    await analyzer.refresh(pg_session)
+
+    stored = await read_summary(pg_session)
+    expected = analyzer.summary()
+    assert {key: getattr(stored, key) for key in expected} == expected
+    assert stored.duplicate_count > 0 and stored.all_users == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_ingest_refreshes_summary(pg_session):
+    analyzer = IncrementalAnalyzer()
+    await analyzer.ingest(pg_session, await add_posts(pg_session, make_posts(1, 9)))
+    first = await read_summary(pg_session)
+    first_refresh, first_short = first.refreshed_at, first.short_title_count
+
+    # Nothing new, nothing to rewrite
+    await analyzer.ingest(pg_session, [])
+    assert (await read_summary(pg_session)).refreshed_at == first_refresh
+
+    new = await add_posts(pg_session, [Post(id=100, user_id=4, title="a", body="")])
+    await analyzer.ingest(pg_session, new)
+    second = await read_summary(pg_session)
+    assert second.refreshed_at > first_refresh
+    assert second.all_users == [1, 2, 3, 4]
+    assert second.short_title_count == analyzer.flag_counts["Short title"]
+    assert second.short_title_count > first_short
+
+
+@pytest.mark.asyncio
+async def test_workers_taking_turns_see_each_others_posts(pg_session):
+    # One analyzer per worker process, each fed only its own syncs' rows
+    first, second = IncrementalAnalyzer(), IncrementalAnalyzer()
+    await add_posts(
+        pg_session, [Post(id=10, user_id=1, title="a post with a long title", body="")]
+    )
+    await first.refresh(pg_session)
+    await second.load(pg_session)
+
+    duplicates = await upsert_posts(
+        pg_session,
+        [
+            {"id": 1, "user_id": 7, "title": "a long and identical title", "body": ""},
+            {"id": 2, "user_id": 7, "title": "a long and identical title", "body": ""},
+        ],
+    )
+    await first.ingest(pg_session, duplicates.posts)
+    edit = await upsert_posts(
+        pg_session,
+        [{"id": 1, "user_id": 7, "title": "a long and edited title", "body": ""}],
+    )
+    await second.ingest(pg_session, edit.posts)
+
+    flags = dict((await pg_session.execute(select(Post.id, Post.flag_reason))).all())
+    assert flags[2] is None
+    stored = await read_summary(pg_session)
+    assert stored.duplicate_count == 0
+    assert stored.all_users == [1, 7]
+
+
+@pytest.mark.asyncio
+async def test_analysis_reads_stored_summary(pg_session):
+    await add_posts(pg_session, make_posts(1, 12))
+    analyzer = IncrementalAnalyzer()
+    request = SimpleNamespace(
+        app=SimpleNamespace(
+            state=SimpleNamespace(
+                analyzer=analyzer, ingestion=SimpleNamespace(last_synced_at=None)
+            )
+        )
+    )
+    params = PostQueryParams(page=1, page_size=10)
+
+    # First request builds the summary, later ones only read it
+    first = await build_analysis(request=request, db=pg_session, params=params)
+    assert first.summary_refreshed_at is not None
+    assert first.filters.all_users == [1, 2, 3]
+
+    second = await build_analysis(request=request, db=pg_session, params=params)
+    assert second.summary_refreshed_at == first.summary_refreshed_at
+    assert second.summary == first.summary
+
+
+@pytest.mark.asyncio
+async def test_load_post_columns(pg_session):
+    posts = await add_posts(pg_session, make_posts(1, 12))
+    posts[0].flag_reason = "Duplicate"
+    await pg_session.commit()
+
+    columns = await load_post_columns(pg_session, batch_size=5)
+
+    assert list(columns.ids) == list(range(1, 13))
+    assert list(columns.user_ids) == [p.user_id for p in posts]
+    assert columns.titles == [p.title for p in posts]
+    assert next(iter(columns)).flag_reason == "Duplicate"
@@ -0,0 +1,86 @@
+"""Bot detection scaling with posts per user.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bot_detection [--sizes 100 500 1000 2000 4000]
+
+Times the original pairwise ``fuzz.ratio`` loop against the length-windowed,
+batched ``count_similar_pairs`` for a single user. Titles are mostly distinct
+so neither version can stop early; that is the worst case for both.
+"""
+
+import argparse
+import random
+import time
+
+from fuzzywuzzy import fuzz
+
+from app.services.similarity import count_similar_pairs
+
+BOT_SIMILAR_PAIRS = 5
+_rng = random.Random(0)
+WORDS = [
+    "".join(
+        _rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_rng.randint(2, 10))
+    )
+    for _ in range(5000)
+]
+
+
+def make_titles(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))) for _ in range(n)
+    ]
+
+
+def pairwise_is_bot(titles: list) -> bool:
+    similar_count = 0
+    n = len(titles)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if fuzz.ratio(titles[i], titles[j]) >= 70:
+                similar_count += 1
+                if similar_count > BOT_SIMILAR_PAIRS:
+                    return True
+    return False
+
+
+def batched_is_bot(titles: list) -> bool:
+    return count_similar_pairs(titles, BOT_SIMILAR_PAIRS + 1) > BOT_SIMILAR_PAIRS
+
+
+def timed(fn, titles) -> float:
+    start = time.perf_counter()
+    fn(titles)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000, 4000]
+    )
+    parser.add_argument(
+        "--pairwise-max",
+        type=int,
+        default=2000,
+        help="skip the pairwise loop above this many posts",
+    )
+    args = parser.parse_args()
+
+    print(f"{'posts/user':>10} {'pairwise (s)':>13} {'batched (s)':>12} {'speedup':>8}")
+    for n in args.sizes:
+        titles = make_titles(n)
+        batched = timed(batched_is_bot, titles)
+        if n <= args.pairwise_max:
+            assert pairwise_is_bot(titles) == batched_is_bot(titles)
+            pairwise = timed(pairwise_is_bot, titles)
+            print(
+                f"{n:>10} {pairwise:>13.3f} {batched:>12.3f} {pairwise / batched:>7.1f}x"
+            )
+        else:
+            print(f"{n:>10} {'-':>13} {batched:>12.3f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Peak RSS of the posts held for analytics, by representation.
+
+Usage (from backend/):
+    python -m benchmarks.bench_memory [--sizes 100000 1000000]
+
+Each case runs in a fresh interpreter: it builds one representation of
+the synthetic posts, runs categorize_posts, detect_bot_users and
+get_top_users on it, and reports the process's peak RSS, plus the growth
+over the RSS measured right before building. Posts are generated one at a
+time, so the payload itself never sits in memory.
+  orm      Post instances with their body, as a full ORM load held them
+  rows     (id, user_id, title, flag_reason) tuples, like result.all()
+  columns  PostColumns: array("i") ids and user ids, a list of titles
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import iter_posts
+
+CASES = ("orm", "rows", "columns")
+POSTS_PER_USER = 50
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 2**20
+
+
+def build(case: str, n: int):
+    from app.db.models.post import Post
+    from app.services.flags import PostColumns, PostRow
+
+    users = max(1, n // POSTS_PER_USER)
+    if case == "orm":
+        return [
+            Post(id=p["id"], user_id=p["userId"], title=p["title"], body=p["body"])
+            for p in iter_posts(n, users)
+        ]
+    posts = iter_posts(n, users, body_words=0)
+    if case == "rows":
+        return [PostRow(p["id"], p["userId"], p["title"]) for p in posts]
+    return PostColumns((p["id"], p["userId"], p["title"]) for p in posts)
+
+
+def run_case(case: str, n: int) -> dict:
+    # The engine is created on import but never connects
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/unused")
+    from app.db.models.post import Post  # noqa: F401
+    from app.services.flags import categorize_posts, detect_bot_users, get_top_users
+
+    before = current_rss_mb()
+    start = time.perf_counter()
+    posts = build(case, n)
+    held = current_rss_mb() - before
+    if case == "columns":
+        # The columns are enough for every step; nothing is passed along
+        categorize_posts(posts)
+        detect_bot_users(posts)
+        get_top_users(posts)
+    else:
+        _, user_titles, _, _, user_unique_words = categorize_posts(posts)
+        detect_bot_users(user_titles)
+        get_top_users(user_unique_words)
+    return {
+        "case": case,
+        "posts": n,
+        "held_mb": round(held, 1),
+        "peak_mb": round(peak_rss_mb(), 1),
+        "peak_growth_mb": round(peak_rss_mb() - before, 1),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "N"), help="internal")
+    args = parser.parse_args()
+
+    if args.child:
+        case, n = args.child
+        print(json.dumps(run_case(case, int(n))))
+        return
+
+    print(f"{'posts':>9} {'case':>8} {'held MB':>9} {'peak MB':>9} {'growth MB':>10}")
+    for n in args.sizes:
+        for case in args.cases:
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_memory",
+                    "--child",
+                    case,
+                    str(n),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            r = json.loads(out.stdout.splitlines()[-1])
+            print(
+                f"{n:>9} {case:>8} {r['held_mb']:>9} {r['peak_mb']:>9} "
+                f"{r['peak_growth_mb']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
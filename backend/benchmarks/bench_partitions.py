@@ -0,0 +1,186 @@
+"""Per-user queries and analytics loads on plain vs hash-partitioned posts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_partitions --database-url URL
+        [--posts 5000000 --users 50000 --partitions 16 --concurrency 4]
+        [--output benchmarks/results/partitions.json]
+
+Fills the disposable database (its tables are dropped and recreated) with
+``--posts`` rows straight from generate_series, times per-user queries and
+the analyzer's column load on the plain table the schema had before
+migration b5d2e7c41f63, converts it in place with ``partition_posts``
+(timing that too, as the migration runs it), and times the same work on the
+partitioned table. Query times are medians over
+``--repeat`` random users; "partitions" is how many partitions their plans
+scan.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+QUERIES = {
+    "user_page": (
+        "SELECT id, user_id, title, flag_reason FROM posts "
+        "WHERE user_id = :user_id ORDER BY title, id LIMIT 10"
+    ),
+    "user_count": "SELECT count(*) FROM posts WHERE user_id = :user_id",
+    "user_flagged": (
+        "SELECT count(*) FROM posts WHERE user_id = :user_id "
+        "AND flag_reason IS NOT NULL"
+    ),
+}
+
+SEED = """
+INSERT INTO posts (id, user_id, title, body, flag_reason)
+SELECT g, (g::bigint * 7919) % CAST(:users AS integer),
+       'post ' || substr(md5(g::text), 1, 6) || ' topic ' || g % 997,
+       '',
+       CASE WHEN g % 50 = 0 THEN 'Duplicate' END
+FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS g
+"""
+
+
+async def timed(fn: Callable) -> float:
+    start = time.perf_counter()
+    await fn()
+    return time.perf_counter() - start
+
+
+async def measure(engine, users: List[int], partitions: int, concurrency: int):
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.services.analysis import load_partitions, load_post_columns
+
+    results: Dict[str, dict] = {}
+    async with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            query = text(sql)
+            # Warm the plan and the cache
+            await conn.execute(query, {"user_id": users[0]})
+            times = []
+            for user_id in users:
+                start = time.perf_counter()
+                (await conn.execute(query, {"user_id": user_id})).all()
+                times.append(time.perf_counter() - start)
+            plan = "\n".join(
+                await conn.scalars(
+                    text(f"EXPLAIN {sql}".replace(":user_id", str(users[0])))
+                )
+            )
+            scanned = sum(f"posts_p{i} " in plan for i in range(partitions))
+            results[name] = {
+                "median_ms": statistics.median(times) * 1000,
+                "partitions": scanned or 1,
+            }
+
+    async def full_load():
+        async with AsyncSession(engine) as db:
+            await load_post_columns(db)
+
+    results["analytics_load"] = {"seconds": await timed(full_load)}
+    if partitions:
+        results["analytics_load_parallel"] = {
+            "seconds": await timed(
+                lambda: load_partitions(engine, partitions, concurrency)
+            )
+        }
+    return results
+
+
+async def run(args) -> dict:
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("INGESTION_ENABLED", "false")
+
+    from sqlalchemy import text
+
+    from app.db.partitioning import partition_posts, unpartition_posts
+    from app.db.session import engine
+    from benchmarks.suite import reset_schema
+
+    await reset_schema(engine)
+    # Start from the plain table; partitioning happens in place below
+    async with engine.begin() as conn:
+        await conn.run_sync(unpartition_posts)
+    print(f"Seeding {args.posts} posts for {args.users} users")
+    step = 1_000_000
+    async with engine.begin() as conn:
+        for start in range(1, args.posts + 1, step):
+            stop = min(args.posts, start + step - 1)
+            await conn.execute(
+                text(SEED), {"users": args.users, "start": start, "stop": stop}
+            )
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE posts"))
+
+    rng = random.Random(0)
+    users = [rng.randrange(args.users) for _ in range(args.repeat)]
+    plain = await measure(engine, users, 0, args.concurrency)
+
+    async def convert():
+        async with engine.begin() as conn:
+            await conn.run_sync(partition_posts, args.partitions)
+
+    migration = await timed(convert)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE posts"))
+    partitioned = await measure(engine, users, args.partitions, args.concurrency)
+    await engine.dispose()
+
+    print(f"\nMigration to {args.partitions} partitions: {migration:.1f}s")
+    print(f"\n{'query':<24} {'plain':>12} {'partitioned':>12} {'partitions':>11}")
+    for name in QUERIES:
+        p, q = plain[name], partitioned[name]
+        print(
+            f"{name:<24} {p['median_ms']:>9.2f} ms {q['median_ms']:>9.2f} ms "
+            f"{q['partitions']:>5}/{args.partitions}"
+        )
+    print(
+        f"{'analytics_load':<24} {plain['analytics_load']['seconds']:>10.2f} s "
+        f"{partitioned['analytics_load']['seconds']:>10.2f} s"
+    )
+    print(
+        f"{'analytics_load_parallel':<24} {'':>12} "
+        f"{partitioned['analytics_load_parallel']['seconds']:>10.2f} s "
+        f"{'x' + str(args.concurrency):>11}"
+    )
+    return {
+        "posts": args.posts,
+        "users": args.users,
+        "partitions": args.partitions,
+        "concurrency": args.concurrency,
+        "migration_seconds": migration,
+        "plain": plain,
+        "partitioned": partitioned,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--posts", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""In-memory title search against the SQL (ILIKE/pg_trgm) search.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search --database-url URL [--users 200]
+
+Loads synthetic posts into a disposable Postgres database, builds the
+in-memory index from it and times one search page per query both ways.
+Words of four or more characters go through the pg_trgm ``%`` operator on
+the SQL side, so without the extension only shorter words are compared.
+Also reports the index build time and its size in memory.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from benchmarks.synthetic import generate_posts
+
+
+async def run(database_url: str, users: int, posts_per_user: int, repeat: int):
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("INGESTION_ENABLED", "false")
+
+    from sqlalchemy import insert, text
+
+    from app.api.posts import POST_COLUMNS
+    from app.db.models.post import Post
+    from app.db.session import AsyncSessionLocal, engine
+    from app.services.pagination import paginate_composite
+    from app.services.search import SearchIndex, search_page
+    from benchmarks.suite import reset_schema
+
+    await reset_schema(engine)
+    posts = generate_posts(users=users, posts_per_user=posts_per_user)
+    async with engine.begin() as conn:
+        for start in range(0, len(posts), 5000):
+            await conn.execute(
+                insert(Post),
+                [
+                    {
+                        "id": p["id"],
+                        "user_id": p["userId"],
+                        "title": p["title"],
+                        "body": p["body"],
+                    }
+                    for p in posts[start : start + 5000]
+                ],
+            )
+        trigram = bool(
+            await conn.scalar(
+                text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+            )
+        )
+
+    # Real words from the corpus, long and short, one and two at a time
+    words = sorted({word for p in posts[:200] for word in p["title"].split()})
+    long_words = [w for w in words if len(w) >= 4][:3]
+    short_words = [w for w in words if len(w) == 3][:3]
+    queries = short_words + [f"{short_words[0]} {short_words[1]}"]
+    if trigram:
+        queries += long_words + [f"{long_words[0]} {long_words[1]}"]
+    else:
+        print("pg_trgm is not installed; comparing words under 4 characters only")
+
+    async with AsyncSessionLocal() as db:
+        index = SearchIndex(max_posts=len(posts))
+        tracemalloc.start()
+        start = time.perf_counter()
+        await index.load(db)
+        build = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"index: {len(posts)} posts, {index.stats()['tokens']} tokens, "
+            f"built in {build:.2f}s, ~{size / 2**20:.1f} MiB"
+        )
+
+        async def best_of(fn):
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                page = await fn()
+                samples.append(time.perf_counter() - start)
+            return min(samples), page["total_count"]
+
+        print(
+            f"\n{'query':<24} {'sql (ms)':>9} {'hits':>6} "
+            f"{'memory (ms)':>12} {'hits':>6} {'speedup':>8}"
+        )
+        for query in queries:
+            sql, sql_hits = await best_of(
+                lambda: paginate_composite(
+                    Post,
+                    db,
+                    search=query,
+                    search_columns=[Post.title],
+                    columns=POST_COLUMNS,
+                    count_strategy="exact",
+                )
+            )
+            memory, memory_hits = await best_of(
+                lambda: search_page(
+                    db, index, query, columns=POST_COLUMNS, ordering="relevance"
+                )
+            )
+            print(
+                f"{query:<24} {sql * 1000:>9.2f} {sql_hits:>6} "
+                f"{memory * 1000:>12.2f} {memory_hits:>6} {sql / memory:>7.1f}x"
+            )
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts-per-user", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+    asyncio.run(run(args.database_url, args.users, args.posts_per_user, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Per-item cost of building and encoding an analyze-posts page.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --database-url URL [--page-size 100]
+
+Per-item cost is the difference between a full page and a one-row page,
+so the fixed cost of the count and page queries drops out. Compares, for
+one page read from a disposable Postgres database:
+  orm+response_model  ORM rows, from_orm per item, then FastAPI's second
+                      response_model validation and the stdlib JSON encoder
+  orm+dump_json       ORM rows, per-item validation, model_dump_json
+  columns+orjson      column tuples, one validation pass, orjson
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import orjson
+
+from benchmarks.synthetic import generate_posts
+
+SUMMARY = {
+    "top_three_users": [1, 2, 3],
+    "common_words": [{"word": f"word{i}", "count": 10 - i} for i in range(10)],
+    "bot_count": 5,
+    "short_title_count": 7,
+    "duplicate_count": 3,
+}
+
+
+async def run(database_url: str, page_size: int, repeat: int):
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("INGESTION_ENABLED", "false")
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert
+
+    from app.api.posts import POST_COLUMNS
+    from app.db.models.post import Post
+    from app.db.session import AsyncSessionLocal, engine
+    from app.schemas.post import AnalyzePostsResponse, PostBase
+    from app.services.pagination import paginate_composite
+    from benchmarks.suite import reset_schema
+
+    await reset_schema(engine)
+    posts = generate_posts(users=100, posts_per_user=50)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Post),
+            [
+                {
+                    "id": p["id"],
+                    "user_id": p["userId"],
+                    "title": p["title"],
+                    "body": p["body"],
+                }
+                for p in posts
+            ],
+        )
+
+    adapter = TypeAdapter(AnalyzePostsResponse)
+    users = list(range(1, 101))
+    filters = {"all_users": users, "all_flag_reasons": ["Bot", "Duplicate"]}
+    synced = datetime.now(timezone.utc)
+
+    async with AsyncSessionLocal() as db:
+
+        async def orm_page(size):
+            return await paginate_composite(
+                Post, db, page=2, page_size=size, schema=PostBase
+            )
+
+        async def orm_response_model(size):
+            paginated = await orm_page(size)
+            response = AnalyzePostsResponse(
+                posts=paginated,
+                summary=SUMMARY,
+                filters=filters,
+                duration=0.1,
+                last_synced_at=synced,
+            )
+            # What FastAPI does with a returned model and response_model
+            validated = adapter.validate_python(response, from_attributes=True)
+            content = adapter.dump_python(validated, mode="json")
+            return json.dumps(content, ensure_ascii=False).encode()
+
+        async def orm_dump_json(size):
+            paginated = await orm_page(size)
+            response = AnalyzePostsResponse(
+                posts=paginated,
+                summary=SUMMARY,
+                filters=filters,
+                duration=0.1,
+                last_synced_at=synced,
+            )
+            return response.model_dump_json().encode()
+
+        async def columns_orjson(size):
+            paginated = await paginate_composite(
+                Post, db, page=2, page_size=size, columns=POST_COLUMNS
+            )
+            response = AnalyzePostsResponse.model_validate(
+                {
+                    "posts": paginated,
+                    "summary": SUMMARY,
+                    "filters": filters,
+                    "duration": 0.1,
+                    "last_synced_at": synced,
+                }
+            )
+            return orjson.dumps(response.model_dump())
+
+        async def best_of(fn, size):
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await fn(size)
+                samples.append(time.perf_counter() - start)
+            return min(samples)
+
+        first = None
+        print(f"{'variant':<20} {'page (ms)':>10} {'per item (us)':>14}")
+        for name, fn in [
+            ("orm+response_model", orm_response_model),
+            ("orm+dump_json", orm_dump_json),
+            ("columns+orjson", columns_orjson),
+        ]:
+            body = json.loads(await fn(page_size))
+            assert len(body["posts"]["items"]) == page_size
+            full = await best_of(fn, page_size)
+            per_item = (full - await best_of(fn, 1)) / (page_size - 1)
+            first = first or per_item
+            print(
+                f"{name:<20} {full * 1000:>10.2f} {per_item * 1e6:>14.1f}"
+                f"   {first / per_item:.1f}x"
+            )
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+    asyncio.run(run(args.database_url, args.page_size, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
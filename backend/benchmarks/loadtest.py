@@ -0,0 +1,387 @@
+"""Load test of the running app against local Postgres and a stub upstream.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --database-url URL [--users 200 --posts-per-user 50]
+        [--rps 50 --duration 30] [--mix search=3,filter=3,deep=1,single=3,batch=1]
+        [--workers 1] [--env RESPONSE_CACHE_ENABLED=false ...]
+        [--output benchmarks/results/loadtest.json]
+
+Seeds the disposable database (its tables are dropped and recreated) with
+synthetic posts, serves the same posts from a local stand-in for the
+jsonplaceholder upstream, and starts the app under uvicorn pointed at both.
+Requests are then sent open-loop: each one starts at its scheduled time
+whether or not earlier ones have finished, and its latency is counted from
+that time, so a backed-up server shows up as latency instead of as a lower
+request rate. Reports p50/p95/p99 latency, throughput and error rate per
+endpoint.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic import generate_posts
+
+ENDPOINTS = ("search", "filter", "deep", "single", "batch")
+DEFAULT_MIX = "search=3,filter=3,deep=1,single=3,batch=1"
+FLAG_REASONS = ("Bot", "Duplicate", "Short title")
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in --mix: {name}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("--mix needs at least one positive weight")
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    # Nearest rank
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+# ------------------------
+# Setup
+# ------------------------
+
+
+async def seed(database_url: str, posts: List[dict]):
+    os.environ["DATABASE_URL"] = database_url
+
+    from sqlalchemy import text
+
+    from app.db.session import AsyncSessionLocal, engine
+    from app.services.ingestion import upsert_posts, upstream_rows
+    from benchmarks.suite import reset_schema
+
+    await reset_schema(engine)
+    async with AsyncSessionLocal() as db:
+        await upsert_posts(db, upstream_rows(posts))
+        installed = await db.scalar(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        )
+    await engine.dispose()
+    if not installed:
+        print(
+            "pg_trgm is not installed: SQL searches will fail; "
+            "try --env SEARCH_BACKEND=memory"
+        )
+
+
+def stub_app(posts: List[dict], latency: float):
+    """jsonplaceholder's ``/posts``, with its ``_page``/``_limit`` paging."""
+    import orjson
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    everything = orjson.dumps(posts)
+
+    async def list_posts(request):
+        if latency:
+            await asyncio.sleep(latency)
+        params = request.query_params
+        if "_page" not in params:
+            return Response(everything, media_type="application/json")
+        limit = int(params.get("_limit", 10))
+        start = (int(params["_page"]) - 1) * limit
+        body = orjson.dumps(posts[start : start + limit])
+        return Response(body, media_type="application/json")
+
+    return Starlette(routes=[Route("/posts", list_posts)])
+
+
+def start_app(
+    port: int, database_url: str, upstream_url: str, workers: int, env: List[str]
+) -> subprocess.Popen:
+    app_env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        POSTS_SOURCE_URL=upstream_url,
+        # Without it no sync ever reaches the stub
+        INGESTION_ENABLED="true",
+    )
+    app_env.update(item.split("=", 1) for item in env)
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            # Longer than the run, so the client never reuses a connection
+            # the server is closing
+            "--timeout-keep-alive",
+            "3600",
+        ],
+        env=app_env,
+    )
+
+
+async def wait_ready(client, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app exited with code {process.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("The app did not start in time")
+
+
+# ------------------------
+# Traffic
+# ------------------------
+
+
+def request_factory(posts: List[dict], page_size: int) -> Dict[str, Callable]:
+    """Per endpoint, a function drawing a random request URL."""
+    ids = [p["id"] for p in posts]
+    users = sorted({p["userId"] for p in posts})
+    words = [w for p in posts[:2000] for w in p["title"].split() if len(w) > 3]
+    deep_pages = max(1, len(posts) // 100)
+
+    def search(rng):
+        return f"/posts/analyze-posts?search={rng.choice(words)}&page_size={page_size}"
+
+    def filter_(rng):
+        if rng.random() < 0.5:
+            query = f"user_id={rng.choice(users)}"
+        else:
+            query = f"reason={rng.choice(FLAG_REASONS)}"
+        page = rng.randint(1, 3)
+        return f"/posts/analyze-posts?{query}&page={page}&page_size={page_size}"
+
+    def deep(rng):
+        page = rng.randint(deep_pages // 2 + 1, deep_pages)
+        return f"/posts/analyze-posts?order_by=title:asc&page={page}&page_size=100"
+
+    def single(rng):
+        return f"/posts/single/{rng.choice(ids)}"
+
+    def batch(rng):
+        return "/posts/batch?ids=" + ",".join(
+            str(i) for i in rng.sample(ids, min(20, len(ids)))
+        )
+
+    return {
+        "search": search,
+        "filter": filter_,
+        "deep": deep,
+        "single": single,
+        "batch": batch,
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def record(self, latency: float, status):
+        self.latencies.append(latency)
+        self.statuses[str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def report(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+        total = len(ordered)
+        return {
+            "requests": total,
+            "throughput": total / elapsed if elapsed else 0.0,
+            "error_rate": self.errors / total if total else 0.0,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+            "statuses": dict(self.statuses),
+        }
+
+
+async def drive(
+    client,
+    factories: Dict[str, Callable],
+    mix: Dict[str, float],
+    rps: float,
+    duration: float,
+    poisson: bool,
+    seed: int = 0,
+) -> dict:
+    rng = random.Random(seed)
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    stats = {name: Stats() for name in names}
+    tasks = []
+
+    async def send(name: str, url: str, scheduled: float):
+        try:
+            response = await client.get(url)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        stats[name].record(time.perf_counter() - scheduled, status)
+
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled - start < duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = rng.choices(names, weights)[0]
+        url = factories[name](rng)
+        tasks.append(asyncio.create_task(send(name, url, scheduled)))
+        scheduled += rng.expovariate(rps) if poisson else 1 / rps
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    results = {name: s.report(elapsed) for name, s in stats.items()}
+    combined = Stats()
+    for s in stats.values():
+        combined.latencies += s.latencies
+        combined.statuses.update(s.statuses)
+        combined.errors += s.errors
+    results["all"] = combined.report(elapsed)
+    return results
+
+
+def print_report(results: dict):
+    print(
+        f"\n{'endpoint':<8} {'requests':>9} {'req/s':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses"
+    )
+    for name, r in results.items():
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(r["statuses"].items()))
+        print(
+            f"{name:<8} {r['requests']:>9} {r['throughput']:>8.1f} "
+            f"{r['error_rate']:>7.1%} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+            f"{r['p99_ms']:>8.1f}  {statuses}"
+        )
+
+
+async def run(args) -> dict:
+    import httpx
+    import uvicorn
+
+    posts = generate_posts(users=args.users, posts_per_user=args.posts_per_user)
+    print(f"Seeding {len(posts)} posts")
+    await seed(args.database_url, posts)
+
+    stub_port, app_port = free_port(), free_port()
+    stub = uvicorn.Server(
+        uvicorn.Config(
+            stub_app(posts, args.upstream_latency),
+            host="127.0.0.1",
+            port=stub_port,
+            log_level="warning",
+        )
+    )
+    stub_task = asyncio.create_task(stub.serve())
+    process = start_app(
+        app_port,
+        args.database_url,
+        f"http://127.0.0.1:{stub_port}/posts",
+        args.workers,
+        args.env,
+    )
+    limits = httpx.Limits(max_connections=args.max_connections)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{app_port}",
+            limits=limits,
+            timeout=args.timeout,
+        ) as client:
+            await wait_ready(client, process)
+            # Builds the stored summary before anything is timed
+            (await client.get("/posts/analyze-posts")).raise_for_status()
+
+            factories = request_factory(posts, args.page_size)
+            mix = parse_mix(args.mix)
+            print(f"Sending {args.rps} req/s for {args.duration}s")
+            results = await drive(
+                client, factories, mix, args.rps, args.duration, args.poisson
+            )
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        stub.should_exit = True
+        await stub_task
+
+    print_report(results)
+    return {
+        "posts": len(posts),
+        "rps": args.rps,
+        "duration": args.duration,
+        "workers": args.workers,
+        "mix": args.mix,
+        "env": args.env,
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url", default=os.getenv("BENCH_DATABASE_URL"), required=False
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts-per-user", type=int, default=50)
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument(
+        "--poisson", action="store_true", help="exponential gaps between requests"
+    )
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--upstream-latency", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument(
+        "--env", action="append", default=[], help="KEY=VALUE for the app process"
+    )
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+    parse_mix(args.mix)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
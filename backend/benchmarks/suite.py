@@ -0,0 +1,289 @@
+"""Benchmark suite for the analysis and pagination hot paths.
+
+Usage (from backend/):
+    python -m benchmarks.suite [--users 200 --posts-per-user 50]
+        [--database-url postgresql+asyncpg://postgres@localhost/adinsights_bench]
+        [--output benchmarks/results/latest.json]
+        [--baseline benchmarks/results/baseline.json --max-regression 0.25]
+
+The flagging functions always run. The pagination and endpoint cases need a
+disposable Postgres database (``--database-url`` or ``BENCH_DATABASE_URL``);
+its tables are dropped and recreated. Results are written as JSON. When a
+baseline is given, any case whose median is more than ``--max-regression``
+slower fails the run with exit code 1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from benchmarks.synthetic import as_rows, generate_posts
+
+DEFAULT_OUTPUT = Path(__file__).parent / "results" / "latest.json"
+# Differences below this are timer noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "repeat": len(samples),
+    }
+
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_async(fn: Callable, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+# ------------------------
+# Cases
+# ------------------------
+
+
+def bench_flags(posts: list, repeat: int) -> Dict[str, dict]:
+    from app.services.flags import categorize_posts, detect_bot_users, get_top_users
+
+    rows = as_rows(posts)
+    _, user_titles, _, _, user_unique_words = categorize_posts(rows)
+    return {
+        "categorize_posts": measure(lambda: categorize_posts(rows), repeat),
+        "detect_bot_users": measure(lambda: detect_bot_users(user_titles), repeat),
+        "get_top_users": measure(lambda: get_top_users(user_unique_words), repeat),
+    }
+
+
+async def reset_schema(engine):
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+
+    from app.db.models.post import Post
+    from app.db.models.post_summary import PostSummary  # noqa: F401
+    from app.db.session import Base
+
+    async with engine.begin() as conn:
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            skipped = set()
+        except DBAPIError:
+            # Without pg_trgm the GIN trigram index can't be built
+            skipped = {
+                index
+                for index in Post.__table__.indexes
+                if index.dialect_options["postgresql"]["using"] == "gin"
+            }
+        Post.__table__.indexes.difference_update(skipped)
+        try:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        finally:
+            Post.__table__.indexes.update(skipped)
+
+
+async def bench_database(posts: list, repeat: int) -> Dict[str, dict]:
+    import httpx
+
+    from app.db.models.post import Post
+    from app.db.session import AsyncSessionLocal, engine
+    from app.main import app
+    from app.schemas.post import PostBase
+    from app.services import ingestion
+    from app.services.pagination import paginate_composite
+    from app.services.response_cache import response_cache
+
+    await reset_schema(engine)
+    results = {}
+
+    # Ingestion and the endpoint run through the real app with the upstream
+    # fetch replaced by the synthetic payload.
+    async def stub_fetch(db, client, sources):
+        return await ingestion.upsert_posts(db, ingestion.upstream_rows(posts))
+
+    original_fetch = ingestion.fetch_sources
+    ingestion.fetch_sources = stub_fetch
+    try:
+        async with app.router.lifespan_context(app):
+            start = time.perf_counter()
+            await app.state.ingestion.sync_once()
+            results["ingest_and_flag"] = summarize([time.perf_counter() - start])
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+
+                async def get(url):
+                    response = await client.get(url)
+                    response.raise_for_status()
+
+                response_cache.enabled = False
+                for name, url in [
+                    ("endpoint_first_page", "/posts/analyze-posts"),
+                    ("endpoint_by_reason", "/posts/analyze-posts?reason=Bot"),
+                    (
+                        "endpoint_deep_page",
+                        "/posts/analyze-posts?order_by=title:asc&page=50&page_size=100",
+                    ),
+                ]:
+                    results[name] = await measure_async(lambda: get(url), repeat)
+
+                response_cache.enabled = True
+                results["endpoint_cached"] = await measure_async(
+                    lambda: get("/posts/analyze-posts"), repeat
+                )
+    finally:
+        ingestion.fetch_sources = original_fetch
+
+    async with AsyncSessionLocal() as db:
+        middle = len(posts) // 2
+        cursor_page = await paginate_composite(
+            Post, db, page=middle // 10, ordering="title:asc", schema=PostBase
+        )
+        cases = {
+            "paginate_first_page": dict(ordering="id:asc"),
+            "paginate_deep_offset": dict(page=middle // 10, ordering="title:asc"),
+            "paginate_cursor": dict(
+                ordering="title:asc", cursor=cursor_page["next_cursor"]
+            ),
+            "paginate_filtered": dict(
+                ordering="id:desc", base_filters=[Post.user_id == 1]
+            ),
+        }
+        for name, kwargs in cases.items():
+            results[name] = await measure_async(
+                lambda: paginate_composite(Post, db, schema=PostBase, **kwargs),
+                repeat,
+            )
+
+    await engine.dispose()
+    return results
+
+
+# ------------------------
+# Reporting
+# ------------------------
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    print(f"\n{'case':<24} {'baseline (s)':>13} {'current (s)':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<24} {'-':>13} {result['median']:>12.4f} {'new':>8}")
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else 1.0
+        print(
+            f"{name:<24} {before['median']:>13.4f} {result['median']:>12.4f} "
+            f"{(ratio - 1) * 100:>+7.1f}%"
+        )
+        slower_by = result["median"] - before["median"]
+        if ratio > 1 + max_regression and slower_by > MIN_REGRESSION_SECONDS:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts-per-user", type=int, default=50)
+    parser.add_argument("--title-words", type=int, nargs=2, default=[3, 8])
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--database-url", default=os.getenv("BENCH_DATABASE_URL"), help="disposable"
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    config = {
+        "users": args.users,
+        "posts_per_user": args.posts_per_user,
+        "title_words": args.title_words,
+        "near_duplicate_rate": args.near_duplicate_rate,
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+    posts = generate_posts(
+        users=args.users,
+        posts_per_user=args.posts_per_user,
+        title_words=tuple(args.title_words),
+        near_duplicate_rate=args.near_duplicate_rate,
+        seed=args.seed,
+    )
+
+    # The app reads its settings at import time
+    os.environ.setdefault("INGESTION_ENABLED", "false")
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ.setdefault(
+            "DATABASE_URL", "postgresql+asyncpg://localhost/adinsights_bench"
+        )
+
+    results = bench_flags(posts, args.repeat)
+    if args.database_url:
+        results.update(asyncio.run(bench_database(posts, args.repeat)))
+    else:
+        print("No --database-url/BENCH_DATABASE_URL; skipping database cases")
+
+    current = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"{name:<24} median {result['median']:.4f}s  min {result['min']:.4f}s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(current, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != config:
+            print("warning: baseline was recorded with a different config")
+        regressions = compare(current, baseline, args.max_regression)
+        if regressions:
+            print(
+                f"Regressed beyond {args.max_regression:.0%}: {', '.join(regressions)}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
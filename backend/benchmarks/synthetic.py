@@ -0,0 +1,91 @@
+"""Seeded synthetic posts shaped like the upstream JSON payload."""
+
+import random
+from typing import Iterator, List, Tuple
+
+from app.services.flags import PostRow
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+
+def make_vocabulary(size: int = 5000, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(ALPHABET) for _ in range(rng.randint(2, 10)))
+        for _ in range(size)
+    ]
+
+
+def near_duplicate(rng: random.Random, title: str, vocabulary: List[str]) -> str:
+    # Swapping one word keeps most titles above the 70% similarity cutoff
+    words = title.split()
+    words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return " ".join(words)
+
+
+def generate_posts(
+    users: int = 50,
+    posts_per_user: int = 40,
+    title_words: Tuple[int, int] = (3, 8),
+    near_duplicate_rate: float = 0.05,
+    seed: int = 0,
+    vocabulary_size: int = 5000,
+) -> List[dict]:
+    """Posts as ``{"id", "userId", "title", "body"}`` dicts.
+
+    With probability ``near_duplicate_rate`` a post reuses one of the same
+    user's earlier titles with one word swapped.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    posts = []
+    post_id = 1
+    for user_id in range(1, users + 1):
+        titles = []
+        for _ in range(posts_per_user):
+            if titles and rng.random() < near_duplicate_rate:
+                title = near_duplicate(rng, rng.choice(titles), vocabulary)
+            else:
+                title = " ".join(
+                    rng.choice(vocabulary) for _ in range(rng.randint(*title_words))
+                )
+            titles.append(title)
+            posts.append(
+                {
+                    "id": post_id,
+                    "userId": user_id,
+                    "title": title[:255],
+                    "body": " ".join(rng.choice(vocabulary) for _ in range(30)),
+                }
+            )
+            post_id += 1
+    rng.shuffle(posts)
+    return posts
+
+
+def as_rows(posts: List[dict]) -> List[PostRow]:
+    return [PostRow(p["id"], p["userId"], p["title"]) for p in posts]
+
+
+def iter_posts(
+    n: int,
+    users: int,
+    body_words: int = 30,
+    seed: int = 0,
+    vocabulary_size: int = 5000,
+) -> Iterator[dict]:
+    """``n`` posts in the ``generate_posts`` shape, generated one at a time.
+
+    For sizes where holding the payload would dwarf what is measured. Posts
+    are spread round-robin over ``users``; there are no near-duplicates.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    for post_id in range(1, n + 1):
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 8)))
+        yield {
+            "id": post_id,
+            "userId": post_id % users + 1,
+            "title": title[:255],
+            "body": " ".join(rng.choice(vocabulary) for _ in range(body_words)),
+        }
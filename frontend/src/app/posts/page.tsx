@@ -52,9 +52,11 @@ export default function PostsPage() {
   const [filters, setFilters] = useState<{
     all_users: number[];
     all_flag_reasons: string[];
+    relevance_available?: boolean;
   }>(() => ({
     all_users: contextData.filters.all_users || [],
     all_flag_reasons: contextData.filters.all_flag_reasons || [],
+    relevance_available: contextData.filters.relevance_available ?? false,
   }));
   const [currentPage, setCurrentPage] = useState<number>(
     contextData.posts.current_page
@@ -75,6 +77,15 @@ export default function PostsPage() {
   const hasFetchedOnce = useRef(false);
   const initialContextPage = useRef(contextData.posts.current_page);
 
+  // Drop the relevance order once the search is cleared or the API can no
+  // longer rank (it would silently order by id instead)
+  useEffect(() => {
+    if (orderBy?.value !== 'relevance') return;
+    if (!debouncedSearchQuery || !filters.relevance_available) {
+      setOrderBy(null);
+    }
+  }, [orderBy, debouncedSearchQuery, filters.relevance_available]);
+
   // Reset page to 1 when filters or search changes (debounced)
   useEffect(() => {
     setCurrentPage(1);
@@ -145,11 +156,16 @@ export default function PostsPage() {
       label: reason.replace(/_/g, ' ').replace(/\b\w/g, (l) => l.toUpperCase()),
     })) || [];
 
+  // Only search matches are ranked, and only by the API's in-memory index
+  const relevanceAvailable =
+    Boolean(filters.relevance_available) && Boolean(debouncedSearchQuery);
+
   const orderByOptions: Option[] = [
     { value: 'title:asc', label: 'Title ↑' },
     { value: 'title:desc', label: 'Title ↓' },
     { value: 'id:asc', label: 'ID ↑' },
     { value: 'id:desc', label: 'ID ↓' },
+    ...(relevanceAvailable ? [{ value: 'relevance', label: 'Relevance' }] : []),
   ];
 
   return (
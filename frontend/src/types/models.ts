@@ -10,13 +10,21 @@ export interface AnalyzePostsResponse {
   summary: SummaryPanel;
   filters: FiltersPanel;
   duration?: number | null;
+  last_synced_at?: string | null;
+  summary_refreshed_at?: string | null;
+  timings?: {
+    [k: string]: number;
+  } | null;
 }
 export interface PaginatedPosts {
   items: PostBase[];
   total_count: number;
+  total_count_exact?: boolean;
   current_page: number;
   page_size: number;
   total_pages: number;
+  next_cursor?: string | null;
+  prev_cursor?: string | null;
 }
 export interface PostBase {
   id: number;
@@ -39,6 +47,33 @@ export interface WordCount {
 export interface FiltersPanel {
   all_users: number[];
   all_flag_reasons: string[];
+  relevance_available?: boolean;
+}
+export interface ExportQueryParams {
+  /**
+   * Filter posts by reason
+   */
+  reason?: string | null;
+  /**
+   * Search posts by title
+   */
+  search?: string | null;
+  /**
+   * Filter posts by user ID
+   */
+  user_id?: number | null;
+  /**
+   * Order by column (e.g., 'title:asc' or 'title:desc'), or 'relevance' to rank search matches
+   */
+  order_by?: ("title:asc" | "title:desc" | "id:asc" | "id:desc" | "relevance") | null;
+  /**
+   * Export format
+   */
+  format?: "ndjson" | "csv";
+}
+export interface PostBatchResponse {
+  items: PostBase[];
+  missing: number[];
 }
 export interface PostCreate {
   id: number;
@@ -47,6 +82,24 @@ export interface PostCreate {
   body: string;
   flag_reason?: string | null;
 }
+export interface PostFilterParams {
+  /**
+   * Filter posts by reason
+   */
+  reason?: string | null;
+  /**
+   * Search posts by title
+   */
+  search?: string | null;
+  /**
+   * Filter posts by user ID
+   */
+  user_id?: number | null;
+  /**
+   * Order by column (e.g., 'title:asc' or 'title:desc'), or 'relevance' to rank search matches
+   */
+  order_by?: ("title:asc" | "title:desc" | "id:asc" | "id:desc" | "relevance") | null;
+}
 export interface PostQueryParams {
   /**
    * Filter posts by reason
@@ -61,11 +114,19 @@ export interface PostQueryParams {
    */
   user_id?: number | null;
   /**
-   * Order by column (e.g., 'title:asc' or 'title:desc')
+   * Order by column (e.g., 'title:asc' or 'title:desc'), or 'relevance' to rank search matches
    */
-  order_by?: ("title:asc" | "title:desc" | "id:asc" | "id:desc") | null;
+  order_by?: ("title:asc" | "title:desc" | "id:asc" | "id:desc" | "relevance") | null;
   page?: number;
   page_size?: number;
+  /**
+   * Cursor from next_cursor/prev_cursor; switches to keyset pagination
+   */
+  cursor?: string | null;
+  /**
+   * Include per-stage timings; bypasses the response cache
+   */
+  debug?: boolean;
 }
 export interface PostResponse {
   id: number;